@@ -1,17 +1,13 @@
 import os
 import time
 import sqlite3
+import threading
 from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain_community.vectorstores import Pinecone as LangchainPinecone
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from ..utils.metrics import timed
 
 # Load environment variables
 load_dotenv()
 
-# Configure Google Generative AI
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chat_pdf.db")
 DATABASE_PATH = DATABASE_URL.replace("sqlite:///", "").replace("sqlite://", "")
@@ -21,18 +17,42 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
 
-# Initialize Pinecone
-try:
-    from pinecone import Pinecone, ServerlessSpec
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-except ImportError:
-    print("⚠ Pinecone not installed. Vector operations will not work.")
-    pc = None
-    ServerlessSpec = None
-except Exception as e:
-    print(f"⚠ Pinecone initialization failed: {e}")
-    pc = None
-    ServerlessSpec = None
+# Dimension of the embedding model's vectors (768 for Google embedding-001)
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "768"))
+# Dimension of the vectors stored in newly created indexes; smaller than EMBEDDING_DIMENSION
+# means embeddings are truncated (Matryoshka-style). Existing indexes are changed with migrate_index.py.
+INDEX_DIMENSION = int(os.getenv("INDEX_DIMENSION", "0")) or EMBEDDING_DIMENSION
+
+# The Pinecone client and Google SDK are created on first use, not at import time,
+# so the web app and the SQLite helpers start without loading them
+_pinecone_client = None
+_pinecone_initialized = False
+_pinecone_lock = threading.Lock()
+
+def get_pinecone_client():
+    """Return the shared Pinecone client, creating it on first call (None if unavailable)"""
+    global _pinecone_client, _pinecone_initialized
+    if _pinecone_initialized:
+        return _pinecone_client
+    
+    with _pinecone_lock:
+        if not _pinecone_initialized:
+            try:
+                from pinecone import Pinecone
+                _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+            except ImportError:
+                print("⚠ Pinecone not installed. Vector operations will not work.")
+                _pinecone_client = None
+            except Exception as e:
+                print(f"⚠ Pinecone initialization failed: {e}")
+                _pinecone_client = None
+            _pinecone_initialized = True
+    return _pinecone_client
+
+def configure_genai():
+    """Configure the Google Generative AI SDK"""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # === SQLite Database Initialization ===
 def init_db():
@@ -97,6 +117,24 @@ def init_db():
             )
         ''')
         
+        # Content-addressed storage: documents point at a shared blob by sha256, and
+        # chunk_count lets another session reuse the document's vectors
+        _ensure_column(cursor, 'documents', 'content_hash', 'TEXT')
+        _ensure_column(cursor, 'documents', 'chunk_count', 'INTEGER')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_session ON documents (chat_session_id)')
+        
+        # Document-level vectors: doc_namespace is the session's retrieval scope, vector_namespace
+        # is where the document's chunks are stored (NULL: in doc_namespace itself, the legacy layout)
+        _ensure_column(cursor, 'documents', 'doc_namespace', 'TEXT')
+        _ensure_column(cursor, 'documents', 'vector_namespace', 'TEXT')
+        # Same format as ChatSessionModel.get_session_namespace
+        cursor.execute('''
+            UPDATE documents SET doc_namespace = 'user_' || user_id || '_session_' || chat_session_id
+            WHERE doc_namespace IS NULL
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_doc_namespace ON documents (doc_namespace)')
+        
         # Create summaries table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS summaries (
@@ -110,6 +148,51 @@ def init_db():
             )
         ''')
         
+        # Logical vector namespaces (tenants) stored inside a shared shard namespace, with their
+        # vector counts; has_legacy marks tenants that also have vectors in their own namespace
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vector_tenants (
+                tenant TEXT PRIMARY KEY,
+                shard TEXT NOT NULL,
+                vector_count INTEGER NOT NULL DEFAULT 0,
+                has_legacy INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Vector counts per physical namespace, maintained by the write path and periodically
+        # reconciled with the index stats. Times are epoch seconds so they can be compared.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS namespace_stats (
+                namespace TEXT PRIMARY KEY,
+                vector_count INTEGER NOT NULL DEFAULT 0,
+                last_write_at REAL,
+                reconciled_at REAL
+            )
+        ''')
+        
+        # Index aliases: the physical index an alias (PINECONE_INDEX_NAME) points to, and the
+        # index it is being migrated to (writes are mirrored there until the switch)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS index_aliases (
+                alias TEXT PRIMARY KEY,
+                index_name TEXT NOT NULL,
+                migrating_to TEXT,
+                updated_at REAL
+            )
+        ''')
+        
+        # How embeddings are reduced to the dimension of a physical index (see services/projection.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS index_projections (
+                index_name TEXT PRIMARY KEY,
+                source_dimension INTEGER NOT NULL,
+                dimension INTEGER NOT NULL,
+                projection BLOB NOT NULL,
+                created_at REAL
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         print("✓ SQLite database initialized successfully")
@@ -119,6 +202,12 @@ def init_db():
         print(f"✗ SQLite database initialization failed: {e}")
         return False
 
+def _ensure_column(cursor, table: str, column: str, definition: str):
+    """Add a column to an existing table if it is missing (lightweight migration)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
 def get_db_connection():
     """Get database connection"""
     try:
@@ -129,6 +218,7 @@ def get_db_connection():
         print(f"✗ Failed to connect to database: {e}")
         return None
 
+@timed("db.get_user_sessions")
 def get_user_sessions_from_db(user_id: str):
     """Get all sessions for a user from the database with document counts"""
     try:
@@ -170,6 +260,7 @@ def get_user_sessions_from_db(user_id: str):
         print(f"✗ Failed to get user sessions: {e}")
         return []
 
+@timed("db.get_session_document_count")
 def get_session_document_count(session_id: str) -> int:
     """Get the number of documents in a session"""
     try:
@@ -188,7 +279,10 @@ def get_session_document_count(session_id: str) -> int:
         print(f"✗ Failed to get document count: {e}")
         return 0
 
-def save_document_to_db(user_id: str, chat_session_id: str, filename: str, file_path: str) -> bool:
+@timed("db.save_document")
+def save_document_to_db(user_id: str, chat_session_id: str, filename: str, file_path: str,
+                        content_hash: str = None, chunk_count: int = None,
+                        doc_namespace: str = None, vector_namespace: str = None) -> bool:
     """Save a document record to the database"""
     try:
         conn = get_db_connection()
@@ -199,9 +293,11 @@ def save_document_to_db(user_id: str, chat_session_id: str, filename: str, file_
         document_id = str(__import__('uuid').uuid4())
         
         cursor.execute('''
-            INSERT INTO documents (id, user_id, chat_session_id, filename, file_path, uploaded_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (document_id, user_id, chat_session_id, filename, file_path))
+            INSERT INTO documents (id, user_id, chat_session_id, filename, file_path, content_hash, chunk_count,
+                                   doc_namespace, vector_namespace, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (document_id, user_id, chat_session_id, filename, file_path, content_hash, chunk_count,
+              doc_namespace, vector_namespace))
         
         conn.commit()
         conn.close()
@@ -211,6 +307,526 @@ def save_document_to_db(user_id: str, chat_session_id: str, filename: str, file_
         print(f"✗ Failed to save document: {e}")
         return False
 
+@timed("db.get_document_by_hash")
+def get_document_by_hash(content_hash: str, exclude_session_id: str = None):
+    """Most recent ingested document with this content hash, or None.
+    
+    Documents whose vectors are already in a shared namespace are preferred, since
+    they can be attached to another session without touching the vector store.
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, chat_session_id, filename, file_path, content_hash, chunk_count,
+                   doc_namespace, vector_namespace
+            FROM documents
+            WHERE content_hash = ? AND chunk_count IS NOT NULL AND chat_session_id != ?
+            ORDER BY vector_namespace IS NULL, uploaded_at DESC
+            LIMIT 1
+        ''', (content_hash, exclude_session_id or ''))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"✗ Failed to look up document by hash: {e}")
+        return None
+
+@timed("db.get_namespace_documents")
+def get_namespace_documents(doc_namespace: str):
+    """Documents in a session's retrieval scope, or None if the database is unavailable"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT content_hash, chunk_count, vector_namespace
+            FROM documents
+            WHERE doc_namespace = ?
+        ''', (doc_namespace,))
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return rows
+        
+    except Exception as e:
+        print(f"✗ Failed to load session documents: {e}")
+        return None
+
+def get_referenced_content_hashes() -> set:
+    """All content hashes referenced by at least one document row"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT content_hash FROM documents WHERE content_hash IS NOT NULL')
+        return {row["content_hash"] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+@timed("db.delete_session_documents")
+def delete_session_documents(session_id: str) -> list:
+    """Delete a session's document rows and return what they referenced.
+    
+    Each entry is a dict with content_hash, chunk_count and vector_namespace, one per distinct document.
+    """
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT content_hash, MAX(chunk_count) as chunk_count, vector_namespace
+            FROM documents
+            WHERE chat_session_id = ? AND content_hash IS NOT NULL
+            GROUP BY content_hash, vector_namespace
+        ''', (session_id,))
+        documents = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DELETE FROM documents WHERE chat_session_id = ?', (session_id,))
+        
+        conn.commit()
+        conn.close()
+        return documents
+        
+    except Exception as e:
+        print(f"✗ Failed to delete session documents: {e}")
+        return []
+
+@timed("db.delete_session_records")
+def delete_session_records(session_id: str, delete_session: bool = False) -> bool:
+    """Delete a session's messages and summaries, and with delete_session the chat_sessions row itself"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM messages WHERE chat_session_id = ?', (session_id,))
+        cursor.execute('DELETE FROM summaries WHERE chat_session_id = ?', (session_id,))
+        if delete_session:
+            cursor.execute('DELETE FROM chat_sessions WHERE id = ?', (session_id,))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to delete session records: {e}")
+        return False
+
+# === Garbage collection ===
+# chat_sessions is the source of truth for which sessions exist (users are not persisted),
+# so anything keyed by a session id that has no chat_sessions row is orphaned.
+SESSION_CHILD_TABLES = ('documents', 'messages', 'summaries')
+
+def get_live_sessions() -> list:
+    """(user_id, session_id) of every session in the database; raises if the database is unavailable"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT user_id, id FROM chat_sessions')
+        return [(row["user_id"], row["id"]) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def find_orphaned_records() -> dict:
+    """IDs of documents, messages and summaries rows whose session no longer exists, per table"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        orphaned = {}
+        for table in SESSION_CHILD_TABLES:
+            cursor.execute(f'''
+                SELECT t.id FROM {table} t
+                LEFT JOIN chat_sessions cs ON cs.id = t.chat_session_id
+                WHERE cs.id IS NULL
+            ''')
+            orphaned[table] = [row["id"] for row in cursor.fetchall()]
+        return orphaned
+    finally:
+        conn.close()
+
+def get_live_content_hashes() -> set:
+    """Content hashes referenced by documents of existing sessions"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT d.content_hash FROM documents d
+            JOIN chat_sessions cs ON cs.id = d.chat_session_id
+            WHERE d.content_hash IS NOT NULL
+        ''')
+        return {row["content_hash"] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+@timed("db.delete_records")
+def delete_records(table: str, record_ids: list) -> int:
+    """Delete rows of a session child table by id; returns the number deleted"""
+    if table not in SESSION_CHILD_TABLES:
+        raise ValueError(f"Unsupported table: {table}")
+    if not record_ids:
+        return 0
+    
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in record_ids)
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', list(record_ids))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+# === Vector tenants ===
+@timed("db.get_vector_tenant")
+def get_vector_tenant(tenant: str):
+    """Shard placement and vector count of a logical namespace, or None if it is not sharded"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        cursor.execute('SELECT tenant, shard, vector_count, has_legacy FROM vector_tenants WHERE tenant = ?', (tenant,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"✗ Failed to load vector tenant: {e}")
+        return None
+
+@timed("db.record_tenant_vectors")
+def record_tenant_vectors(tenant: str, shard: str, added: int, has_legacy: bool = False) -> bool:
+    """Register a tenant on its first write and add to its vector count"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO vector_tenants (tenant, shard, vector_count, has_legacy, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (tenant) DO UPDATE SET
+                vector_count = vector_count + excluded.vector_count,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (tenant, shard, added, 1 if has_legacy else 0))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to record tenant vectors: {e}")
+        return False
+
+def delete_vector_tenant(tenant: str) -> bool:
+    """Forget a tenant after its vectors were deleted"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM vector_tenants WHERE tenant = ?', (tenant,))
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to delete vector tenant: {e}")
+        return False
+
+def list_vector_tenants() -> list:
+    """Every sharded tenant with its shard and vector count; raises if the database is unavailable"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT tenant, shard, vector_count, has_legacy FROM vector_tenants')
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def reconcile_tenant_counts(shard: str, counts: dict, settle_seconds: float) -> list:
+    """Overwrite the vector counts of a shard's tenants with counted ones; returns (tenant, local, counted) corrections.
+    
+    Tenants written within settle_seconds are skipped, since the count may not include those writes.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        settled = f"-{int(settle_seconds)} seconds"
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT tenant, vector_count FROM vector_tenants
+            WHERE shard = ? AND updated_at <= datetime('now', ?)
+        ''', (shard, settled))
+        corrections = []
+        for row in cursor.fetchall():
+            counted = counts.get(row["tenant"], 0)
+            if row["vector_count"] == counted:
+                continue
+            corrections.append((row["tenant"], row["vector_count"], counted))
+            cursor.execute('''
+                UPDATE vector_tenants SET vector_count = ?
+                WHERE tenant = ? AND updated_at <= datetime('now', ?)
+            ''', (counted, row["tenant"], settled))
+        
+        conn.commit()
+        return corrections
+    finally:
+        conn.close()
+
+# === Namespace stats ===
+@timed("db.add_namespace_vectors")
+def add_namespace_vectors(namespace: str, delta: int, written_at: float) -> bool:
+    """Adjust a namespace's vector count after a write (negative delta for deletes)"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO namespace_stats (namespace, vector_count, last_write_at)
+            VALUES (?, MAX(?, 0), ?)
+            ON CONFLICT (namespace) DO UPDATE SET
+                vector_count = MAX(vector_count + ?, 0),
+                last_write_at = excluded.last_write_at
+        ''', (namespace, delta, written_at, delta))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to record namespace write: {e}")
+        return False
+
+def clear_namespace_vectors(namespace: str, written_at: float) -> bool:
+    """Record that every vector of a namespace was deleted"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO namespace_stats (namespace, vector_count, last_write_at)
+            VALUES (?, 0, ?)
+            ON CONFLICT (namespace) DO UPDATE SET vector_count = 0, last_write_at = excluded.last_write_at
+        ''', (namespace, written_at))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to record namespace clear: {e}")
+        return False
+
+@timed("db.get_namespace_vector_counts")
+def get_namespace_vector_counts(namespaces: list) -> dict:
+    """Known vector counts for the given namespaces; namespaces never seen are missing from the result"""
+    if not namespaces:
+        return {}
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return {}
+        
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in namespaces)
+        cursor.execute(
+            f'SELECT namespace, vector_count FROM namespace_stats WHERE namespace IN ({placeholders})',
+            list(namespaces)
+        )
+        counts = {row["namespace"]: row["vector_count"] for row in cursor.fetchall()}
+        conn.close()
+        return counts
+        
+    except Exception as e:
+        print(f"✗ Failed to load namespace stats: {e}")
+        return {}
+
+def get_last_namespace_reconciliation() -> float:
+    """Epoch seconds of the most recent reconciliation by any process, 0 if none"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MAX(reconciled_at) as reconciled_at FROM namespace_stats')
+        row = cursor.fetchone()
+        return (row["reconciled_at"] if row else None) or 0
+    finally:
+        conn.close()
+
+def reconcile_namespace_stats(remote_counts: dict, reconciled_at: float, settle_seconds: float) -> list:
+    """Overwrite local counts with the index's, in one transaction; returns (namespace, local, remote) corrections.
+    
+    Namespaces written within settle_seconds are skipped, since the index may not show those writes yet.
+    Namespaces the index does not have (empty or cleared ones) are known to hold 0 vectors.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database unavailable")
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT namespace, vector_count, last_write_at FROM namespace_stats')
+        local = {row["namespace"]: (row["vector_count"], row["last_write_at"] or 0) for row in cursor.fetchall()}
+        
+        corrections = []
+        for namespace in set(local) | set(remote_counts):
+            local_count, last_write_at = local.get(namespace, (None, 0))
+            remote_count = remote_counts.get(namespace, 0)
+            if reconciled_at - last_write_at < settle_seconds:
+                continue
+            if local_count != remote_count:
+                corrections.append((namespace, local_count, remote_count))
+            cursor.execute('''
+                INSERT INTO namespace_stats (namespace, vector_count, reconciled_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (namespace) DO UPDATE SET
+                    vector_count = excluded.vector_count,
+                    reconciled_at = excluded.reconciled_at
+            ''', (namespace, remote_count, reconciled_at))
+        
+        conn.commit()
+        return corrections
+    finally:
+        conn.close()
+
+# === Index aliases ===
+@timed("db.get_index_alias")
+def get_index_alias(alias: str):
+    """Physical index and migration target of an alias, or None if the alias has no row (it is the index name)"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        cursor.execute('SELECT alias, index_name, migrating_to, updated_at FROM index_aliases WHERE alias = ?', (alias,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"✗ Failed to load index alias: {e}")
+        return None
+
+def set_index_alias(alias: str, index_name: str, migrating_to: str = None) -> bool:
+    """Point an alias at a physical index (and start or end mirroring writes to migrating_to)"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO index_aliases (alias, index_name, migrating_to, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (alias) DO UPDATE SET
+                index_name = excluded.index_name,
+                migrating_to = excluded.migrating_to,
+                updated_at = excluded.updated_at
+        ''', (alias, index_name, migrating_to, time.time()))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to update index alias: {e}")
+        return False
+
+def resolve_index_alias(alias: str) -> str:
+    """Physical index an alias points to (the alias itself when it has no row)"""
+    row = get_index_alias(alias)
+    return row["index_name"] if row else alias
+
+def get_index_projection(index_name: str):
+    """Saved projection of an index ({"source_dimension", "dimension", "projection" bytes}), or None"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT source_dimension, dimension, projection FROM index_projections WHERE index_name = ?',
+            (index_name,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        return dict(row) if row else None
+        
+    except Exception as e:
+        print(f"✗ Failed to load index projection: {e}")
+        return None
+
+def save_index_projection(index_name: str, source_dimension: int, dimension: int, projection: bytes) -> bool:
+    """Store the projection of an index (written once, before the index receives vectors)"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO index_projections (index_name, source_dimension, dimension, projection, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (index_name, source_dimension, dimension, sqlite3.Binary(projection), time.time()))
+        
+        conn.commit()
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Failed to save index projection: {e}")
+        return False
+
+def get_index_dimension(index_name: str) -> int:
+    """Dimension to create an index with: its saved projection's, else INDEX_DIMENSION"""
+    record = get_index_projection(index_name)
+    return record["dimension"] if record else INDEX_DIMENSION
+
+@timed("db.save_session")
 def save_session_to_db(user_id: str, session_id: str, session_name: str) -> bool:
     """Save a chat session to the database"""
     try:
@@ -258,18 +874,22 @@ def validate_environment():
 
 # === Ensure Index ===
 def ensure_index_exists():
+    pc = get_pinecone_client()
     if not pc:
         print("⚠ Pinecone not initialized. Skipping index creation.")
         return False
         
     try:
+        index_name = resolve_index_alias(PINECONE_INDEX_NAME)
+        dimension = get_index_dimension(index_name)
         index_names = pc.list_indexes().names()
-        if PINECONE_INDEX_NAME not in index_names:
-            print(f"Creating index: {PINECONE_INDEX_NAME}")
+        if index_name not in index_names:
+            print(f"Creating index: {index_name} ({dimension} dimensions)")
+            from pinecone import ServerlessSpec
             try:
                 pc.create_index(
-                    name=PINECONE_INDEX_NAME,
-                    dimension=768,
+                    name=index_name,
+                    dimension=dimension,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION)
                 )
@@ -277,8 +897,8 @@ def ensure_index_exists():
             except Exception as aws_error:
                 print(f"AWS failed: {aws_error}, trying GCP...")
                 pc.create_index(
-                    name=PINECONE_INDEX_NAME,
-                    dimension=768,
+                    name=index_name,
+                    dimension=dimension,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="gcp", region="us-central1")
                 )
@@ -288,7 +908,7 @@ def ensure_index_exists():
             print("⏳ Waiting for index readiness...")
             for i in range(30):
                 try:
-                    status = pc.describe_index(PINECONE_INDEX_NAME).status
+                    status = pc.describe_index(index_name).status
                     if status.get("ready", False):
                         print("✓ Index is ready!")
                         break
@@ -298,13 +918,14 @@ def ensure_index_exists():
             else:
                 print("⚠ Index may not be ready yet, continuing anyway.")
         else:
-            print(f"✓ Index '{PINECONE_INDEX_NAME}' already exists.")
+            print(f"✓ Index '{index_name}' already exists.")
     except Exception as e:
         print(f"✗ Failed to ensure index: {e}")
         raise
 
 # === Connection Check ===
 def test_pinecone_connection():
+    pc = get_pinecone_client()
     if not pc:
         print("⚠ Pinecone not initialized.")
         return False
@@ -320,9 +941,12 @@ def test_pinecone_connection():
 # === Stats (using Langchain wrapper) ===
 def get_index_stats():
     try:
+        from langchain_community.vectorstores import Pinecone as LangchainPinecone
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        configure_genai()
         embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
         vectorstore = LangchainPinecone.from_existing_index(
-            index_name=PINECONE_INDEX_NAME,
+            index_name=resolve_index_alias(PINECONE_INDEX_NAME),
             embedding=embeddings
         )
         stats = vectorstore.index.describe_index_stats()
@@ -333,15 +957,17 @@ def get_index_stats():
         return None
 
 def get_index():
+    pc = get_pinecone_client()
     if not pc:
         print("⚠ Pinecone not initialized.")
         return None
         
     try:
-        if PINECONE_INDEX_NAME not in pc.list_indexes().names():
+        index_name = resolve_index_alias(PINECONE_INDEX_NAME)
+        if index_name not in pc.list_indexes().names():
             print("✗ Pinecone index not found.")
             return None
-        return pc.Index(PINECONE_INDEX_NAME)
+        return pc.Index(index_name)
     except Exception as e:
         print(f"✗ Failed to get Pinecone index: {e}")
         return None
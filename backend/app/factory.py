@@ -0,0 +1,545 @@
+"""
+Flask application factory for the AGI Task backend.
+Entry points (app.py for development, asgi.py for async serving) build the app from here.
+"""
+
+from flask import Flask, request, jsonify, g, Response, stream_with_context
+from flask_cors import CORS
+import os
+import json
+import time
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Import our services and models
+from .services.ai_service import AIService, BATCH_ASK_MAX_QUESTIONS
+from .routes.document import DocumentRouter
+from .routes.chat import ChatRouter
+from .routes.history import HistoryRouter
+from .models.chat_session import ChatSessionModel
+from .models.user import UserModel
+from .services.registry import ServiceRegistry
+from .services.screening_service import ScreeningService
+from .utils.metrics import (
+    metrics, start_request_timing, finish_request_timing,
+    server_timing_header, PROMETHEUS_CONTENT_TYPE
+)
+from .utils.rate_limiter import llm_governor, embedding_governor, start_request_lane, finish_request_lane
+from .database.connection import init_db, save_session_to_db, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Backend root directory (uploads live next to the entry points)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def create_app():
+    """Application factory pattern"""
+    app = Flask(__name__)
+    
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
+    app.config['MAX_CONTENT_LENGTH'] = int(float(os.getenv('UPLOAD_MAX_REQUEST_MB', '16')) * 1024 * 1024)  # whole upload request
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', os.path.join(BACKEND_DIR, 'uploads'))
+    
+    # Enable CORS for all domains and routes
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": ["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"]
+        }
+    })
+    
+    # Initialize database
+    try:
+        init_db()
+        logger.info("Database initialized successfully")
+    except Exception as e:
+        logger.error(f"Database initialization failed: {str(e)}")
+    
+    # Create upload directory if it doesn't exist
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    # Register services; they are created lazily in each worker process on first use
+    services = ServiceRegistry()
+    services.register('ai_service', AIService)
+    services.register('document_router', DocumentRouter)
+    services.register('chat_router', ChatRouter)
+    services.register('history_router', HistoryRouter)
+    services.register('screening_service', lambda: ScreeningService(services.get('ai_service')))
+    app.extensions['services'] = services
+    
+    # Request timing: per-stage latencies go into histograms and the Server-Timing header
+    @app.before_request
+    def start_timing():
+        g.request_started_at = time.perf_counter()
+        g.request_timing_token = start_request_timing()
+        # Gemini/embedding calls of uploads and extractions yield to interactive requests
+        g.request_lane_token = start_request_lane(request.path)
+    
+    @app.teardown_request
+    def finish_lane(error=None):
+        finish_request_lane(g.pop('request_lane_token', None))
+    
+    @app.after_request
+    def add_server_timing(response):
+        started_at = g.pop('request_started_at', None)
+        if started_at is None:
+            return response
+        elapsed = time.perf_counter() - started_at
+        timings = finish_request_timing(g.pop('request_timing_token', None))
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.record_request(request.method, endpoint, response.status_code, elapsed)
+        response.headers['Server-Timing'] = server_timing_header(timings, elapsed)
+        return response
+    
+    # Prometheus metrics endpoint
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Export stage latencies, call/error/cache counters and token counts"""
+        return Response(metrics.render_prometheus(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
+    
+    # Health check endpoint
+    @app.route('/health')
+    def health_check():
+        """Health check endpoint"""
+        return jsonify({
+            'status': 'healthy',
+            'message': 'AGI Task Backend is running',
+            'version': '1.0.0'
+        })
+    
+    # Readiness endpoint (separate from /health, which only reports liveness)
+    @app.route('/ready')
+    def readiness_check():
+        """Report whether this worker can serve traffic; creates services on first call"""
+        checks = {}
+        
+        conn = get_db_connection()
+        checks['database'] = conn is not None
+        if conn:
+            conn.close()
+        
+        try:
+            ai_service = services.get('ai_service')
+            checks['ai_model'] = ai_service.model is not None
+            checks['vector_store'] = bool(ai_service.vector_service and ai_service.vector_service.pc)
+        except Exception as e:
+            logger.error(f"Readiness check failed to create services: {str(e)}")
+            checks['ai_model'] = False
+            checks['vector_store'] = False
+        
+        ready = all(checks.values())
+        return jsonify({
+            'status': 'ready' if ready else 'not_ready',
+            'checks': checks,
+            'api_lanes': {
+                governor.name: governor.lane_stats() for governor in (llm_governor, embedding_governor)
+            }
+        }), 200 if ready else 503
+    
+    # Authentication endpoints
+    @app.route('/api/auth/register', methods=['POST'])
+    def register():
+        """User registration"""
+        try:
+            data = request.get_json()
+            username = data.get('username')
+            email = data.get('email')
+            password = data.get('password')
+            
+            if not all([username, email, password]):
+                return jsonify({'error': 'Username, email, and password are required'}), 400
+            
+            # Create user (implement in UserModel)
+            user = UserModel.create_user(username=username, email=email, password=password)
+            
+            return jsonify({
+                'message': 'User registered successfully',
+                'user_id': user.id
+            }), 201
+            
+        except Exception as e:
+            logger.error(f"Registration error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/auth/login', methods=['POST'])
+    def login():
+        """User login"""
+        try:
+            data = request.get_json()
+            username = data.get('username')
+            password = data.get('password')
+            
+            if not all([username, password]):
+                return jsonify({'error': 'Username and password are required'}), 400
+            
+            # Authenticate user (implement in UserModel)
+            user = UserModel.authenticate_user(username=username, password=password)
+            
+            if not user:
+                return jsonify({'error': 'Invalid credentials'}), 401
+            
+            return jsonify({
+                'message': 'Login successful',
+                'user_id': user.id,
+                'username': user.username
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"Login error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Session management endpoints
+    @app.route('/api/sessions/create', methods=['POST'])
+    def create_session():
+        """Create a new chat session"""
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id')
+            session_name = data.get('session_name', 'New Session')
+            
+            if not user_id:
+                return jsonify({'error': 'User ID is required'}), 400
+            
+            session = ChatSessionModel.create_session(user_id=user_id, title=session_name)
+            
+            # Save session to database
+            saved = save_session_to_db(user_id, session.id, session.title)
+            
+            if not saved:
+                logger.warning("Failed to save session to database, but continuing")
+            
+            return jsonify({
+                'message': 'Session created successfully',
+                'session_id': session.id,
+                'session_name': session.title
+            }), 201
+            
+        except Exception as e:
+            logger.error(f"Session creation error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Document management endpoints
+    @app.route('/api/documents/upload', methods=['POST'])
+    def upload_documents():
+        """Upload PDF documents"""
+        try:
+            user_id = request.form.get('user_id')
+            session_id = request.form.get('session_id')
+            
+            if not all([user_id, session_id]):
+                return jsonify({'error': 'User ID and Session ID are required'}), 400
+            
+            if 'files' not in request.files:
+                return jsonify({'error': 'No files uploaded'}), 400
+            
+            files = request.files.getlist('files')
+            
+            if not files or all(file.filename == '' for file in files):
+                return jsonify({'error': 'No files selected'}), 400
+            
+            # Process uploaded files
+            result = services.get('document_router').upload_documents(
+                uploaded_files=files,
+                user_id=user_id,
+                session_id=session_id,
+                base_upload_dir=app.config['UPLOAD_FOLDER']
+            )
+            
+            return jsonify({'message': result}), 200
+            
+        except Exception as e:
+            logger.error(f"Document upload error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/documents/clear', methods=['POST'])
+    def clear_documents():
+        """Clear all documents for a session"""
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id')
+            session_id = data.get('session_id')
+            
+            if not all([user_id, session_id]):
+                return jsonify({'error': 'User ID and Session ID are required'}), 400
+            
+            result = services.get('document_router').clear_session_documents(
+                user_id=user_id,
+                session_id=session_id,
+                base_upload_dir=app.config['UPLOAD_FOLDER']
+            )
+            
+            return jsonify({'message': result}), 200
+            
+        except Exception as e:
+            logger.error(f"Document clear error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Information extraction endpoints
+    @app.route('/api/extract/user-info', methods=['POST'])
+    def extract_user_info():
+        """Extract user information from uploaded documents"""
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id')
+            session_id = data.get('session_id')
+            
+            if not all([user_id, session_id]):
+                return jsonify({'error': 'User ID and Session ID are required'}), 400
+            
+            # Get namespace for this session's documents
+            doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+            
+            # Extract user information
+            result = services.get('ai_service').extract_user_information(doc_namespace)
+            
+            return jsonify({'extracted_info': result}), 200
+            
+        except Exception as e:
+            logger.error(f"User info extraction error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/extract/tech-stack', methods=['POST'])
+    def extract_tech_stack():
+        """Extract tech stack from uploaded documents"""
+        try:
+            data = request.get_json()
+            user_id = data.get('user_id')
+            session_id = data.get('session_id')
+            
+            if not all([user_id, session_id]):
+                return jsonify({'error': 'User ID and Session ID are required'}), 400
+            
+            # Get namespace for this session's documents
+            doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+            
+            # Extract tech stack
+            result = services.get('ai_service').extract_tech_stack_only(doc_namespace)
+            
+            return jsonify({'tech_stack': result}), 200
+            
+        except Exception as e:
+            logger.error(f"Tech stack extraction error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Technical questions generation endpoint
+    @app.route('/api/questions/generate', methods=['POST'])
+    def generate_technical_questions():
+        """Generate technical questions based on tech stack"""
+        try:
+            data = request.get_json()
+            tech_stack = data.get('tech_stack')
+            difficulty = data.get('difficulty', 'medium')
+            fan_out = bool(data.get('fan_out', False))
+            
+            if not tech_stack:
+                return jsonify({'error': 'Tech stack is required'}), 400
+            
+            # Validate difficulty
+            valid_difficulties = ['easy', 'medium', 'hard']
+            if difficulty.lower() not in valid_difficulties:
+                return jsonify({'error': f'Invalid difficulty. Choose from: {", ".join(valid_difficulties)}'}), 400
+            
+            # Generate questions
+            result = services.get('ai_service').generate_technical_questions(tech_stack, difficulty, fan_out=fan_out)
+            
+            return jsonify({'questions': result}), 200
+            
+        except Exception as e:
+            logger.error(f"Question generation error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Bulk screening endpoint
+    @app.route('/api/screening/run', methods=['POST'])
+    def run_screening():
+        """Screen many resumes: tech stack and user information per PDF, streamed as NDJSON.
+        
+        Accepts PDFs as multipart 'files', or a JSON/form 'directory' under SCREENING_ROOT.
+        Each line is a JSON event: start, one result or error per document as it
+        finishes (with progress), then done.
+        """
+        try:
+            data = request.get_json(silent=True) or request.form
+            directory = data.get('directory')
+            concurrency = data.get('concurrency')
+            concurrency = int(concurrency) if concurrency else None
+            
+            screening_service = services.get('screening_service')
+            if not screening_service.ai_service.model:
+                return jsonify({'error': 'AI service is not properly configured. Please check your Google API key.'}), 503
+            
+            if directory:
+                items = ScreeningService.items_from_directory(directory)
+            else:
+                files = [file for file in request.files.getlist('files') if file.filename]
+                if not files:
+                    return jsonify({'error': 'No files uploaded and no directory given'}), 400
+                items = ScreeningService.items_from_uploads(files, app.config['UPLOAD_FOLDER'])
+            
+            return Response(
+                stream_with_context(screening_service.screen_ndjson(items, concurrency)),
+                mimetype='application/x-ndjson'
+            )
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Screening error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Chat endpoints
+    @app.route('/api/chat/ask', methods=['POST'])
+    def ask_question():
+        """Ask a question about the uploaded documents"""
+        try:
+            data = request.get_json()
+            question = data.get('question')
+            user_id = data.get('user_id')
+            session_id = data.get('session_id')
+            
+            if not all([question, user_id, session_id]):
+                return jsonify({'error': 'Question, User ID, and Session ID are required'}), 400
+            
+            # Get answer from chat router
+            result = services.get('chat_router').ask_question(question, user_id, session_id)
+            
+            return jsonify({'answer': result}), 200
+            
+        except Exception as e:
+            logger.error(f"Chat error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/chat/ask/batch', methods=['POST'])
+    def ask_questions():
+        """Ask several questions about the uploaded documents in one call.
+        
+        Returns the answers in question order, or with "stream": true an NDJSON stream
+        with one answer event per question as it is ready, then a done event.
+        """
+        try:
+            data = request.get_json()
+            questions = data.get('questions')
+            user_id = data.get('user_id')
+            session_id = data.get('session_id')
+            
+            if not all([questions, user_id, session_id]):
+                return jsonify({'error': 'Questions, User ID, and Session ID are required'}), 400
+            if not isinstance(questions, list) or not all(isinstance(q, str) and q.strip() for q in questions):
+                return jsonify({'error': 'Questions must be a list of non-empty strings'}), 400
+            if len(questions) > BATCH_ASK_MAX_QUESTIONS:
+                return jsonify({'error': f'Too many questions (limit {BATCH_ASK_MAX_QUESTIONS})'}), 400
+            
+            chat_router = services.get('chat_router')
+            if not data.get('stream'):
+                return jsonify({'answers': chat_router.ask_questions(questions, user_id, session_id)}), 200
+            
+            def generate():
+                started_at = time.perf_counter()
+                completed = 0
+                for index, answer in chat_router.iter_ask_questions(questions, user_id, session_id):
+                    completed += 1
+                    yield json.dumps({
+                        'type': 'answer', 'index': index, 'question': questions[index], 'answer': answer,
+                        'progress': {'completed': completed, 'total': len(questions)}
+                    }) + "\n"
+                yield json.dumps({
+                    'type': 'done', 'completed': completed, 'seconds': round(time.perf_counter() - started_at, 3)
+                }) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+            
+        except Exception as e:
+            logger.error(f"Batch chat error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # History endpoints
+    @app.route('/api/history/sessions', methods=['GET'])
+    def get_user_sessions():
+        """Get all sessions for a user"""
+        try:
+            user_id = request.args.get('user_id')
+            
+            if not user_id:
+                return jsonify({'error': 'User ID is required'}), 400
+            
+            sessions = services.get('history_router').get_all_user_sessions(user_id)
+            logger.info(f"Found {len(sessions)} sessions for user {user_id}")
+            
+            return jsonify({'sessions': sessions}), 200
+            
+        except Exception as e:
+            logger.error(f"Get sessions error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/history/chat', methods=['GET'])
+    def get_chat_history():
+        """Get chat history for a user and optional session"""
+        try:
+            user_id = request.args.get('user_id')
+            session_id = request.args.get('session_id')
+            
+            if not user_id:
+                return jsonify({'error': 'User ID is required'}), 400
+            
+            logger.info(f"Getting chat history for user {user_id}, session {session_id}")
+            history = services.get('history_router').get_chat_history(user_id, session_id)
+            logger.info(f"Found {len(history)} chat history items")
+            
+            return jsonify({'history': history}), 200
+            
+        except Exception as e:
+            logger.error(f"Get chat history error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/debug/chat-messages', methods=['GET'])
+    def debug_chat_messages():
+        """Debug endpoint to see raw chat messages in namespace"""
+        try:
+            user_id = request.args.get('user_id')
+            session_id = request.args.get('session_id')
+            
+            if not user_id or not session_id:
+                return jsonify({'error': 'User ID and Session ID are required'}), 400
+            
+            chat_namespace = ChatSessionModel.get_chat_namespace(user_id, session_id)
+            
+            # Get raw documents from vector service
+            docs = services.get('ai_service').vector_service.get_chat_history(chat_namespace, k=100)
+            
+            debug_data = []
+            for doc in docs:
+                debug_data.append({
+                    'content': doc.page_content,
+                    'metadata': doc.metadata if hasattr(doc, 'metadata') else {},
+                    'content_length': len(doc.page_content)
+                })
+            
+            return jsonify({
+                'namespace': chat_namespace,
+                'total_messages': len(debug_data),
+                'messages': debug_data
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"Debug chat messages error: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+    
+    # Error handlers
+    @app.errorhandler(413)
+    def too_large(e):
+        max_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+        return jsonify({'error': f'File too large. Maximum size is {max_mb:g}MB.'}), 413
+    
+    @app.errorhandler(404)
+    def not_found(e):
+        return jsonify({'error': 'Endpoint not found'}), 404
+    
+    @app.errorhandler(500)
+    def internal_error(e):
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    return app
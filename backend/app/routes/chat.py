@@ -1,3 +1,4 @@
+from typing import Iterator, List
 from ..services.ai_service import AIService
 from ..models.chat_session import ChatSessionModel
 from ..models.message import MessageModel
@@ -36,4 +37,41 @@ class ChatRouter:
             return response
             
         except Exception as e:
-            return f"❌ Error processing question: {str(e)}"
\ No newline at end of file
+            return f"❌ Error processing question: {str(e)}"
+    
+    def iter_ask_questions(self, questions: List[str], user_id: str, session_id: str) -> Iterator[tuple]:
+        """Ask several questions about the documents; yields (index, answer) as each answer is ready"""
+        doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+        
+        for question in questions:
+            MessageModel.create_message(
+                user_id=user_id,
+                chat_session_id=session_id,
+                role="user",
+                content=question
+            )
+        
+        for index, answer in self.ai_service.iter_ask_questions(questions, doc_namespace):
+            MessageModel.create_message(
+                user_id=user_id,
+                chat_session_id=session_id,
+                role="assistant",
+                content=answer
+            )
+            yield index, answer
+    
+    def ask_questions(self, questions: List[str], user_id: str, session_id: str) -> List[str]:
+        """Ask several questions about the documents; answers are returned in question order"""
+        answers = [None] * len(questions)
+        for index, answer in self.iter_ask_questions(questions, user_id, session_id):
+            answers[index] = answer
+        return answers
+    
+    async def aask_question(self, question: str, user_id: str, session_id: str) -> str:
+        """Async version of ask_question"""
+        try:
+            doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+            return await self.ai_service.aask_question(question, doc_namespace, session_id=session_id)
+            
+        except Exception as e:
+            return f"❌ Error processing question: {str(e)}"
@@ -1,9 +1,11 @@
 from ..services.pdf_service import PDFService
-from ..services.vector_service import VectorService
+from ..services.vector_service import VectorService, DOCUMENT_VECTOR_NAMESPACE
 from ..services.data_service import DataService
+from ..services.upload_writer import UploadRejected
+from ..services.blob_store import BlobStore
 from ..models.document import DocumentModel
 from ..models.chat_session import ChatSessionModel
-from ..database.connection import save_document_to_db
+from ..database.connection import save_document_to_db, get_document_by_hash
 from typing import List
 
 class DocumentRouter:
@@ -18,47 +20,89 @@ class DocumentRouter:
             if not uploaded_files:
                 return "❌ No files uploaded."
             
-            # Get session upload directory
-            upload_dir = self.data_service.get_session_upload_dir(user_id, session_id, base_upload_dir)
+            # Store files by content hash; identical files are kept once across all sessions
+            blob_store = BlobStore(base_upload_dir)
+            saved_files = blob_store.save_uploads(uploaded_files)
             
-            # Save uploaded files
-            file_paths = self.pdf_service.save_uploaded_files(uploaded_files, upload_dir)
+            # Get namespace for this session's documents
+            doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
             
-            # Extract text from saved PDF files
-            text = ""
-            for file_path in file_paths:
-                pdf_text = self.pdf_service.extract_text_from_pdf(file_path)
-                text += pdf_text
+            # Work out per file whether it is already in the document store or has to be ingested
+            documents = []
+            for upload in saved_files:
+                # A document already ingested by any session is attached by reference: no parsing or embedding
+                chunk_count = self._attach_stored_document(upload.content_hash)
+                if chunk_count is not None:
+                    documents.append((upload, chunk_count, None))
+                    continue
+                
+                # Extract text from the stored PDF (cached by content hash)
+                text = "".join(self.pdf_service.extract_pages_from_pdf(upload.file_path, upload.content_hash))
+                if text.strip():
+                    text_chunks = self.pdf_service.split_text_into_chunks(text)
+                    documents.append((upload, len(text_chunks), text_chunks))
             
-            if not text.strip():
+            if not documents:
                 return "❌ No text found in uploaded PDFs."
             
-            # Split text into chunks
-            text_chunks = self.pdf_service.split_text_into_chunks(text)
-            
-            # Get namespace for this session's documents
-            doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
-            
-            # Store vectors in Pinecone
-            self.vector_service.store_document_vectors(text_chunks, doc_namespace)
+            # Store new documents' vectors once in the shared document namespace; only wait
+            # for indexing after the last document
+            new_documents = [(upload, chunks) for upload, _, chunks in documents if chunks is not None]
+            for i, (upload, text_chunks) in enumerate(new_documents):
+                self.vector_service.store_document_vectors(
+                    text_chunks, DOCUMENT_VECTOR_NAMESPACE,
+                    content_hash=upload.content_hash,
+                    wait_for_index=(i == len(new_documents) - 1)
+                )
             
-            # Save document records to database
+            # Save document records to database (each row is also a reference to the blob)
             documents_saved = 0
-            for i, uploaded_file in enumerate(uploaded_files):
+            for upload, chunk_count, _ in documents:
                 success = save_document_to_db(
                     user_id=user_id,
                     chat_session_id=session_id,
-                    filename=uploaded_file.filename,
-                    file_path=file_paths[i]
+                    filename=upload.filename,
+                    file_path=upload.file_path,
+                    content_hash=upload.content_hash,
+                    chunk_count=chunk_count,
+                    doc_namespace=doc_namespace,
+                    vector_namespace=DOCUMENT_VECTOR_NAMESPACE
                 )
                 if success:
                     documents_saved += 1
             
-            return f"✅ Successfully uploaded and processed {len(uploaded_files)} documents. {documents_saved} saved to database."
+            documents_reused = len(documents) - len(new_documents)
+            reused_note = f" {documents_reused} reused from earlier uploads." if documents_reused else ""
+            return f"✅ Successfully uploaded and processed {len(uploaded_files)} documents. {documents_saved} saved to database.{reused_note}"
             
+        except UploadRejected as e:
+            return f"❌ {str(e)}"
         except Exception as e:
             return f"❌ Error uploading documents: {str(e)}"
     
+    def _attach_stored_document(self, content_hash: str):
+        """Chunk count of an identical document that is already in the document store, or None.
+        
+        Documents ingested before the shared namespace existed are copied into it once
+        from their session namespace.
+        """
+        source = get_document_by_hash(content_hash)
+        if not source:
+            return None
+        if source["vector_namespace"] == DOCUMENT_VECTOR_NAMESPACE:
+            return source["chunk_count"]
+        
+        source_namespace = source["doc_namespace"] or ChatSessionModel.get_session_namespace(
+            source["user_id"], source["chat_session_id"]
+        )
+        try:
+            if self.vector_service.copy_document_vectors(content_hash, source["chunk_count"], source_namespace,
+                                                         DOCUMENT_VECTOR_NAMESPACE):
+                return source["chunk_count"]
+        except Exception as e:
+            print(f"Could not reuse vectors for {content_hash[:12]}: {str(e)}")
+        return None
+    
     def clear_session_documents(self, user_id: str, session_id: str, base_upload_dir: str) -> str:
         """Clear all documents for a session"""
         doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
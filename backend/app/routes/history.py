@@ -1,3 +1,4 @@
+import asyncio
 from ..services.vector_service import VectorService
 from ..models.chat_session import ChatSessionModel
 from ..database.connection import get_user_sessions_from_db, get_session_document_count
@@ -27,60 +28,7 @@ class HistoryRouter:
                 print(f"Looking for chat history in namespace: {chat_namespace}")
                 docs = self.vector_service.get_chat_history(chat_namespace, k=100)
                 print(f"Found {len(docs)} documents in namespace {chat_namespace}")
-
-                # Process individual messages instead of Q&A pairs
-                messages = []
-                for doc in docs:
-                    content = doc.page_content
-                    metadata = doc.metadata if hasattr(doc, 'metadata') else {}
-                    
-                    print(f"Processing message: {content[:50]}... with metadata: {metadata}")
-                    
-                    # Extract role and timestamp from metadata
-                    role = metadata.get('role', 'unknown')
-                    timestamp = metadata.get('timestamp', None)
-                    message_type = metadata.get('type', 'unknown')
-                    
-                    if role in ['user', 'assistant'] and content.strip():
-                        message = {
-                            "user_id": user_id,
-                            "session_id": sid,
-                            "role": role,
-                            "content": content.strip(),
-                            "timestamp": timestamp,
-                            "type": message_type
-                        }
-                        messages.append(message)
-                        print(f"Added {role} message to history")
-
-                # Sort messages by timestamp to maintain conversation order
-                messages.sort(key=lambda x: x.get('timestamp', ''))
-                
-                # Group messages into conversation pairs for display
-                i = 0
-                while i < len(messages):
-                    if i + 1 < len(messages) and messages[i]['role'] == 'user' and messages[i + 1]['role'] == 'assistant':
-                        # Found a question-answer pair
-                        full_history.append({
-                            "user_id": user_id,
-                            "session_id": sid,
-                            "question": messages[i]['content'],
-                            "answer": messages[i + 1]['content'],
-                            "timestamp": messages[i + 1]['timestamp']  # Use answer timestamp
-                        })
-                        print(f"Created Q&A pair: {messages[i]['content'][:30]}...")
-                        i += 2  # Skip both messages
-                    else:
-                        # Handle orphaned messages (shouldn't happen in normal flow)
-                        if messages[i]['role'] == 'user':
-                            full_history.append({
-                                "user_id": user_id,
-                                "session_id": sid,
-                                "question": messages[i]['content'],
-                                "answer": "No response recorded",
-                                "timestamp": messages[i]['timestamp']
-                            })
-                        i += 1
+                full_history.extend(self._build_session_history(user_id, sid, docs))
 
             print(f"Total history items found: {len(full_history)}")
             return full_history
@@ -89,6 +37,89 @@ class HistoryRouter:
             print(f"Error in get_chat_history: {str(e)}")
             return [{"error": f"Error loading chat history: {str(e)}"}]
 
+    def _build_session_history(self, user_id: str, sid: str, docs: List) -> List[Dict]:
+        """Turn a session's stored chat messages into question/answer pairs"""
+        history = []
+
+        # Process individual messages instead of Q&A pairs
+        messages = []
+        for doc in docs:
+            content = doc.page_content
+            metadata = doc.metadata if hasattr(doc, 'metadata') else {}
+            
+            print(f"Processing message: {content[:50]}... with metadata: {metadata}")
+            
+            # Extract role and timestamp from metadata
+            role = metadata.get('role', 'unknown')
+            timestamp = metadata.get('timestamp', None)
+            message_type = metadata.get('type', 'unknown')
+            
+            if role in ['user', 'assistant'] and content.strip():
+                message = {
+                    "user_id": user_id,
+                    "session_id": sid,
+                    "role": role,
+                    "content": content.strip(),
+                    "timestamp": timestamp,
+                    "type": message_type
+                }
+                messages.append(message)
+                print(f"Added {role} message to history")
+
+        # Sort messages by timestamp to maintain conversation order
+        messages.sort(key=lambda x: x.get('timestamp', ''))
+        
+        # Group messages into conversation pairs for display
+        i = 0
+        while i < len(messages):
+            if i + 1 < len(messages) and messages[i]['role'] == 'user' and messages[i + 1]['role'] == 'assistant':
+                # Found a question-answer pair
+                history.append({
+                    "user_id": user_id,
+                    "session_id": sid,
+                    "question": messages[i]['content'],
+                    "answer": messages[i + 1]['content'],
+                    "timestamp": messages[i + 1]['timestamp']  # Use answer timestamp
+                })
+                print(f"Created Q&A pair: {messages[i]['content'][:30]}...")
+                i += 2  # Skip both messages
+            else:
+                # Handle orphaned messages (shouldn't happen in normal flow)
+                if messages[i]['role'] == 'user':
+                    history.append({
+                        "user_id": user_id,
+                        "session_id": sid,
+                        "question": messages[i]['content'],
+                        "answer": "No response recorded",
+                        "timestamp": messages[i]['timestamp']
+                    })
+                i += 1
+
+        return history
+
+    async def aget_chat_history(self, user_id: str, session_id: str = None) -> List[Dict]:
+        """Async version of get_chat_history; sessions are loaded concurrently"""
+        try:
+            if session_id:
+                session_ids = [session_id]
+            else:
+                all_sessions = await self.aget_all_user_sessions(user_id)
+                session_ids = [s["session_id"] for s in all_sessions if "session_id" in s]
+
+            session_docs = await asyncio.gather(*[
+                self.vector_service.aget_chat_history(ChatSessionModel.get_chat_namespace(user_id, sid), k=100)
+                for sid in session_ids
+            ])
+
+            full_history = []
+            for sid, docs in zip(session_ids, session_docs):
+                full_history.extend(self._build_session_history(user_id, sid, docs))
+            return full_history
+
+        except Exception as e:
+            print(f"Error in get_chat_history: {str(e)}")
+            return [{"error": f"Error loading chat history: {str(e)}"}]
+
     def get_all_user_sessions(self, user_id: str) -> List[Dict]:
         """Return all sessions for the user from the database"""
         try:
@@ -104,3 +135,7 @@ class HistoryRouter:
         except Exception as e:
             print(f"Error loading sessions: {str(e)}")
             return [{"error": f"Error loading sessions: {str(e)}"}]
+
+    async def aget_all_user_sessions(self, user_id: str) -> List[Dict]:
+        """Async version of get_all_user_sessions"""
+        return await asyncio.to_thread(self.get_all_user_sessions, user_id)
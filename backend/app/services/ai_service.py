@@ -1,47 +1,38 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
 from .vector_service import VectorService
-from typing import List
+from ..database.connection import get_session_document_count
+from ..utils.metrics import track, timed, record_llm_usage, estimate_tokens
+from ..utils.rate_limiter import llm_governor
+from ..utils.single_flight import coalesce, normalize_text, single_flight
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+import contextvars
+from typing import Iterator, List, Tuple
 from datetime import datetime
 import os
+import re
+import time
+import asyncio
 from dotenv import load_dotenv
 import logging
 
+# LangChain and the Gemini SDK are imported inside the methods that use them to keep startup fast
+
 # Load environment variables
 load_dotenv()
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-class AIService:
-    def __init__(self):
-        try:
-            self.vector_service = VectorService()
-            
-            # Initialize Google Gemini model
-            google_api_key = os.getenv("GOOGLE_API_KEY")
-            if not google_api_key:
-                logger.warning("GOOGLE_API_KEY not found. Using fallback response mode.")
-                self.model = None
-            else:
-                self.model = ChatGoogleGenerativeAI(
-                    model="models/gemini-2.5-pro", 
-                    temperature=0.7,
-                    google_api_key=google_api_key
-                )
-                
-        except Exception as e:
-            logger.error(f"Error initializing AI Service: {str(e)}")
-            self.model = None
-            self.vector_service = None
-        
-    def get_qa_chain(self):
-        """Get question-answering chain"""
-        if not self.model:
-            return None
-            
-        prompt_template = """
+# Fan-out settings for technical question generation
+QUESTION_FANOUT_GROUP_SIZE = int(os.getenv("QUESTION_FANOUT_GROUP_SIZE", "3"))
+QUESTION_FANOUT_MAX_WORKERS = int(os.getenv("QUESTION_FANOUT_MAX_WORKERS", "5"))
+QUESTION_FANOUT_TIMEOUT = float(os.getenv("QUESTION_FANOUT_TIMEOUT", "60"))
+
+# Batch ask: most questions per call, and answers generated concurrently
+BATCH_ASK_MAX_QUESTIONS = int(os.getenv("BATCH_ASK_MAX_QUESTIONS", "20"))
+BATCH_ASK_MAX_WORKERS = int(os.getenv("BATCH_ASK_MAX_WORKERS", "5"))
+
+# Prompt used to answer questions from retrieved PDF chunks
+QA_PROMPT_TEMPLATE = """
 You are a helpful AI assistant. Use the following extracted context from the user's PDF documents to answer the question accurately and comprehensively.
 
 Instructions:
@@ -59,7 +50,72 @@ User Question:
 
 Detailed Answer:
 """
-        prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
+
+def create_chat_model():
+    """Build the Gemini chat model, or None when it is not configured"""
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        logger.warning("GOOGLE_API_KEY not found. Using fallback response mode.")
+        return None
+    
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model="models/gemini-2.5-pro", 
+        temperature=0.7,
+        google_api_key=google_api_key,
+        # Retries are done by llm_governor, which also backs off every other call on a 429
+        max_retries=1
+    )
+
+# Keys under which concurrent identical calls share one execution (see coalesce)
+def _namespace_key(self, namespace: str, *args, **kwargs) -> tuple:
+    return (namespace,)
+
+def _questions_key(self, tech_stack: str, difficulty: str, fan_out: bool = False) -> tuple:
+    technologies = tuple(normalize_text(technology) for technology in self._split_tech_stack(tech_stack or ""))
+    return (technologies, normalize_text(difficulty), bool(fan_out))
+
+def _question_key(self, question: str, namespace: str, *args, **kwargs) -> tuple:
+    return (normalize_text(question), namespace)
+
+class AIService:
+    def __init__(self):
+        try:
+            self.vector_service = VectorService()
+            
+            # Initialize Google Gemini model
+            self.model = create_chat_model()
+                
+        except Exception as e:
+            logger.error(f"Error initializing AI Service: {str(e)}")
+            self.model = None
+            self.vector_service = None
+        
+    def _invoke_model(self, prompt: str):
+        """Call the chat model through the rate limiter, recording generation latency and token usage"""
+        with track("llm.generate"):
+            result = llm_governor.call(lambda: self.model.invoke(prompt), tokens=estimate_tokens(prompt))
+        _, completion_tokens = record_llm_usage(prompt, result, self._response_text(result))
+        llm_governor.charge_tokens(completion_tokens)
+        return result
+    
+    async def _ainvoke_model(self, prompt: str):
+        """Async version of _invoke_model"""
+        with track("llm.generate"):
+            result = await llm_governor.acall(lambda: self.model.ainvoke(prompt), tokens=estimate_tokens(prompt))
+        _, completion_tokens = record_llm_usage(prompt, result, self._response_text(result))
+        llm_governor.charge_tokens(completion_tokens)
+        return result
+    
+    @timed("llm.chain_setup")
+    def get_qa_chain(self):
+        """Get question-answering chain"""
+        if not self.model:
+            return None
+            
+        from langchain.chains.question_answering import load_qa_chain
+        from langchain.prompts import PromptTemplate
+        prompt = PromptTemplate(template=QA_PROMPT_TEMPLATE, input_variables=["context", "question"])
         return load_qa_chain(self.model, chain_type="stuff", prompt=prompt)
     
     def get_information_extraction_chain(self):
@@ -150,6 +206,8 @@ Document Content:
 
 Extracted Information:
 """
+        from langchain.chains.question_answering import load_qa_chain
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(template=prompt_template, input_variables=["context"])
         return load_qa_chain(self.model, chain_type="stuff", prompt=prompt)
     
@@ -206,33 +264,51 @@ Please ensure questions are relevant, practical, and test both knowledge and app
 
 Generated Questions:
 """
+        from langchain.prompts import PromptTemplate
         prompt = PromptTemplate(template=prompt_template, input_variables=["tech_stack", "difficulty", "difficulty_upper"])
         return prompt
 
-    def extract_user_information(self, namespace: str) -> str:
-        """Extract user information from uploaded documents with enhanced technical detection"""
-        try:
-            # Check if AI model is available
-            if not self.model:
-                return "ERROR: AI service is not properly configured. Please check your Google API key."
-            
-            if not self.vector_service:
-                return "ERROR: Vector service is not properly configured. Please check your Pinecone settings."
-            
-            # Get all documents from the namespace with maximum chunks
-            docs = self.vector_service.get_all_documents(namespace, k=50)
-            
-            if not docs:
-                return "WARNING: No documents found to extract information from. Please upload a PDF document first."
-            
-            # Log the found documents for debugging
-            logger.info(f"Found {len(docs)} document chunks for information extraction")
-            
-            # Combine all document content for better context
-            combined_content = "\n\n".join([doc.page_content for doc in docs])
+    def get_technical_questions_group_prompt(self):
+        """Get prompt for generating questions for one group of a fanned-out tech stack"""
+        if not self.model:
+            return None
             
-            # Enhanced extraction prompt with direct content injection
-            extraction_prompt = f"""
+        prompt_template = """
+You are an expert technical interviewer. Generate {question_count} technical interview questions for the technologies below at the specified difficulty level.
+
+Technologies: {tech_stack}
+Difficulty Level: {difficulty}
+
+**Instructions:**
+- For "Easy": Focus on basic concepts, syntax, and fundamental understanding
+- For "Medium": Include practical application, problem-solving, and intermediate concepts  
+- For "Hard": Cover advanced topics, optimization, design patterns, and complex scenarios
+- Only cover the technologies listed above
+
+**Format every question exactly as:**
+
+### 1. **Question 1:** [Your question here]
+   *Topic: [Related technology/concept]*
+   *Expected time: [X minutes]*
+
+Do not add a title, introduction, tips or any other text.
+
+Generated Questions:
+"""
+        from langchain.prompts import PromptTemplate
+        prompt = PromptTemplate(template=prompt_template, input_variables=["tech_stack", "difficulty", "question_count"])
+        return prompt
+
+    @staticmethod
+    def _response_text(result) -> str:
+        """Get the text content of a model response"""
+        if hasattr(result, 'content'):
+            return result.content.strip()
+        return str(result).strip()
+
+    def _build_user_info_prompt(self, combined_content: str) -> str:
+        """Build the user information extraction prompt for the given document content"""
+        return f"""
 You are an expert information extraction specialist. Extract comprehensive user information from this resume/document with MAXIMUM attention to technical skills scattered throughout ALL sections.
 
 RESUME/DOCUMENT CONTENT:
@@ -324,99 +400,10 @@ Scan ALL sections for technical content:
 
 **Extracted Information:**
 """
-            
-            # Use the model directly for more control
-            result = self.model.invoke(extraction_prompt)
-            
-            # Extract the content from the result
-            if hasattr(result, 'content'):
-                output_text = result.content.strip()
-            else:
-                output_text = str(result).strip()
-            
-            if not output_text:
-                output_text = "WARNING: Could not extract user information from the uploaded document."
-            
-            logger.info("Successfully extracted user information with enhanced technical detection")
-            return output_text
-            
-        except Exception as e:
-            logger.error(f"Information extraction error: {str(e)}")
-            return f"I'm sorry, I encountered an error while extracting information. Error: {str(e)}"
-    
-    def generate_technical_questions(self, tech_stack: str, difficulty: str) -> str:
-        """Generate technical questions based on tech stack and difficulty"""
-        try:
-            # Check if AI model is available
-            if not self.model:
-                return "ERROR: AI service is not properly configured. Please check your Google API key."
-            
-            # Validate difficulty level
-            valid_difficulties = ["easy", "medium", "hard"]
-            if difficulty.lower() not in valid_difficulties:
-                return f"ERROR: Invalid difficulty level. Please choose from: {', '.join(valid_difficulties)}"
-            
-            # Get technical questions generation prompt
-            prompt_template = self.get_technical_questions_chain()
-            if not prompt_template:
-                return "ERROR: Technical questions generation prompt could not be initialized."
-            
-            # Format the prompt with the tech stack and difficulty
-            formatted_prompt = prompt_template.format(
-                tech_stack=tech_stack,
-                difficulty=difficulty.title(),
-                difficulty_upper=difficulty.upper()
-            )
-            
-            # Generate questions using the model directly
-            result = self.model.invoke(formatted_prompt)
-            
-            # Extract the content from the result
-            if hasattr(result, 'content'):
-                output_text = result.content.strip()
-            else:
-                output_text = str(result).strip()
-            
-            if not output_text:
-                output_text = f"WARNING: Could not generate technical questions for the provided tech stack and {difficulty} difficulty level."
-            
-            logger.info(f"Successfully generated {difficulty} technical questions for tech stack: {tech_stack[:50]}...")
-            return output_text
-            
-        except Exception as e:
-            logger.error(f"Technical questions generation error: {str(e)}")
-            return f"I'm sorry, I encountered an error while generating technical questions. Error: {str(e)}"
 
-    def extract_tech_stack_only(self, namespace: str) -> str:
-        """Extract only the tech stack from uploaded documents with maximum aggression"""
-        try:
-            # Check if AI model is available
-            if not self.model:
-                return "ERROR: AI service is not properly configured. Please check your Google API key in the .env file."
-            
-            if not self.vector_service:
-                return "ERROR: Vector service is not properly configured. Please check your Pinecone API key in the .env file."
-            
-            # Test vector service connection before proceeding
-            try:
-                # Get all documents from the namespace with maximum chunks
-                docs = self.vector_service.get_all_documents(namespace, k=100)  # Even more chunks
-            except Exception as vector_error:
-                if "Unauthorized" in str(vector_error) or "Invalid API Key" in str(vector_error):
-                    return "ERROR: Pinecone authentication failed. Please check your PINECONE_API_KEY in the .env file."
-                elif "not found" in str(vector_error).lower():
-                    return "ERROR: Pinecone index not found. Please check your Pinecone configuration."
-                else:
-                    return f"ERROR: Vector service error - {str(vector_error)}"
-            
-            if not docs:
-                return "WARNING: No documents found to extract tech stack from. Please upload a PDF document first."
-            
-            # Combine all document content for better context
-            combined_content = "\n\n".join([doc.page_content for doc in docs])
-            
-            # Ultra-aggressive tech stack extraction with explicit skills section focus
-            tech_stack_prompt = f"""
+    def _build_tech_stack_prompt(self, combined_content: str) -> str:
+        """Build the tech stack extraction prompt for the given document content"""
+        return f"""
 EMERGENCY EXTRACTION MISSION: You are a forensic technical skill detector. Your job is to find EVERY SINGLE technical skill, technology, programming language, framework, tool, software, platform, methodology, or technical concept mentioned ANYWHERE in this document. MISSING EVEN ONE SKILL IS UNACCEPTABLE.
 
 DOCUMENT CONTENT TO ANALYZE:
@@ -476,22 +463,10 @@ DO NOT use bullet points, numbering, or multiple lines. Just comma-separated tec
 
 COMPLETE TECHNOLOGY EXTRACTION:
 """
-            
-            # Use the model directly for more control
-            result = self.model.invoke(tech_stack_prompt)
-            
-            # Extract the content from the result
-            if hasattr(result, 'content'):
-                tech_stack = result.content.strip()
-            else:
-                tech_stack = str(result).strip()
-            
-            # If the result seems incomplete, try a more targeted approach
-            if not tech_stack or len(tech_stack) < 100:
-                logger.warning("First extraction attempt yielded limited results, trying skills-focused approach")
-                
-                # Skills-focused extraction
-                skills_focused_prompt = f"""
+
+    def _build_skills_focused_prompt(self, combined_content: str) -> str:
+        """Build the fallback skills-section extraction prompt"""
+        return f"""
 FOCUS ON EXPLICIT SKILLS SECTIONS:
 
 Document:
@@ -520,20 +495,505 @@ DO NOT use bullet points, numbering, explanations, or multiple lines.
 
 COMPLETE LIST OF ALL TECHNOLOGIES FOUND:
 """
+
+    def _build_document_answer_prompt(self, docs: List, question: str) -> str:
+        """Stuff retrieved chunks into the QA prompt"""
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return QA_PROMPT_TEMPLATE.format(context=context, question=question)
+
+    def _build_general_prompt(self, question: str) -> str:
+        """Prompt used when no relevant document content was found"""
+        return f"""You are a helpful AI assistant. The user has asked a question but no relevant information was found in their uploaded documents. Please provide a helpful, general answer based on your knowledge.
+
+User Question: {question}
+
+Please provide a comprehensive and helpful answer. If this is a technical question, provide examples and best practices. If it's a general question, provide useful information and context.
+
+Format your response in a clear, organized manner with appropriate sections if needed."""
+
+    def _format_document_answer(self, output_text: str) -> str:
+        """Wrap a document-based answer for display"""
+        return f"""## Answer based on your documents:
+
+{output_text}
+
+---
+*Note: This answer is based on the content from your uploaded PDF documents.*"""
+
+    def _format_general_answer(self, output_text: str) -> str:
+        """Wrap a general (no documents) answer for display"""
+        return f"""## General AI Response:
+
+{output_text}
+
+---
+*Note: This is a general AI response since no relevant information was found in your uploaded documents. Consider uploading documents related to your question for more specific answers.*"""
+
+    def _format_question_error(self, error: Exception) -> str:
+        """Error message returned to the user when answering fails"""
+        return f"""ERROR: Error Processing Question
+
+I encountered an error while processing your question. Please try again.
+
+**Error Details:** {str(error)}
+
+**Troubleshooting Tips:**
+• Check your internet connection
+• Try rephrasing your question
+• Ensure your documents are properly uploaded"""
+
+    @coalesce("ai.extract_user_information", key=_namespace_key)
+    def extract_user_information(self, namespace: str) -> str:
+        """Extract user information from uploaded documents with enhanced technical detection"""
+        try:
+            # Check if AI model is available
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key."
+            
+            if not self.vector_service:
+                return "ERROR: Vector service is not properly configured. Please check your Pinecone settings."
+            
+            # Get all documents from the namespace with maximum chunks
+            docs = self.vector_service.get_all_documents(namespace, k=50)
+            
+            if not docs:
+                return "WARNING: No documents found to extract information from. Please upload a PDF document first."
+            
+            # Log the found documents for debugging
+            logger.info(f"Found {len(docs)} document chunks for information extraction")
+            
+            # Combine all document content for better context
+            combined_content = "\n\n".join([doc.page_content for doc in docs])
+            return self.extract_user_information_from_text(combined_content)
+            
+        except Exception as e:
+            logger.error(f"Information extraction error: {str(e)}")
+            return f"I'm sorry, I encountered an error while extracting information. Error: {str(e)}"
+    
+    def extract_user_information_from_text(self, combined_content: str) -> str:
+        """Extract user information from document text; raises if the model call fails"""
+        if not self.model:
+            raise RuntimeError("AI service is not properly configured. Please check your Google API key.")
+        
+        # Enhanced extraction prompt with direct content injection
+        extraction_prompt = self._build_user_info_prompt(combined_content)
+        
+        # Use the model directly for more control
+        result = self._invoke_model(extraction_prompt)
+        
+        # Extract the content from the result
+        if hasattr(result, 'content'):
+            output_text = result.content.strip()
+        else:
+            output_text = str(result).strip()
+        
+        if not output_text:
+            output_text = "WARNING: Could not extract user information from the uploaded document."
+        
+        logger.info("Successfully extracted user information with enhanced technical detection")
+        return output_text
+    
+    @coalesce("ai.extract_user_information", key=_namespace_key)
+    async def aextract_user_information(self, namespace: str) -> str:
+        """Async version of extract_user_information"""
+        try:
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key."
+            
+            if not self.vector_service:
+                return "ERROR: Vector service is not properly configured. Please check your Pinecone settings."
+            
+            docs = await self.vector_service.aget_all_documents(namespace, k=50)
+            
+            if not docs:
+                return "WARNING: No documents found to extract information from. Please upload a PDF document first."
+            
+            logger.info(f"Found {len(docs)} document chunks for information extraction")
+            combined_content = "\n\n".join([doc.page_content for doc in docs])
+            
+            result = await self._ainvoke_model(self._build_user_info_prompt(combined_content))
+            output_text = self._response_text(result)
+            
+            if not output_text:
+                output_text = "WARNING: Could not extract user information from the uploaded document."
+            
+            return output_text
+            
+        except Exception as e:
+            logger.error(f"Information extraction error: {str(e)}")
+            return f"I'm sorry, I encountered an error while extracting information. Error: {str(e)}"
+    
+    @coalesce("ai.generate_technical_questions", key=_questions_key)
+    def generate_technical_questions(self, tech_stack: str, difficulty: str, fan_out: bool = False) -> str:
+        """Generate technical questions based on tech stack and difficulty
+        
+        With fan_out=True the tech stack is split into groups that are generated
+        concurrently, so large stacks are bounded by the slowest group.
+        """
+        try:
+            # Check if AI model is available
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key."
+            
+            # Validate difficulty level
+            valid_difficulties = ["easy", "medium", "hard"]
+            if difficulty.lower() not in valid_difficulties:
+                return f"ERROR: Invalid difficulty level. Please choose from: {', '.join(valid_difficulties)}"
+            
+            if fan_out:
+                technologies = self._split_tech_stack(tech_stack)
+                if len(technologies) > QUESTION_FANOUT_GROUP_SIZE:
+                    return self._generate_technical_questions_fan_out(technologies, difficulty)
+            
+            # Get technical questions generation prompt
+            prompt_template = self.get_technical_questions_chain()
+            if not prompt_template:
+                return "ERROR: Technical questions generation prompt could not be initialized."
+            
+            # Format the prompt with the tech stack and difficulty
+            formatted_prompt = prompt_template.format(
+                tech_stack=tech_stack,
+                difficulty=difficulty.title(),
+                difficulty_upper=difficulty.upper()
+            )
+            
+            # Generate questions using the model directly
+            result = self._invoke_model(formatted_prompt)
+            
+            # Extract the content from the result
+            if hasattr(result, 'content'):
+                output_text = result.content.strip()
+            else:
+                output_text = str(result).strip()
+            
+            if not output_text:
+                output_text = f"WARNING: Could not generate technical questions for the provided tech stack and {difficulty} difficulty level."
+            
+            logger.info(f"Successfully generated {difficulty} technical questions for tech stack: {tech_stack[:50]}...")
+            return output_text
+            
+        except Exception as e:
+            logger.error(f"Technical questions generation error: {str(e)}")
+            return f"I'm sorry, I encountered an error while generating technical questions. Error: {str(e)}"
+
+    def _split_tech_stack(self, tech_stack: str) -> List[str]:
+        """Split a comma/newline separated tech stack into unique technology names"""
+        technologies = []
+        seen = set()
+        for item in re.split(r"[,;\n]", tech_stack):
+            item = item.strip().strip("- •*")
+            if item and item.lower() not in seen:
+                seen.add(item.lower())
+                technologies.append(item)
+        return technologies
+
+    def _parse_question_blocks(self, output_text: str) -> List[str]:
+        """Split a group response into question blocks, each starting with a "### N." heading"""
+        # Anything before the first heading (preamble, titles) is dropped
+        blocks = [block.strip() for block in re.split(r"(?m)^(?=###\s*\d+\.)", output_text)]
+        questions = [block for block in blocks if block.startswith("###")]
+        if not questions and output_text:
+            questions = [f"### 1. **Question 1:** {output_text}"]
+        return questions
+
+    def _format_question_group_prompt(self, technologies: List[str], difficulty: str) -> str:
+        """Format the group prompt for one slice of the tech stack"""
+        return self.get_technical_questions_group_prompt().format(
+            tech_stack=", ".join(technologies),
+            difficulty=difficulty.title(),
+            question_count=max(2, min(4, len(technologies) + 1))
+        )
+
+    def _group_tech_stack(self, technologies: List[str]) -> List[List[str]]:
+        """Split technologies into fan-out groups"""
+        return [
+            technologies[i:i + QUESTION_FANOUT_GROUP_SIZE]
+            for i in range(0, len(technologies), QUESTION_FANOUT_GROUP_SIZE)
+        ]
+
+    def _generate_question_group(self, technologies: List[str], difficulty: str) -> List[str]:
+        """Generate questions for one group of technologies and return the question blocks"""
+        result = self._invoke_model(self._format_question_group_prompt(technologies, difficulty))
+        return self._parse_question_blocks(self._response_text(result))
+
+    def _merge_question_groups(self, technologies: List[str], groups: List[List[str]], results: dict, failed_groups: List, difficulty: str) -> str:
+        """Merge per-group questions in group order so numbering does not depend on completion order"""
+        questions = []
+        for index in range(len(groups)):
+            questions.extend(results.get(index, []))
+        
+        if not questions:
+            return f"WARNING: Could not generate technical questions for the provided tech stack and {difficulty} difficulty level."
+        
+        numbered_questions = []
+        for number, block in enumerate(questions, start=1):
+            numbered_questions.append(re.sub(
+                r"^###\s*\d+\.\s*(\*\*Question\s*\d+:\*\*)?\s*",
+                f"### {number}. **Question {number}:** ",
+                block,
+                count=1
+            ))
+        
+        output_text = f"""# Technical Interview Questions ({difficulty.upper()} Level)
+
+**Tech Stack Covered:** {", ".join(technologies)}
+
+---
+
+## Questions:
+
+""" + "\n\n".join(numbered_questions) + """
+
+---
+
+## Interview Tips:
+- Allow candidates to think aloud and explain their reasoning
+- Look for problem-solving approach, not just correct answers
+- Be prepared with follow-up questions based on their responses"""
+        
+        if failed_groups:
+            skipped = [", ".join(groups[index]) + f" ({reason})" for index, reason in sorted(failed_groups)]
+            output_text += "\n\n*Note: Questions could not be generated for: " + "; ".join(skipped) + "*"
+        
+        logger.info(f"Successfully generated {len(numbered_questions)} {difficulty} questions across {len(groups)} groups")
+        return output_text
+
+    def _generate_technical_questions_fan_out(self, technologies: List[str], difficulty: str) -> str:
+        """Generate questions for groups of technologies concurrently and merge them in group order"""
+        groups = self._group_tech_stack(technologies)
+        logger.info(f"Fanning out question generation for {len(technologies)} technologies into {len(groups)} groups")
+        
+        started_at = {}
+        
+        def run_group(index: int, group: List[str]) -> List[str]:
+            started_at[index] = time.monotonic()
+            return self._generate_question_group(group, difficulty)
+        
+        results = {}
+        failed_groups = []
+        executor = ThreadPoolExecutor(
+            max_workers=min(QUESTION_FANOUT_MAX_WORKERS, len(groups)),
+            thread_name_prefix="question-fanout"
+        )
+        try:
+            # Each group runs in a copy of the caller's context, so its calls stay in the request's API lane
+            futures = {
+                executor.submit(contextvars.copy_context().run, run_group, i, group): i
+                for i, group in enumerate(groups)
+            }
+            pending = set(futures)
+            # Timed-out groups keep their worker threads, so queued groups may never start: the whole
+            # fan-out gets one timeout per wave of workers, counted from submission
+            waves = -(-len(groups) // min(QUESTION_FANOUT_MAX_WORKERS, len(groups)))
+            overall_deadline = time.monotonic() + QUESTION_FANOUT_TIMEOUT * waves
+            while pending:
+                # Wake up when a group finishes, when the oldest running group hits its timeout,
+                # or at the overall deadline
+                now = time.monotonic()
+                deadlines = [started_at[futures[f]] + QUESTION_FANOUT_TIMEOUT for f in pending if futures[f] in started_at]
+                wait_timeout = max(0.0, min(deadlines + [overall_deadline]) - now)
+                done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
                 
-                alternative_result = self.model.invoke(skills_focused_prompt)
-                if hasattr(alternative_result, 'content'):
-                    tech_stack = alternative_result.content.strip()
-                else:
-                    tech_stack = str(alternative_result).strip()
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        logger.warning(f"Question group {index + 1} failed: {str(e)}")
+                        failed_groups.append((index, "failed"))
+                
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if now >= overall_deadline:
+                        # Started or still queued behind hung groups
+                        future.cancel()
+                        logger.warning(f"Question group {index + 1} timed out: the fan-out ran out of time")
+                        failed_groups.append((index, "timed out"))
+                        pending.discard(future)
+                    elif index in started_at and now - started_at[index] >= QUESTION_FANOUT_TIMEOUT:
+                        logger.warning(f"Question group {index + 1} timed out after {QUESTION_FANOUT_TIMEOUT}s")
+                        failed_groups.append((index, "timed out"))
+                        pending.discard(future)
+        finally:
+            # Do not block on abandoned requests; they finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return self._merge_question_groups(technologies, groups, results, failed_groups, difficulty)
+
+    @coalesce("ai.generate_technical_questions", key=_questions_key)
+    async def agenerate_technical_questions(self, tech_stack: str, difficulty: str, fan_out: bool = False) -> str:
+        """Async version of generate_technical_questions"""
+        try:
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key."
+            
+            valid_difficulties = ["easy", "medium", "hard"]
+            if difficulty.lower() not in valid_difficulties:
+                return f"ERROR: Invalid difficulty level. Please choose from: {', '.join(valid_difficulties)}"
+            
+            if fan_out:
+                technologies = self._split_tech_stack(tech_stack)
+                if len(technologies) > QUESTION_FANOUT_GROUP_SIZE:
+                    return await self._agenerate_technical_questions_fan_out(technologies, difficulty)
+            
+            formatted_prompt = self.get_technical_questions_chain().format(
+                tech_stack=tech_stack,
+                difficulty=difficulty.title(),
+                difficulty_upper=difficulty.upper()
+            )
+            result = await self._ainvoke_model(formatted_prompt)
+            output_text = self._response_text(result)
+            
+            if not output_text:
+                output_text = f"WARNING: Could not generate technical questions for the provided tech stack and {difficulty} difficulty level."
+            
+            return output_text
+            
+        except Exception as e:
+            logger.error(f"Technical questions generation error: {str(e)}")
+            return f"I'm sorry, I encountered an error while generating technical questions. Error: {str(e)}"
+
+    async def _agenerate_technical_questions_fan_out(self, technologies: List[str], difficulty: str) -> str:
+        """Async fan-out: groups run concurrently (bounded by a semaphore), each with its own timeout"""
+        groups = self._group_tech_stack(technologies)
+        semaphore = asyncio.Semaphore(QUESTION_FANOUT_MAX_WORKERS)
+        
+        async def run_group(group: List[str]) -> List[str]:
+            async with semaphore:
+                # The timeout starts once the group holds a slot, matching the threaded version
+                result = await asyncio.wait_for(
+                    self._ainvoke_model(self._format_question_group_prompt(group, difficulty)),
+                    timeout=QUESTION_FANOUT_TIMEOUT
+                )
+                return self._parse_question_blocks(self._response_text(result))
+        
+        outcomes = await asyncio.gather(*[run_group(group) for group in groups], return_exceptions=True)
+        
+        results = {}
+        failed_groups = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                logger.warning(f"Question group {index + 1} timed out after {QUESTION_FANOUT_TIMEOUT}s")
+                failed_groups.append((index, "timed out"))
+            elif isinstance(outcome, Exception):
+                logger.warning(f"Question group {index + 1} failed: {str(outcome)}")
+                failed_groups.append((index, "failed"))
+            else:
+                results[index] = outcome
+        
+        return self._merge_question_groups(technologies, groups, results, failed_groups, difficulty)
+
+    @coalesce("ai.extract_tech_stack", key=_namespace_key)
+    def extract_tech_stack_only(self, namespace: str) -> str:
+        """Extract only the tech stack from uploaded documents with maximum aggression"""
+        try:
+            # Check if AI model is available
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key in the .env file."
+            
+            if not self.vector_service:
+                return "ERROR: Vector service is not properly configured. Please check your Pinecone API key in the .env file."
+            
+            # Test vector service connection before proceeding
+            try:
+                # Get all documents from the namespace with maximum chunks
+                docs = self.vector_service.get_all_documents(namespace, k=100)  # Even more chunks
+            except Exception as vector_error:
+                return self._describe_vector_error(vector_error)
+            
+            if not docs:
+                return "WARNING: No documents found to extract tech stack from. Please upload a PDF document first."
+            
+            # Combine all document content for better context
+            combined_content = "\n\n".join([doc.page_content for doc in docs])
+            return self.extract_tech_stack_from_text(combined_content)
+            
+        except Exception as e:
+            logger.error(f"Tech stack extraction error: {str(e)}")
+            return f"Error extracting tech stack: {str(e)}"
+    
+    def extract_tech_stack_from_text(self, combined_content: str) -> str:
+        """Extract the tech stack from document text; raises if the model call fails"""
+        if not self.model:
+            raise RuntimeError("AI service is not properly configured. Please check your Google API key in the .env file.")
+        
+        # Ultra-aggressive tech stack extraction with explicit skills section focus
+        tech_stack_prompt = self._build_tech_stack_prompt(combined_content)
+        
+        # Use the model directly for more control
+        result = self._invoke_model(tech_stack_prompt)
+        
+        # Extract the content from the result
+        if hasattr(result, 'content'):
+            tech_stack = result.content.strip()
+        else:
+            tech_stack = str(result).strip()
+        
+        # If the result seems incomplete, try a more targeted approach
+        if not tech_stack or len(tech_stack) < 100:
+            logger.warning("First extraction attempt yielded limited results, trying skills-focused approach")
+            
+            # Skills-focused extraction
+            skills_focused_prompt = self._build_skills_focused_prompt(combined_content)
+            
+            alternative_result = self._invoke_model(skills_focused_prompt)
+            if hasattr(alternative_result, 'content'):
+                tech_stack = alternative_result.content.strip()
+            else:
+                tech_stack = str(alternative_result).strip()
+        
+        # Clean up the response to remove "not mentioned" items
+        tech_stack = self._clean_tech_stack_response(tech_stack)
+        
+        if not tech_stack:
+            tech_stack = "No tech stack information found in the document."
+        
+        logger.info(f"Successfully extracted tech stack: {tech_stack[:200]}...")
+        return tech_stack
+
+    def _describe_vector_error(self, vector_error: Exception) -> str:
+        """Map a vector store failure to a user-facing error message"""
+        if "Unauthorized" in str(vector_error) or "Invalid API Key" in str(vector_error):
+            return "ERROR: Pinecone authentication failed. Please check your PINECONE_API_KEY in the .env file."
+        elif "not found" in str(vector_error).lower():
+            return "ERROR: Pinecone index not found. Please check your Pinecone configuration."
+        return f"ERROR: Vector service error - {str(vector_error)}"
+
+    @coalesce("ai.extract_tech_stack", key=_namespace_key)
+    async def aextract_tech_stack_only(self, namespace: str) -> str:
+        """Async version of extract_tech_stack_only"""
+        try:
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key in the .env file."
+            
+            if not self.vector_service:
+                return "ERROR: Vector service is not properly configured. Please check your Pinecone API key in the .env file."
+            
+            try:
+                docs = await self.vector_service.aget_all_documents(namespace, k=100)
+            except Exception as vector_error:
+                return self._describe_vector_error(vector_error)
+            
+            if not docs:
+                return "WARNING: No documents found to extract tech stack from. Please upload a PDF document first."
+            
+            combined_content = "\n\n".join([doc.page_content for doc in docs])
+            
+            result = await self._ainvoke_model(self._build_tech_stack_prompt(combined_content))
+            tech_stack = self._response_text(result)
+            
+            # If the result seems incomplete, try a more targeted approach
+            if not tech_stack or len(tech_stack) < 100:
+                logger.warning("First extraction attempt yielded limited results, trying skills-focused approach")
+                alternative_result = await self._ainvoke_model(self._build_skills_focused_prompt(combined_content))
+                tech_stack = self._response_text(alternative_result)
             
-            # Clean up the response to remove "not mentioned" items
             tech_stack = self._clean_tech_stack_response(tech_stack)
             
             if not tech_stack:
                 tech_stack = "No tech stack information found in the document."
             
-            logger.info(f"Successfully extracted tech stack: {tech_stack[:200]}...")
             return tech_stack
             
         except Exception as e:
@@ -648,7 +1108,7 @@ COMPLETE LIST OF ALL TECHNOLOGIES FOUND:
         except Exception as e:
             logger.warning(f"Error cleaning tech stack response: {e}")
             return tech_stack  # Return original if cleaning fails
-            result = self.model.invoke(tech_stack_prompt)
+            result = self._invoke_model(tech_stack_prompt)
             
             # Extract the content from the result
             if hasattr(result, 'content'):
@@ -684,7 +1144,7 @@ Also find technologies mentioned in:
 COMPLETE LIST OF ALL TECHNOLOGIES:
 """
                 
-                alternative_result = self.model.invoke(skills_focused_prompt)
+                alternative_result = self._invoke_model(skills_focused_prompt)
                 if hasattr(alternative_result, 'content'):
                     tech_stack = alternative_result.content.strip()
                 else:
@@ -700,6 +1160,7 @@ COMPLETE LIST OF ALL TECHNOLOGIES:
             logger.error(f"Tech stack extraction error: {str(e)}")
             return f"Error extracting tech stack: {str(e)}"
 
+    @coalesce("ai.ask_question", key=_question_key)
     def ask_question(self, question: str, namespace: str) -> str:
         """Ask a question about the documents with fallback to general reasoning"""
         try:
@@ -712,67 +1173,144 @@ COMPLETE LIST OF ALL TECHNOLOGIES:
             
             # Search for relevant documents
             docs = self.vector_service.search_documents(question, namespace, k=5)
+            return self._answer_question(question, docs)
             
-            if docs and len(docs) > 0:
-                # Found relevant documents - use document-based answering
+        except Exception as e:
+            logger.error(f"AI Service error: {str(e)}")
+            return self._format_question_error(e)
+    
+    def _answer_question(self, question: str, docs: List) -> str:
+        """Answer from retrieved chunks, or with general AI reasoning when there are none"""
+        if docs and len(docs) > 0:
+            # Found relevant documents - use document-based answering
+            logger.info(f"Found {len(docs)} relevant document chunks for question: {question[:50]}...")
+            
+            # Get answer from AI based on documents ("stuff" the chunks into the QA prompt)
+            result = self._invoke_model(self._build_document_answer_prompt(docs, question))
+            output_text = self._response_text(result)
+            
+            if output_text:
+                logger.info(f"Successfully generated document-based answer for: {question[:50]}...")
+                return self._format_document_answer(output_text)
+        
+        # No relevant documents found or empty response - use general AI reasoning
+        logger.info(f"No relevant documents found, using general AI reasoning for: {question[:50]}...")
+        
+        # Use the model directly for general reasoning
+        response = self._invoke_model(self._build_general_prompt(question))
+        
+        logger.info(f"Successfully generated general AI answer for: {question[:50]}...")
+        return self._format_general_answer(self._response_text(response))
+    
+    def _answer_batch_question(self, question: str, namespace: str, docs: List) -> str:
+        try:
+            # Shares the answer with an identical ask_question call running at the same time
+            key = ("ai.ask_question",) + _question_key(self, question, namespace)
+            return single_flight.do(key, lambda: self._answer_question(question, docs))
+        except Exception as e:
+            logger.error(f"AI Service error: {str(e)}")
+            return self._format_question_error(e)
+    
+    def iter_ask_questions(self, questions: List[str], namespace: str) -> Iterator[Tuple[int, str]]:
+        """Answer several questions about the documents; yields (index, answer) as each answer is ready.
+        
+        All questions are embedded in one request and retrieved in parallel, sharing the
+        chunks they have in common (VectorService.search_documents_batch). Answers are then
+        generated concurrently, at most BATCH_ASK_MAX_WORKERS at once; repeated questions
+        are answered once. A failed answer is an error message, as with ask_question.
+        """
+        if not questions:
+            return
+        if not self.model or not self.vector_service:
+            error = ("ERROR: AI service is not properly configured. Please check your Google API key." if not self.model
+                     else "ERROR: Vector service is not properly configured. Please check your Pinecone settings.")
+            for index in range(len(questions)):
+                yield index, error
+            return
+        
+        # Indexes of each distinct question
+        distinct = {}
+        for index, question in enumerate(questions):
+            distinct.setdefault(normalize_text(question), []).append(index)
+        groups = list(distinct.values())
+        
+        with track("llm.batch_retrieval"):
+            doc_lists = self.vector_service.search_documents_batch(
+                [questions[indexes[0]] for indexes in groups], namespace, k=5
+            )
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(groups), BATCH_ASK_MAX_WORKERS)),
+                                      thread_name_prefix="batch-ask")
+        try:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._answer_batch_question,
+                                questions[indexes[0]], namespace, docs): indexes
+                for indexes, docs in zip(groups, doc_lists)
+            }
+            for future in as_completed(futures):
+                answer = future.result()
+                for index in futures[future]:
+                    yield index, answer
+        finally:
+            # A client that stops reading a stream cancels the answers that have not started
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def ask_questions(self, questions: List[str], namespace: str) -> List[str]:
+        """Answer several questions about the documents; answers are returned in question order"""
+        answers = [None] * len(questions)
+        for index, answer in self.iter_ask_questions(questions, namespace):
+            answers[index] = answer
+        return answers
+    
+    async def _asession_document_count(self, session_id: str):
+        """Number of documents recorded for a session, or None when unknown"""
+        if not session_id:
+            return None
+        return await asyncio.to_thread(get_session_document_count, session_id)
+    
+    @coalesce("ai.ask_question", key=_question_key)
+    async def aask_question(self, question: str, namespace: str, session_id: str = None) -> str:
+        """Async version of ask_question
+        
+        The query embedding and the session's document count are loaded concurrently;
+        retrieval is skipped when the database has no documents for the session.
+        """
+        try:
+            # Check if AI model is available
+            if not self.model:
+                return "ERROR: AI service is not properly configured. Please check your Google API key."
+            
+            if not self.vector_service:
+                return "ERROR: Vector service is not properly configured. Please check your Pinecone settings."
+            
+            docs = []
+            if self.vector_service.embeddings and self.vector_service.pc:
+                try:
+                    vector, document_count = await asyncio.gather(
+                        self.vector_service.aembed_query(question),
+                        self._asession_document_count(session_id)
+                    )
+                    if document_count != 0:
+                        docs = await self.vector_service.aquery_by_vector(vector, namespace, k=5)
+                except Exception as e:
+                    logger.error(f"❌ Error searching documents: {str(e)}")
+                    docs = []
+            
+            if docs:
                 logger.info(f"Found {len(docs)} relevant document chunks for question: {question[:50]}...")
-                
-                # Get answer from AI based on documents
-                chain = self.get_qa_chain()
-                if not chain:
-                    return "ERROR: AI chain could not be initialized. Please check your configuration."
-                
-                result = chain({"input_documents": docs, "question": question}, return_only_outputs=True)
-                output_text = result.get("output_text", "").strip()
+                result = await self._ainvoke_model(self._build_document_answer_prompt(docs, question))
+                output_text = self._response_text(result)
                 
                 if output_text:
-                    # Format the response nicely
-                    formatted_response = f"""## Answer based on your documents:
-
-{output_text}
-
----
-*Note: This answer is based on the content from your uploaded PDF documents.*"""
-                    logger.info(f"Successfully generated document-based answer for: {question[:50]}...")
-                    return formatted_response
+                    return self._format_document_answer(output_text)
             
-            # No relevant documents found or empty response - use general AI reasoning
             logger.info(f"No relevant documents found, using general AI reasoning for: {question[:50]}...")
-            
-            general_prompt = f"""You are a helpful AI assistant. The user has asked a question but no relevant information was found in their uploaded documents. Please provide a helpful, general answer based on your knowledge.
-
-User Question: {question}
-
-Please provide a comprehensive and helpful answer. If this is a technical question, provide examples and best practices. If it's a general question, provide useful information and context.
-
-Format your response in a clear, organized manner with appropriate sections if needed."""
-
-            # Use the model directly for general reasoning
-            response = self.model.invoke(general_prompt)
-            
-            # Format the general response
-            formatted_response = f"""## General AI Response:
-
-{response.content if hasattr(response, 'content') else str(response)}
-
----
-*Note: This is a general AI response since no relevant information was found in your uploaded documents. Consider uploading documents related to your question for more specific answers.*"""
-            
-            logger.info(f"Successfully generated general AI answer for: {question[:50]}...")
-            return formatted_response
+            response = await self._ainvoke_model(self._build_general_prompt(question))
+            return self._format_general_answer(self._response_text(response))
             
         except Exception as e:
             logger.error(f"AI Service error: {str(e)}")
-            return f"""ERROR: Error Processing Question
-
-I encountered an error while processing your question. Please try again.
-
-**Error Details:** {str(e)}
-
-**Troubleshooting Tips:**
-• Check your internet connection
-• Try rephrasing your question
-• Ensure your documents are properly uploaded"""
+            return self._format_question_error(e)
     
     def ask_question_original(self, question: str, user_id: str, session_id: str, chat_namespace: str, doc_namespace: str) -> str:
         """Ask a question about the documents (original method)"""
@@ -785,7 +1323,11 @@ I encountered an error while processing your question. Please try again.
             
             # Get answer from AI
             chain = self.get_qa_chain()
-            result = chain({"input_documents": docs, "question": question}, return_only_outputs=True)
+            with track("llm.generate"):
+                result = llm_governor.call(
+                    lambda: chain({"input_documents": docs, "question": question}, return_only_outputs=True),
+                    tokens=estimate_tokens(question) + sum(estimate_tokens(doc.page_content) for doc in docs)
+                )
             output_text = result.get("output_text", "").strip()
             
             if not output_text:
@@ -808,7 +1350,7 @@ I encountered an error while processing your question. Please try again.
             }
             print(f"Storing user question in namespace: {chat_namespace}")
             print(f"Question ID: {question_id}, Content: {question}")
-            self.vector_service.store_chat_message(question, chat_namespace, question_metadata)
+            self.vector_service.enqueue_chat_message(question, chat_namespace, question_metadata)
             
             # Store AI response
             response_metadata = {
@@ -822,7 +1364,7 @@ I encountered an error while processing your question. Please try again.
             }
             print(f"Storing AI response in namespace: {chat_namespace}")
             print(f"Response ID: {response_id}, Content: {output_text[:100]}...")
-            self.vector_service.store_chat_message(output_text, chat_namespace, response_metadata)
+            self.vector_service.enqueue_chat_message(output_text, chat_namespace, response_metadata)
             
             return output_text
             
@@ -0,0 +1,194 @@
+import os
+import logging
+from typing import Callable, List
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Index type of local namespaces: flat (exact brute force) or ivf (IVF-Flat approximate search)
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "flat").lower()
+# An ivf namespace is searched exactly until it holds this many vectors, then the IVF index is trained
+LOCAL_IVF_MIN_VECTORS = int(os.getenv("LOCAL_IVF_MIN_VECTORS", "20000"))
+# Inverted lists (k-means centroids); 0 picks sqrt(vectors) at training time
+LOCAL_IVF_NLIST = int(os.getenv("LOCAL_IVF_NLIST", "0"))
+# Lists scanned per query (recall vs latency); a query can override it with nprobe=
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "8"))
+# The index is retrained once the namespace has grown this many times since the last training
+LOCAL_IVF_RETRAIN_GROWTH = float(os.getenv("LOCAL_IVF_RETRAIN_GROWTH", "4"))
+# k-means iterations and training sample size per centroid
+LOCAL_IVF_TRAIN_ITERATIONS = int(os.getenv("LOCAL_IVF_TRAIN_ITERATIONS", "10"))
+LOCAL_IVF_TRAIN_SAMPLES_PER_LIST = int(os.getenv("LOCAL_IVF_TRAIN_SAMPLES_PER_LIST", "64"))
+
+# Rows scored per matrix product when assigning vectors to centroids
+ASSIGN_CHUNK_ROWS = 16384
+
+
+def default_nlist(vector_count: int) -> int:
+    return LOCAL_IVF_NLIST or max(1, int(np.sqrt(vector_count)))
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid of each (unit) vector"""
+    assignment = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], ASSIGN_CHUNK_ROWS):
+        chunk = vectors[start:start + ASSIGN_CHUNK_ROWS]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = LOCAL_IVF_TRAIN_ITERATIONS,
+                    samples_per_list: int = LOCAL_IVF_TRAIN_SAMPLES_PER_LIST, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (cosine) on a sample of unit vectors; returns nlist unit centroids"""
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, vectors.shape[0]))
+    sample_size = min(vectors.shape[0], nlist * samples_per_list)
+    sample = np.asarray(vectors[np.sort(rng.choice(vectors.shape[0], sample_size, replace=False))],
+                        dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = nearest_centroids(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+        used = np.flatnonzero(counts)
+        sums = np.add.reduceat(sample[order], np.concatenate(([0], np.cumsum(counts[used])[:-1])), axis=0)
+        centroids[used] = sums
+        # Empty lists restart from random sample vectors
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = sample[rng.choice(sample_size, empty.size, replace=False)]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms == 0, 1.0, norms)
+    return centroids
+
+
+class IVFIndex:
+    """IVF-Flat index over the rows of a namespace's vector matrix.
+
+    Each row is kept in the inverted list of its nearest k-means centroid. A query
+    scores the centroids, gathers the rows of the `nprobe` best lists and lets the
+    caller score those exactly, so the vectors themselves are not duplicated.
+    Inserts go to their nearest list without retraining; removed rows leave a
+    tombstone (-1) in their list, and a list is compacted once half of it is
+    tombstones.
+    """
+
+    def __init__(self, centroids: np.ndarray, trained_size: int = 0):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nlist = self.centroids.shape[0]
+        self.trained_size = trained_size
+        self._lists: List[np.ndarray] = [np.empty(16, dtype=np.int64) for _ in range(self.nlist)]
+        self._sizes = np.zeros(self.nlist, dtype=np.int64)
+        self._dead = np.zeros(self.nlist, dtype=np.int64)
+        # Row -> list and position in it (-1 when not indexed)
+        self.assignment = np.full(0, -1, dtype=np.int32)
+        self._positions = np.full(0, -1, dtype=np.int64)
+
+    @classmethod
+    def train(cls, rows: np.ndarray, read: Callable[[np.ndarray], np.ndarray], nlist: int = None,
+              seed: int = 0) -> "IVFIndex":
+        """Train centroids on a sample of rows and index all of them; read(rows) returns their unit vectors"""
+        nlist = nlist or default_nlist(len(rows))
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(rows), nlist * LOCAL_IVF_TRAIN_SAMPLES_PER_LIST)
+        sample = read(np.sort(rng.choice(rows, sample_size, replace=False)))
+        index = cls(train_centroids(sample, nlist, seed=seed), trained_size=len(rows))
+        # Rows are read chunk by chunk, so a namespace larger than memory can be indexed
+        for start in range(0, len(rows), ASSIGN_CHUNK_ROWS):
+            chunk = rows[start:start + ASSIGN_CHUNK_ROWS]
+            index.add(chunk, read(chunk))
+        return index
+
+    @classmethod
+    def from_assignment(cls, centroids: np.ndarray, assignment: np.ndarray, trained_size: int = 0) -> "IVFIndex":
+        """Rebuild the lists from a saved row -> list assignment (-1 = not indexed)"""
+        index = cls(centroids, trained_size)
+        rows = np.flatnonzero(assignment >= 0)
+        index._ensure_rows(len(assignment))
+        lists = assignment[rows]
+        order = np.argsort(lists, kind="stable")
+        rows, lists = rows[order], lists[order]
+        counts = np.bincount(lists, minlength=index.nlist)
+        start = 0
+        for list_id in range(index.nlist):
+            members = rows[start:start + counts[list_id]]
+            start += counts[list_id]
+            index._lists[list_id] = np.concatenate((members, np.empty(16, dtype=np.int64)))
+            index._sizes[list_id] = len(members)
+            index.assignment[members] = list_id
+            index._positions[members] = np.arange(len(members))
+        return index
+
+    def _ensure_rows(self, size: int):
+        if size <= len(self.assignment):
+            return
+        capacity = max(size, len(self.assignment) * 2, 64)
+        assignment = np.full(capacity, -1, dtype=np.int32)
+        assignment[:len(self.assignment)] = self.assignment
+        positions = np.full(capacity, -1, dtype=np.int64)
+        positions[:len(self._positions)] = self._positions
+        self.assignment, self._positions = assignment, positions
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Index rows (unit vectors); rows already indexed are moved to their new list"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return
+        self._ensure_rows(int(rows.max()) + 1)
+        self.remove(rows)
+        lists = nearest_centroids(np.asarray(vectors, dtype=np.float32), self.centroids)
+        order = np.argsort(lists, kind="stable")
+        list_ids, starts = np.unique(lists[order], return_index=True)
+        for list_id, members in zip(list_ids, np.split(rows[order], starts[1:])):
+            size = self._sizes[list_id]
+            needed = size + len(members)
+            if needed > len(self._lists[list_id]):
+                grown = np.empty(max(needed, len(self._lists[list_id]) * 2), dtype=np.int64)
+                grown[:size] = self._lists[list_id][:size]
+                self._lists[list_id] = grown
+            self._lists[list_id][size:needed] = members
+            self._sizes[list_id] = needed
+            self.assignment[members] = list_id
+            self._positions[members] = np.arange(size, needed)
+
+    def remove(self, rows: np.ndarray):
+        """Tombstone rows in their lists"""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < len(self.assignment)]
+        rows = rows[self.assignment[rows] >= 0]
+        for row in rows:
+            list_id = self.assignment[row]
+            self._lists[list_id][self._positions[row]] = -1
+            self._dead[list_id] += 1
+            self.assignment[row] = -1
+            self._positions[row] = -1
+            if self._dead[list_id] * 2 > self._sizes[list_id]:
+                self._compact(list_id)
+
+    def _compact(self, list_id: int):
+        members = self._lists[list_id][:self._sizes[list_id]]
+        members = members[members >= 0]
+        self._lists[list_id] = np.concatenate((members, np.empty(16, dtype=np.int64)))
+        self._sizes[list_id] = len(members)
+        self._dead[list_id] = 0
+        self._positions[members] = np.arange(len(members))
+
+    def probe(self, query: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Rows (sorted) in the nprobe lists whose centroids are most similar to the (unit) query"""
+        nprobe = max(1, min(nprobe or LOCAL_IVF_NPROBE, self.nlist))
+        scores = self.centroids @ query
+        lists = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else range(self.nlist)
+        rows = np.concatenate([self._lists[list_id][:self._sizes[list_id]] for list_id in lists])
+        # In row order, like the other candidate sets (and gathered from memory in order)
+        return np.sort(rows[rows >= 0])
+
+    def indexed_count(self) -> int:
+        return int((self._sizes - self._dead).sum())
+
+    def needs_retraining(self, vector_count: int) -> bool:
+        return LOCAL_IVF_RETRAIN_GROWTH > 0 and vector_count >= self.trained_size * LOCAL_IVF_RETRAIN_GROWTH
+
+    def describe(self) -> dict:
+        return {"type": "ivf", "nlist": self.nlist, "indexed": self.indexed_count(), "trained_size": self.trained_size}
@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+from typing import Iterator, List
+from .upload_writer import UploadWriter, SavedUpload
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Blobs younger than this are never garbage-collected, so an upload that has written its
+# blob but not yet its documents row is not raced
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+
+class BlobStore:
+    """Content-addressed storage for uploaded PDFs: <root>/objects/<ab>/<sha256>.
+
+    Identical files are stored once however many sessions upload them. The documents
+    table is the reference count: a blob with no rows pointing at its hash is garbage.
+    """
+
+    def __init__(self, root: str):
+        self.objects_dir = os.path.join(root, "objects")
+        self.staging_dir = os.path.join(self.objects_dir, "staging")
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self.path_for(content_hash))
+
+    def commit(self, temp_path: str, content_hash: str) -> str:
+        """Move a staged file to its blob path; if the blob already exists the copy is dropped"""
+        path = self.path_for(content_hash)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            # Refresh the mtime so the GC grace period covers this new reference
+            os.utime(path, None)
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return path
+
+    def save_uploads(self, uploaded_files, writer: UploadWriter = None) -> List[SavedUpload]:
+        """Stream, validate and store uploaded files; file_path of each result is the blob path"""
+        writer = writer or UploadWriter()
+        staged = writer.stage_all(uploaded_files, self.staging_dir)
+        saved = []
+        for temp_path, upload in staged:
+            existed = self.exists(upload.content_hash)
+            upload.file_path = self.commit(temp_path, upload.content_hash)
+            upload.deduplicated = existed
+            logger.info(
+                f"Stored upload {upload.filename} as blob {upload.content_hash[:12]}"
+                + (" (already stored)" if existed else "")
+            )
+            saved.append(upload)
+        return saved
+
+    def delete(self, content_hash: str) -> int:
+        """Remove a blob; returns the bytes freed"""
+        path = self.path_for(content_hash)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        try:
+            # Drop the prefix directory once its last blob is gone
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        return size
+
+    def iter_hashes(self) -> Iterator[str]:
+        if not os.path.isdir(self.objects_dir):
+            return
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.startswith(prefix):
+                    yield name
+
+    def collect_garbage(self, referenced_hashes: set, dry_run: bool = False,
+                        grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> dict:
+        """Delete blobs that no document references (and stale staging files)"""
+        now = time.time()
+        report = {"blobs": 0, "bytes": 0, "hashes": []}
+        for content_hash in list(self.iter_hashes()):
+            if content_hash in referenced_hashes:
+                continue
+            path = self.path_for(content_hash)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime < grace_seconds:
+                continue
+            report["blobs"] += 1
+            report["bytes"] += stat.st_size
+            report["hashes"].append(content_hash)
+            if not dry_run:
+                self.delete(content_hash)
+
+        # Staging files left behind by crashed uploads
+        if os.path.isdir(self.staging_dir):
+            for name in os.listdir(self.staging_dir):
+                path = os.path.join(self.staging_dir, name)
+                try:
+                    if now - os.stat(path).st_mtime >= grace_seconds and not dry_run:
+                        os.remove(path)
+                except OSError:
+                    continue
+        return report
@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from typing import Callable, List, Optional
+from ..utils.metrics import metrics, Counter, track
+from ..utils.rate_limiter import api_lane, LANE_BULK
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Chat messages are persisted by a background thread instead of on the request path;
+# false stores every message synchronously as before
+CHAT_WRITE_BUFFER = os.getenv("CHAT_WRITE_BUFFER", "true").lower() == "true"
+# Pending messages are stored every CHAT_BUFFER_FLUSH_SECONDS, or as soon as this many are pending
+CHAT_BUFFER_MAX_BATCH = int(os.getenv("CHAT_BUFFER_MAX_BATCH", "64"))
+CHAT_BUFFER_FLUSH_SECONDS = float(os.getenv("CHAT_BUFFER_FLUSH_SECONDS", "1.0"))
+# Pending messages are journaled here until they are stored
+CHAT_JOURNAL_DIR = os.getenv("CHAT_JOURNAL_DIR", os.path.join(BACKEND_DIR, "cache", "chat_journal"))
+# fsync every journal append (survives power loss, not only a process crash)
+CHAT_JOURNAL_FSYNC = os.getenv("CHAT_JOURNAL_FSYNC", "true").lower() == "true"
+# How often journal files of exited processes are looked for and replayed; where it cannot be
+# told whether the writing process still runs, files untouched for this long are taken over
+CHAT_JOURNAL_RECOVER_SECONDS = int(os.getenv("CHAT_JOURNAL_RECOVER_SECONDS", "30"))
+
+chat_buffer_messages = metrics.register(Counter(
+    "agi_chat_buffer_messages_total",
+    "Chat messages through the write-behind buffer by result (queued/stored/failed/recovered/discarded)"
+))
+
+
+class ChatWriteBuffer:
+    """Write-behind buffer for chat messages of all sessions.
+
+    append() journals the message to a local append-only file and returns; a
+    background thread embeds the pending messages in one batch and upserts them
+    grouped by namespace, through the writer given to start()
+    (VectorService.store_chat_messages). A journal file is deleted once all of its
+    messages are stored. Journal files left behind by a crashed process are replayed
+    by the next process that starts, or by another worker within
+    CHAT_JOURNAL_RECOVER_SECONDS. Message IDs are assigned at append time, so
+    replaying a message that was already stored overwrites the same vector.
+    """
+
+    def __init__(self, journal_dir: str = CHAT_JOURNAL_DIR, max_batch: int = CHAT_BUFFER_MAX_BATCH,
+                 flush_seconds: float = CHAT_BUFFER_FLUSH_SECONDS, fsync: bool = CHAT_JOURNAL_FSYNC,
+                 recover_seconds: int = CHAT_JOURNAL_RECOVER_SECONDS):
+        self.journal_dir = journal_dir
+        self.max_batch = max(1, max_batch)
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.recover_seconds = recover_seconds
+        self._writer: Optional[Callable[[List[dict]], None]] = None
+        self._cond = threading.Condition()
+        self._reset()
+        self._exit_hook = False
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._journal_path = None
+        self._segments = set()
+        self._pending: List[dict] = []
+        self._inflight: List[dict] = []
+        self._seq = 0
+        self._flush_requested = False
+        self._last_recovery = 0.0
+
+    def _check_fork(self):
+        # A forked worker inherits the parent's pending list and journal handle, which stay the parent's
+        if self._pid != os.getpid():
+            self._reset()
+
+    def start(self, writer: Callable[[List[dict]], None]):
+        """Set the function storing a batch of messages and start the flush thread of this process"""
+        with self._cond:
+            self._check_fork()
+            self._writer = writer
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="chat-write-buffer", daemon=True)
+        self._thread.start()
+        if not self._exit_hook:
+            atexit.register(self.flush, 5.0)
+            self._exit_hook = True
+
+    def append(self, message: str, namespace: str, metadata: dict) -> str:
+        """Journal a chat message and queue it; returns the message's vector ID suffix"""
+        entry = {
+            "id": str(metadata.get("message_id") or uuid.uuid4()),
+            "namespace": namespace,
+            "text": message,
+            "metadata": metadata,
+            "queued_at": time.time(),
+        }
+        with self._cond:
+            self._check_fork()
+            self._write_journal(entry)
+            self._queue(entry)
+            if self._writer:
+                self._ensure_thread()
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        chat_buffer_messages.inc(result="queued")
+        return entry["id"]
+
+    def _queue(self, entry: dict):
+        self._seq += 1
+        entry["seq"] = self._seq
+        self._pending.append(entry)
+
+    def _write_journal(self, entry: dict):
+        if self._journal is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._journal_path = os.path.join(self.journal_dir, f"{os.getpid()}-{uuid.uuid4().hex[:12]}.jsonl")
+            self._journal = open(self._journal_path, "a", encoding="utf-8")
+            self._segments.add(self._journal_path)
+        record = {key: value for key, value in entry.items() if key != "seq"}
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        entry["segment"] = self._journal_path
+
+    def _rotate_journal(self):
+        """Close the current journal file; new appends go to a new one"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            self._journal_path = None
+
+    def has_pending(self, namespace: str) -> bool:
+        with self._cond:
+            self._check_fork()
+            return any(entry["namespace"] == namespace for entry in self._pending + self._inflight)
+
+    def discard(self, namespace: str) -> int:
+        """Drop pending messages of a namespace (it is being cleared); returns how many were dropped.
+
+        The journal files holding them are rewritten without them (or deleted when
+        nothing else in them is pending), so recovery does not bring them back.
+        """
+        with self._cond:
+            self._check_fork()
+            # A batch being stored may still write to the namespace (its failed messages come back)
+            self._cond.wait_for(
+                lambda: all(entry["namespace"] != namespace for entry in self._inflight), timeout=10.0
+            )
+            dropped = [entry for entry in self._pending if entry["namespace"] == namespace]
+            if dropped:
+                self._pending = [entry for entry in self._pending if entry["namespace"] != namespace]
+                self._compact_segments({entry["segment"] for entry in dropped if entry.get("segment")})
+        if dropped:
+            chat_buffer_messages.inc(len(dropped), result="discarded")
+        return len(dropped)
+
+    def _compact_segments(self, segments: set):
+        """Rewrite journal files with only their entries still pending or being stored; called with the lock held"""
+        if self._journal_path in segments:
+            self._rotate_journal()
+        live = {}
+        for entry in self._pending + self._inflight:
+            if entry.get("segment") in segments:
+                live.setdefault(entry["segment"], []).append(entry)
+        for segment in segments:
+            entries = live.get(segment)
+            try:
+                if not entries:
+                    os.remove(segment)
+                    self._segments.discard(segment)
+                    continue
+                temp_path = f"{segment}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    for entry in entries:
+                        record = {key: value for key, value in entry.items() if key not in ("seq", "segment")}
+                        f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                os.replace(temp_path, segment)
+            except OSError as e:
+                logger.warning(f"Could not remove discarded chat messages from journal {segment}: {str(e)}")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until the messages appended so far are stored; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._check_fork()
+            if not self._writer:
+                return not self._pending
+            self._ensure_thread()
+            target = self._seq
+            self._flush_requested = True
+            self._cond.notify_all()
+            while any(entry["seq"] <= target for entry in self._pending + self._inflight):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._flush_requested or len(self._pending) >= self.max_batch,
+                                    timeout=self.flush_seconds)
+                self._flush_requested = False
+                if self._pid != os.getpid():
+                    return
+            if self.recover_seconds >= 0 and time.time() - self._last_recovery >= max(self.recover_seconds, 1):
+                self._recover()
+            self._flush_pending()
+
+    def _flush_pending(self):
+        with self._cond:
+            if not self._pending or not self._writer:
+                return
+            self._rotate_journal()
+            self._inflight, self._pending = self._pending, []
+            writer = self._writer
+
+        failed = []
+        batches = [self._inflight[start:start + self.max_batch]
+                   for start in range(0, len(self._inflight), self.max_batch)]
+        for batch in batches:
+            try:
+                # Interactive calls go first when the embedding API is the bottleneck
+                with track("chat_buffer.flush"), api_lane(LANE_BULK):
+                    writer(batch)
+                chat_buffer_messages.inc(len(batch), result="stored")
+            except Exception as e:
+                logger.warning(f"Storing {len(batch)} buffered chat messages failed, will retry: {str(e)}")
+                chat_buffer_messages.inc(len(batch), result="failed")
+                failed.extend(batch)
+
+        with self._cond:
+            flushed_segments = {entry["segment"] for entry in self._inflight}
+            self._inflight = []
+            # Failed messages go back in front and are retried with the next flush
+            self._pending = failed + self._pending
+            still_needed = {entry["segment"] for entry in self._pending} | {self._journal_path}
+            for segment in flushed_segments - still_needed:
+                try:
+                    os.remove(segment)
+                except OSError:
+                    pass
+                self._segments.discard(segment)
+            self._cond.notify_all()
+        if failed:
+            time.sleep(self.flush_seconds)
+
+    def _recover(self):
+        """Queue the messages of journal files no live process is writing"""
+        self._last_recovery = time.time()
+        if not os.path.isdir(self.journal_dir):
+            return
+        recovered = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if not name.endswith(".jsonl") or path in self._segments:
+                continue
+            try:
+                owner_alive = self._owner_alive(name)
+                if owner_alive or (owner_alive is None
+                                   and self._last_recovery - os.path.getmtime(path) < self.recover_seconds):
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except OSError:
+                continue
+
+            entries = []
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line of a crashed process
+                    continue
+                entry["segment"] = path
+                entries.append(entry)
+            with self._cond:
+                self._segments.add(path)
+                for entry in entries:
+                    self._queue(entry)
+            if not entries:
+                self._forget_segment(path)
+            recovered += len(entries)
+
+        if recovered:
+            chat_buffer_messages.inc(recovered, result="recovered")
+            logger.info(f"♻️ Recovered {recovered} chat messages from the journal")
+
+    def _forget_segment(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._cond:
+            self._segments.discard(path)
+
+    @staticmethod
+    def _owner_alive(name: str) -> Optional[bool]:
+        """Whether the process that wrote a journal file still runs, or None if that cannot be told"""
+        try:
+            pid = int(name.split("-", 1)[0])
+        except ValueError:
+            return False
+        if pid == os.getpid():
+            # Left by an earlier run that had the same PID (e.g. PID 1 in a container)
+            return False
+        if os.name != "posix":
+            return None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+
+chat_buffer = ChatWriteBuffer()
@@ -1,4 +1,10 @@
 from .vector_service import VectorService
+from .blob_store import BlobStore
+from ..models.chat_session import ChatSessionModel
+from ..database.connection import (
+    delete_session_documents, get_referenced_content_hashes,
+    delete_session_records, get_user_sessions_from_db
+)
 import os
 import shutil
 
@@ -6,16 +12,27 @@ class DataService:
     def __init__(self):
         self.vector_service = VectorService()
     
-    def clear_session_data(self, user_id: str, session_id: str, doc_namespace: str, chat_namespace: str, upload_dir: str) -> str:
-        """Clear all data for a specific session"""
+    def clear_session_data(self, user_id: str, session_id: str, doc_namespace: str, chat_namespace: str, upload_dir: str,
+                           delete_session: bool = False) -> str:
+        """Clear all data for a specific session; with delete_session the session itself is removed too"""
         try:
-            # Clear document vectors
+            # Clear document vectors and chat history
             self.vector_service.clear_namespace(doc_namespace)
+            self.vector_service.clear_namespace(chat_namespace)
             
-            # Clear uploaded files
-            session_upload_dir = os.path.join(upload_dir, f"{user_id}_{session_id}")
-            if os.path.exists(session_upload_dir):
-                shutil.rmtree(session_upload_dir)
+            # Clear uploaded files (the directory get_session_upload_dir creates, and the older flat layout)
+            for session_upload_dir in (os.path.join(upload_dir, user_id, session_id),
+                                       os.path.join(upload_dir, f"{user_id}_{session_id}")):
+                if os.path.exists(session_upload_dir):
+                    shutil.rmtree(session_upload_dir)
+            
+            # Drop the session's document rows. Blobs and shared vectors no session references any more
+            # are left to the garbage collector: another session may be uploading the same PDF right now
+            # (BlobStore.commit found the blob and refreshed its mtime), and only the collector waits
+            # out BLOB_GC_GRACE_SECONDS before deleting.
+            delete_session_documents(session_id)
+            
+            delete_session_records(session_id, delete_session=delete_session)
             
             return "✅ Session data cleared successfully."
             
@@ -23,8 +40,20 @@ class DataService:
             return f"❌ Error clearing session data: {str(e)}"
     
     def clear_all_user_data(self, user_id: str, upload_dir: str) -> str:
-        """Clear all data for a user"""
+        """Clear all data for a user: every session with its vectors, files and records"""
         try:
+            for session in get_user_sessions_from_db(user_id):
+                session_id = session["session_id"]
+                result = self.clear_session_data(
+                    user_id, session_id,
+                    ChatSessionModel.get_session_namespace(user_id, session_id),
+                    ChatSessionModel.get_chat_namespace(user_id, session_id),
+                    upload_dir,
+                    delete_session=True
+                )
+                if result.startswith("❌"):
+                    return result
+            
             # Clear all user upload directories
             user_upload_dir = os.path.join(upload_dir, user_id)
             if os.path.exists(user_upload_dir):
@@ -35,6 +64,10 @@ class DataService:
         except Exception as e:
             return f"❌ Error clearing user data: {str(e)}"
     
+    def collect_unreferenced_blobs(self, upload_dir: str, dry_run: bool = False) -> dict:
+        """Delete stored PDFs that no document row references any more"""
+        return BlobStore(upload_dir).collect_garbage(get_referenced_content_hashes(), dry_run=dry_run)
+    
     def get_session_upload_dir(self, user_id: str, session_id: str, base_upload_dir: str) -> str:
         """Get upload directory for a specific session"""
         session_dir = os.path.join(base_upload_dir, user_id, session_id)
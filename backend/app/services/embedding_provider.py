@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from ..utils.metrics import metrics, Histogram
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Where embeddings are computed: google (embedding-001 API) or local (sentence-transformers on this machine)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+# sentence-transformers model of the local provider; all-mpnet-base-v2 has 768 dimensions like embedding-001
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+# Torch threads per process for local inference (0 = torch default, one per core)
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))
+# Local embed requests arriving within this window are encoded in one forward pass (0 = no waiting)
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+# Most texts per forward pass
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+
+embedding_batch_texts = metrics.register(Histogram(
+    "agi_embedding_batch_texts",
+    "Texts per local embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+))
+embedding_batch_requests = metrics.register(Histogram(
+    "agi_embedding_batch_requests",
+    "Embed requests merged into one local embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+
+
+def fit_dimension(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """Make unit vectors fit an index of another dimension.
+
+    Shorter vectors are zero-padded, which leaves cosine similarity unchanged. Longer
+    vectors are truncated and renormalized, which only keeps the ranking of models
+    trained for it (Matryoshka embeddings).
+    """
+    current = vectors.shape[1]
+    if current == dimension:
+        return vectors
+    if current < dimension:
+        return np.pad(vectors, ((0, 0), (0, dimension - current)))
+    vectors = vectors[:, :dimension]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class MicroBatcher:
+    """Merges the encode requests of concurrent threads into batched calls of one function.
+
+    A worker thread takes the first waiting request, waits up to `window_seconds` for
+    more (or until `max_batch` texts are waiting), encodes them all in one call and
+    hands every caller its own rows. Requests that arrive while a batch is being
+    encoded go into the next one, so under load batches grow without extra waiting.
+    A request larger than `max_batch` is encoded on its own.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], window_seconds: float, max_batch: int):
+        self.encode_batch = encode
+        self.window_seconds = max(0.0, window_seconds)
+        self.max_batch = max(1, max_batch)
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = deque()
+        self._queued_texts = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for encoding; the future's result is their vectors (lists of floats)"""
+        future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        with self._cond:
+            # A forked worker inherits neither the worker thread nor the parent's waiting requests
+            if self._pid != os.getpid():
+                self._reset()
+            self._queue.append((list(texts), future))
+            self._queued_texts += len(texts)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return future
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def _next_batch(self) -> list:
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue)
+            deadline = time.monotonic() + self.window_seconds
+            while self._queued_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            batch_texts = 0
+            while self._queue and (not batch or batch_texts + len(self._queue[0][0]) <= self.max_batch):
+                texts, future = self._queue.popleft()
+                self._queued_texts -= len(texts)
+                # Skips callers that were cancelled while waiting
+                if future.set_running_or_notify_cancel():
+                    batch.append((texts, future))
+                    batch_texts += len(texts)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            embedding_batch_texts.observe(len(texts))
+            embedding_batch_requests.observe(len(batch))
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(np.asarray(vectors[start:start + len(request_texts)]).tolist())
+                start += len(request_texts)
+
+
+class LocalEmbeddings:
+    """LangChain-compatible embeddings computed with a sentence-transformers model on this machine.
+
+    Embed calls of all threads (and event loops) of the process go through one
+    MicroBatcher, so concurrent uploads and queries share forward passes. Vectors are
+    normalized and fitted to the index dimension (see fit_dimension).
+    """
+
+    # Not subject to the embedding API's rate limits (VectorService skips embedding_governor)
+    rate_limited = False
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, dimension: int = None,
+                 device: str = LOCAL_EMBEDDING_DEVICE, window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch: int = EMBEDDING_MAX_BATCH):
+        from sentence_transformers import SentenceTransformer
+        if LOCAL_EMBEDDING_THREADS > 0:
+            import torch
+            torch.set_num_threads(LOCAL_EMBEDDING_THREADS)
+
+        started_at = time.perf_counter()
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_dimension = self.model.get_sentence_embedding_dimension()
+        self.dimension = dimension or self.model_dimension
+        self.max_batch = max(1, max_batch)
+        self.batcher = MicroBatcher(self._encode, window_ms / 1000.0, self.max_batch)
+
+        logger.info(f"🧮 Loaded local embedding model {model_name} ({self.model_dimension} dimensions) "
+                    f"in {time.perf_counter() - started_at:.1f}s")
+        if self.model_dimension < self.dimension:
+            logger.info(f"Local embeddings are zero-padded to the index dimension {self.dimension}")
+        elif self.model_dimension > self.dimension:
+            logger.warning(f"Local embeddings are truncated to the index dimension {self.dimension}; "
+                           f"use a Matryoshka model or an index with {self.model_dimension} dimensions")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.max_batch,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return fit_dimension(np.asarray(vectors, dtype=np.float32), self.dimension)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.batcher.encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.encode([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.wrap_future(self.batcher.submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def create_google_embeddings(dimension: int = None):
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        logger.warning("GOOGLE_API_KEY not found. Embeddings may not work.")
+        return None
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=google_api_key
+    )
+
+
+# Every service of a process shares one LocalEmbeddings per model and dimension: one copy of
+# the model in memory, and one MicroBatcher so uploads and queries share forward passes
+_local_embeddings: Dict[tuple, LocalEmbeddings] = {}
+_local_embeddings_lock = threading.Lock()
+_local_embeddings_pid = os.getpid()
+
+
+def create_local_embeddings(dimension: int = None):
+    global _local_embeddings_pid
+    key = (LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_DEVICE, dimension)
+    with _local_embeddings_lock:
+        # A forked worker loads its own model: torch's thread pools do not survive a fork
+        if _local_embeddings_pid != os.getpid():
+            _local_embeddings.clear()
+            _local_embeddings_pid = os.getpid()
+        embeddings = _local_embeddings.get(key)
+        if embeddings is None:
+            try:
+                embeddings = LocalEmbeddings(dimension=dimension)
+            except ImportError as e:
+                logger.error(f"EMBEDDING_PROVIDER=local needs sentence-transformers (pip install sentence-transformers): {str(e)}")
+                return None
+            _local_embeddings[key] = embeddings
+        return embeddings
+
+
+EMBEDDING_PROVIDERS = {
+    "google": create_google_embeddings,
+    "local": create_local_embeddings,
+}
+
+
+def create_embeddings(dimension: int = None, provider: str = None):
+    """Build the embeddings client of the configured provider, or None when it is not configured"""
+    provider = (provider or EMBEDDING_PROVIDER).lower()
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}' (expected one of {', '.join(EMBEDDING_PROVIDERS)})")
+    return EMBEDDING_PROVIDERS[provider](dimension)
@@ -0,0 +1,173 @@
+import os
+import json
+import zlib
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from ..utils.metrics import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backend root directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(BACKEND_DIR, "cache", "extraction"))
+# Total size of the compressed entries; 0 disables the cache
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+
+# Bump when the stored format or the extraction output changes, so old entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file on disk without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Extracted page texts on disk, keyed by the sha256 of the PDF bytes.
+
+    Entries are zlib-compressed JSON stored as <dir>/<first two hex chars>/<hash>.
+    Total size is bounded with least-recently-used eviction (a hit refreshes the
+    entry's mtime). Several processes may share the directory; each evicts from
+    its own view of the entries, and missing files are treated as misses.
+    """
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(EXTRACTION_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        # hash -> (size, last used), loaded from disk on first use
+        self._entries: Optional[Dict[str, list]] = None
+        self._total_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], content_hash)
+
+    def _load_entries(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(prefix_dir, name))
+                except FileNotFoundError:
+                    continue
+                self._entries[name] = [stat.st_size, stat.st_mtime]
+                self._total_bytes += stat.st_size
+
+    def get(self, content_hash: str) -> Optional[List[str]]:
+        """Cached page texts for a file hash, or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self._path(content_hash)
+        try:
+            with open(path, "rb") as f:
+                payload = json.loads(zlib.decompress(f.read()))
+            if payload.get("version") != CACHE_FORMAT_VERSION:
+                raise ValueError("stale cache format")
+        except FileNotFoundError:
+            metrics.record_cache("pdf_extraction", hit=False)
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable extraction cache entry {content_hash}: {str(e)}")
+            self._remove(content_hash)
+            metrics.record_cache("pdf_extraction", hit=False)
+            return None
+
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._load_entries()
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                entry[1] = now
+        metrics.record_cache("pdf_extraction", hit=True)
+        return payload["pages"]
+
+    def put(self, content_hash: str, pages: List[str]):
+        """Store page texts for a file hash and evict old entries beyond the size limit"""
+        if not self.enabled:
+            return
+        payload = {"version": CACHE_FORMAT_VERSION, "pages": pages}
+        data = zlib.compress(json.dumps(payload).encode("utf-8"), 6)
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(content_hash)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {content_hash}: {str(e)}")
+            return
+
+        with self._lock:
+            self._load_entries()
+            previous = self._entries.get(content_hash)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._entries[content_hash] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for content_hash, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(content_hash))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict extraction cache entry {content_hash}: {str(e)}")
+                continue
+            del self._entries[content_hash]
+            self._total_bytes -= size
+
+    def _remove(self, content_hash: str):
+        try:
+            os.remove(self._path(content_hash))
+        except OSError:
+            pass
+        with self._lock:
+            if self._entries is not None and content_hash in self._entries:
+                self._total_bytes -= self._entries.pop(content_hash)[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_entries()
+            return {"entries": len(self._entries), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+extraction_cache = ExtractionCache()
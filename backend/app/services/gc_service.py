@@ -0,0 +1,234 @@
+import os
+import time
+import shutil
+import logging
+from typing import Callable, List
+from .vector_service import VectorService, DOCUMENT_VECTOR_NAMESPACE
+from .blob_store import BlobStore, BLOB_GC_GRACE_SECONDS
+from .namespace_stats import namespace_stats
+from ..models.chat_session import ChatSessionModel
+from ..database.connection import (
+    get_live_sessions, find_orphaned_records, get_live_content_hashes, delete_records, list_vector_tenants
+)
+from ..utils.metrics import metrics, Counter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Deletions are issued in batches with a pause in between, so a large cleanup does not
+# saturate the vector store's rate limits or hold the SQLite write lock for long
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "100"))
+GC_BATCH_DELAY_SECONDS = float(os.getenv("GC_BATCH_DELAY_SECONDS", "0.5"))
+# How often the worker runs when started with --interval and no value
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "3600"))
+
+# Per-session namespaces (see ChatSessionModel); anything else in the index is left alone
+SESSION_NAMESPACE_PREFIXES = ("user_", "chat_")
+# Number of example names kept per category in the report
+REPORT_SAMPLE_SIZE = 10
+
+gc_deletions = metrics.register(Counter(
+    "agi_gc_deleted_total",
+    "Orphaned objects removed by the garbage collector"
+))
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class GarbageCollector:
+    """Finds and removes data that no longer belongs to any session.
+
+    chat_sessions is the source of truth. The collector removes, in order:
+    - documents, messages and summaries rows of sessions that do not exist;
+    - per-session document and chat namespaces of those sessions, including chat
+      namespaces stored as tenants of a shard namespace;
+    - chunks in the shared document namespace whose content hash no document references;
+    - per-session upload directories of those sessions;
+    - stored PDFs no document references.
+    Afterwards the namespace vector counts are reconciled with the index stats.
+    A dry run computes the same report without deleting or reconciling anything.
+    """
+
+    def __init__(self, upload_dir: str, vector_service: VectorService = None, batch_size: int = None,
+                 batch_delay: float = None, grace_seconds: int = BLOB_GC_GRACE_SECONDS):
+        self.upload_dir = upload_dir
+        self.vector_service = vector_service or VectorService()
+        self.batch_size = batch_size or GC_BATCH_SIZE
+        self.batch_delay = GC_BATCH_DELAY_SECONDS if batch_delay is None else batch_delay
+        self.grace_seconds = grace_seconds
+        self.blob_store = BlobStore(upload_dir)
+
+    def _in_batches(self, items: List, action: Callable[[List], None], dry_run: bool) -> int:
+        """Apply action to items batch by batch, pausing between batches; returns the number handled"""
+        if dry_run:
+            return len(items)
+        for start in range(0, len(items), self.batch_size):
+            if start:
+                time.sleep(self.batch_delay)
+            action(items[start:start + self.batch_size])
+        return len(items)
+
+    def run(self, dry_run: bool = False) -> dict:
+        """Run one collection pass and return a report of what was (or would be) deleted"""
+        started_at = time.perf_counter()
+        live_sessions = get_live_sessions()
+        report = {
+            "dry_run": dry_run,
+            "live_sessions": len(live_sessions),
+            "records": self.collect_records(dry_run),
+            "namespaces": self.collect_namespaces(live_sessions, dry_run),
+        }
+        # Only documents of existing sessions count as references (in a dry run the orphaned rows are still there)
+        live_hashes = get_live_content_hashes()
+        report["document_vectors"] = self.collect_document_vectors(live_hashes, dry_run)
+        report["upload_dirs"] = self.collect_upload_dirs(live_sessions, dry_run)
+        blobs = self.blob_store.collect_garbage(live_hashes, dry_run=dry_run, grace_seconds=self.grace_seconds)
+        report["blobs"] = {"count": blobs["blobs"], "bytes": blobs["bytes"],
+                           "sample": blobs["hashes"][:REPORT_SAMPLE_SIZE]}
+        if not dry_run and self.vector_service.pc:
+            index = self.vector_service.index()
+            report["namespace_stats_corrected"] = len(namespace_stats.reconcile(index))
+        report["seconds"] = round(time.perf_counter() - started_at, 3)
+
+        if not dry_run:
+            gc_deletions.inc(sum(report["records"].values()), kind="record")
+            gc_deletions.inc(report["namespaces"]["count"], kind="namespace")
+            gc_deletions.inc(report["document_vectors"]["count"], kind="vector")
+            gc_deletions.inc(report["upload_dirs"]["count"], kind="upload_dir")
+            gc_deletions.inc(report["blobs"]["count"], kind="blob")
+        return report
+
+    def collect_records(self, dry_run: bool = False) -> dict:
+        """Delete documents, messages and summaries rows whose session does not exist"""
+        counts = {}
+        for table, record_ids in find_orphaned_records().items():
+            counts[table] = self._in_batches(record_ids, lambda batch: delete_records(table, batch), dry_run)
+        return counts
+
+    def collect_namespaces(self, live_sessions: list, dry_run: bool = False) -> dict:
+        """Delete per-session namespaces of sessions that do not exist"""
+        result = {"count": 0, "vectors": 0, "sample": []}
+        if not self.vector_service.pc:
+            result["skipped"] = "vector store not configured"
+            return result
+
+        expected = set()
+        for user_id, session_id in live_sessions:
+            expected.add(ChatSessionModel.get_session_namespace(user_id, session_id))
+            expected.add(ChatSessionModel.get_chat_namespace(user_id, session_id))
+
+        index = self.vector_service.index()
+        stats = index.describe_index_stats()
+        orphaned = []
+        for namespace, stats_entry in stats.get('namespaces', {}).items():
+            if namespace.startswith(SESSION_NAMESPACE_PREFIXES) and namespace not in expected:
+                orphaned.append(namespace)
+                result["vectors"] += stats_entry.get('vector_count', 0)
+        # Sharded namespaces are only visible in vector_tenants
+        for tenant in list_vector_tenants():
+            if tenant["tenant"] not in expected and tenant["tenant"] not in orphaned:
+                orphaned.append(tenant["tenant"])
+                result["vectors"] += tenant["vector_count"]
+
+        def delete_namespaces(batch):
+            for namespace in batch:
+                self.vector_service.clear_namespace(namespace)
+
+        result["count"] = self._in_batches(orphaned, delete_namespaces, dry_run)
+        result["sample"] = orphaned[:REPORT_SAMPLE_SIZE]
+        return result
+
+    def _recent_upload_prefixes(self) -> set:
+        """Hash prefixes of blobs still inside the grace period (their documents row may not be written yet)"""
+        now = time.time()
+        prefixes = set()
+        for content_hash in self.blob_store.iter_hashes():
+            try:
+                if now - os.path.getmtime(self.blob_store.path_for(content_hash)) < self.grace_seconds:
+                    prefixes.add(content_hash[:16])
+            except OSError:
+                continue
+        return prefixes
+
+    def collect_document_vectors(self, live_hashes: set, dry_run: bool = False) -> dict:
+        """Delete chunks in the shared document namespace that no document references"""
+        result = {"count": 0, "documents": 0, "sample": []}
+        if not self.vector_service.pc:
+            result["skipped"] = "vector store not configured"
+            return result
+
+        index = self.vector_service.index()
+        if not hasattr(index, 'list'):
+            result["skipped"] = "index does not support listing vector IDs"
+            return result
+
+        # Chunk IDs are "<namespace>_<first 16 hex chars of the hash>_chunk_<i>" (VectorService.document_chunk_id)
+        id_prefix = f"{DOCUMENT_VECTOR_NAMESPACE}_"
+        keep = {content_hash[:16] for content_hash in live_hashes} | self._recent_upload_prefixes()
+        orphaned = []
+        orphaned_documents = set()
+        try:
+            for page in index.list(prefix=id_prefix, namespace=DOCUMENT_VECTOR_NAMESPACE):
+                for vector_id in page:
+                    hash_prefix = vector_id[len(id_prefix):len(id_prefix) + 16]
+                    if hash_prefix not in keep:
+                        orphaned.append(vector_id)
+                        orphaned_documents.add(hash_prefix)
+        except Exception as e:
+            # Listing is only available on serverless Pinecone indexes
+            logger.warning(f"Could not list document vectors: {str(e)}")
+            result["skipped"] = str(e)
+            return result
+
+        def delete_vectors(batch):
+            index.delete(ids=batch, namespace=DOCUMENT_VECTOR_NAMESPACE)
+            namespace_stats.record_delete(DOCUMENT_VECTOR_NAMESPACE, len(batch))
+
+        result["count"] = self._in_batches(orphaned, delete_vectors, dry_run)
+        result["documents"] = len(orphaned_documents)
+        result["sample"] = sorted(orphaned_documents)[:REPORT_SAMPLE_SIZE]
+        return result
+
+    def collect_upload_dirs(self, live_sessions: list, dry_run: bool = False) -> dict:
+        """Delete per-session upload directories (<user>/<session> and older <user>_<session>) of sessions that do not exist"""
+        result = {"count": 0, "bytes": 0, "sample": []}
+        if not os.path.isdir(self.upload_dir):
+            return result
+
+        live = set(live_sessions)
+        live_flat = {f"{user_id}_{session_id}" for user_id, session_id in live_sessions}
+        orphaned = []
+        for name in sorted(os.listdir(self.upload_dir)):
+            path = os.path.join(self.upload_dir, name)
+            if name == "objects" or not os.path.isdir(path):
+                continue
+            if "_" in name:
+                if name not in live_flat:
+                    orphaned.append(path)
+                continue
+            for session_id in sorted(os.listdir(path)):
+                session_path = os.path.join(path, session_id)
+                if os.path.isdir(session_path) and (name, session_id) not in live:
+                    orphaned.append(session_path)
+
+        def delete_dirs(batch):
+            for path in batch:
+                shutil.rmtree(path, ignore_errors=True)
+                # Remove a user directory once its last session directory is gone
+                parent = os.path.dirname(path)
+                if parent != self.upload_dir and os.path.isdir(parent) and not os.listdir(parent):
+                    os.rmdir(parent)
+
+        result["bytes"] = sum(_directory_size(path) for path in orphaned)
+        result["count"] = self._in_batches(orphaned, delete_dirs, dry_run)
+        result["sample"] = [os.path.relpath(path, self.upload_dir) for path in orphaned[:REPORT_SAMPLE_SIZE]]
+        return result
@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from ..database.connection import get_index_alias, get_index_projection, EMBEDDING_DIMENSION
+from ..utils.metrics import metrics, Counter
+from .projection import Projection
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# How often each process re-reads where its index alias points (a migration waits twice this long
+# after starting to mirror writes and after switching, so every process has seen the change)
+INDEX_ALIAS_REFRESH_SECONDS = float(os.getenv("INDEX_ALIAS_REFRESH_SECONDS", "10"))
+
+mirror_failures = metrics.register(Counter(
+    "agi_index_mirror_failures_total",
+    "Writes that reached the active index but could not be mirrored to the index being migrated to"
+))
+
+
+def index_dimension(client, index_name: str) -> Optional[int]:
+    """Dimension reported by describe_index (Pinecone IndexModel or the local client's dict)"""
+    description = client.describe_index(index_name)
+    if isinstance(description, dict):
+        return description.get("dimension")
+    return getattr(description, "dimension", None)
+
+
+class MirroredIndex:
+    """The active index of an alias whose writes are repeated, re-projected, on the index it is migrating to.
+
+    Reads only see the active index. A failed mirrored write is logged and counted;
+    the migration then finds the vector counts differ and does not switch.
+    """
+
+    def __init__(self, primary, secondary, projection: Projection):
+        self.primary = primary
+        self.secondary = secondary
+        self.projection = projection
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+    def _project(self, vectors: list) -> list:
+        values = self.projection.apply([
+            item["values"] if isinstance(item, dict) else item[1] for item in vectors
+        ]).tolist()
+        projected = []
+        for item, vector in zip(vectors, values):
+            if isinstance(item, dict):
+                projected.append(dict(item, values=vector))
+            else:
+                projected.append((item[0], vector) + tuple(item[2:]))
+        return projected
+
+    def upsert(self, vectors, namespace: str = "", **kwargs):
+        result = self.primary.upsert(vectors=vectors, namespace=namespace, **kwargs)
+        try:
+            if vectors:
+                self.secondary.upsert(vectors=self._project(list(vectors)), namespace=namespace, **kwargs)
+        except Exception as e:
+            mirror_failures.inc(operation="upsert")
+            logger.error(f"Could not mirror {len(vectors)} vectors to the migration target: {str(e)}")
+        return result
+
+    def delete(self, **kwargs):
+        result = self.primary.delete(**kwargs)
+        try:
+            self.secondary.delete(**kwargs)
+        except Exception as e:
+            # Deleting a namespace the target does not have yet is not an error
+            if "Namespace not found" not in str(e):
+                mirror_failures.inc(operation="delete")
+                logger.error(f"Could not mirror a delete to the migration target: {str(e)}")
+        return result
+
+
+class IndexTarget:
+    """Where an alias points at one moment: the active index and its projection, and the migration target"""
+
+    def __init__(self, index_name: str, projection: Projection, migrating_to: str = None,
+                 migration: Projection = None):
+        self.index_name = index_name
+        self.projection = projection
+        self.migrating_to = migrating_to
+        # Maps vectors of the active index to vectors of the migration target
+        self.migration = migration
+
+    def index(self, client):
+        index = client.Index(self.index_name)
+        if self.migrating_to:
+            return MirroredIndex(index, client.Index(self.migrating_to), self.migration)
+        return index
+
+
+class IndexAliases:
+    """Resolves an index alias to its physical index through the index_aliases table.
+
+    The row is re-read every INDEX_ALIAS_REFRESH_SECONDS, so a migration switches
+    running processes over without a restart. An alias without a row is the name
+    of the index itself, so existing deployments need no setup. Projections are
+    loaded once per physical index: they never change after the index is created.
+    """
+
+    def __init__(self, alias: str, refresh_seconds: float = INDEX_ALIAS_REFRESH_SECONDS):
+        self.alias = alias
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._row: Optional[dict] = None
+        self._loaded_at = float("-inf")
+        self._projections: Dict[str, Projection] = {}
+
+    def lookup(self, refresh: bool = False) -> dict:
+        """{"index_name", "migrating_to"} of the alias, re-read from the database when stale"""
+        with self._lock:
+            if refresh or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                row = get_index_alias(self.alias) or {"index_name": self.alias, "migrating_to": None}
+                if self._row is not None and row["index_name"] != self._row["index_name"]:
+                    logger.info(f"🔀 Index alias {self.alias} now points to {row['index_name']}")
+                self._row = row
+                self._loaded_at = time.monotonic()
+            return self._row
+
+    def index_name(self) -> str:
+        return self.lookup()["index_name"]
+
+    def projection(self, client, index_name: str) -> Projection:
+        """How embeddings are reduced for an index: its saved projection, else truncation to its dimension"""
+        projection = self._projections.get(index_name)
+        if projection is not None:
+            return projection
+        record = get_index_projection(index_name)
+        if record:
+            projection = Projection.from_bytes(record["projection"])
+        else:
+            dimension = index_dimension(client, index_name) if client is not None else None
+            projection = Projection.truncate(EMBEDDING_DIMENSION, dimension or EMBEDDING_DIMENSION)
+        if not projection.is_identity:
+            logger.info(f"Index {index_name} stores reduced embeddings: {projection.describe()}")
+        self._projections[index_name] = projection
+        return projection
+
+    def resolve(self, client) -> IndexTarget:
+        row = self.lookup()
+        projection = self.projection(client, row["index_name"])
+        if not row.get("migrating_to"):
+            return IndexTarget(row["index_name"], projection)
+        target_projection = self.projection(client, row["migrating_to"])
+        return IndexTarget(row["index_name"], projection, row["migrating_to"], target_projection.after(projection))
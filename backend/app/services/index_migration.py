@@ -0,0 +1,273 @@
+import re
+import time
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from .vector_service import VectorService, create_vector_client
+from .index_alias import INDEX_ALIAS_REFRESH_SECONDS
+from .projection import Projection, EMBEDDING_REDUCTION, PCA_FIT_SAMPLES, REDUCTIONS
+from ..database.connection import (
+    get_index_alias, set_index_alias, get_index_projection, save_index_projection
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Vectors fetched and upserted per request while backfilling (Pinecone's list pages hold 100 IDs)
+MIGRATION_BATCH_SIZE = 100
+# Sampled vectors used as queries when estimating the recall of the reduced vectors
+RECALL_QUERIES = 200
+RECALL_K = 10
+# How long the vector counts of the new index may take to catch up (Pinecone is eventually consistent)
+VERIFY_TIMEOUT_SECONDS = 120
+
+
+def _fetched_vectors(response) -> dict:
+    return response.vectors if hasattr(response, 'vectors') else response.get('vectors', {})
+
+
+def _vector_fields(vector):
+    values = vector.values if hasattr(vector, 'values') else vector['values']
+    metadata = (vector.metadata if hasattr(vector, 'metadata') else vector.get('metadata')) or {}
+    return values, metadata
+
+
+class IndexMigration:
+    """Moves an index alias to a new index holding reduced vectors, while the app keeps serving.
+
+    1. Fit the reduction (PCA or truncation) on vectors sampled from the current index
+       and estimate its recall@10 on the sample.
+    2. Save the new index's projection (the current one plus the new step) and create it.
+    3. Make the alias mirror writes to the new index, and wait until every process has
+       seen that, so nothing written during the backfill is missed.
+    4. Copy every namespace, re-projecting the stored vectors (no re-embedding).
+    5. Once the vector counts match, point the alias at the new index. Processes
+       switch within INDEX_ALIAS_REFRESH_SECONDS and embed new texts with the new
+       projection. The old index is kept (for rollback) unless drop_old is set.
+    """
+
+    def __init__(self, vector_service: VectorService = None, dimension: int = None, reduction: str = None,
+                 target_name: str = None, samples: int = PCA_FIT_SAMPLES, batch_size: int = MIGRATION_BATCH_SIZE,
+                 settle_seconds: float = None):
+        self.vector_service = vector_service or VectorService()
+        self.client = self.vector_service.pc
+        if self.client is None:
+            raise RuntimeError("Vector store not configured")
+        self.alias = self.vector_service.index_alias
+        self.reduction = (reduction or EMBEDDING_REDUCTION).lower()
+        if self.reduction not in REDUCTIONS:
+            raise ValueError(f"Unknown reduction '{self.reduction}' (expected one of {', '.join(REDUCTIONS)})")
+        self.samples = samples
+        self.batch_size = batch_size
+        self.settle_seconds = 2 * INDEX_ALIAS_REFRESH_SECONDS if settle_seconds is None else settle_seconds
+
+        row = get_index_alias(self.alias)
+        if row and row.get("migrating_to"):
+            raise RuntimeError(f"Alias {self.alias} is already being migrated to {row['migrating_to']}")
+        self.source_name = row["index_name"] if row else self.alias
+        self.source_projection = self.vector_service.aliases.projection(self.client, self.source_name)
+        self.dimension = dimension or self.source_projection.dimension
+        if self.dimension > self.source_projection.dimension:
+            raise ValueError(f"Target dimension {self.dimension} is larger than the current "
+                             f"{self.source_projection.dimension}; re-embed the documents instead")
+        self.target_name = target_name or self._default_target_name()
+
+    def _default_target_name(self) -> str:
+        # Pinecone index names: lowercase letters, digits and hyphens, at most 45 characters
+        base = re.sub(r"[^a-z0-9-]+", "-", self.alias.lower()).strip("-")[:24]
+        return f"{base}-{self.dimension}d-{time.strftime('%Y%m%d%H%M%S')}"
+
+    def namespace_counts(self, index) -> Dict[str, int]:
+        stats = index.describe_index_stats()
+        return {
+            namespace: stats_entry.get('vector_count', 0)
+            for namespace, stats_entry in stats.get('namespaces', {}).items()
+        }
+
+    def _iter_ids(self, index, namespace: str):
+        for page in index.list(namespace=namespace):
+            if page:
+                yield list(page)
+
+    def sample_vectors(self, index, counts: Dict[str, int], seed: int = 0) -> np.ndarray:
+        """Up to self.samples stored vectors, drawn at random from every namespace in proportion to its size"""
+        total = sum(counts.values())
+        rng = np.random.default_rng(seed)
+        vectors = []
+        for namespace, count in counts.items():
+            quota = int(np.ceil(self.samples * count / max(total, 1)))
+            ids = [vector_id for page in self._iter_ids(index, namespace) for vector_id in page]
+            if not ids or quota <= 0:
+                continue
+            chosen = [ids[i] for i in rng.choice(len(ids), min(quota, len(ids)), replace=False)]
+            for start in range(0, len(chosen), self.batch_size):
+                fetched = _fetched_vectors(index.fetch(ids=chosen[start:start + self.batch_size], namespace=namespace))
+                vectors.extend(_vector_fields(vector)[0] for vector in fetched.values())
+        if not vectors:
+            raise RuntimeError(f"Index {self.source_name} has no vectors to fit a projection on")
+        return np.asarray(vectors, dtype=np.float32)
+
+    def fit(self, sample: np.ndarray) -> Projection:
+        """The step from the current index's vectors to the new dimension"""
+        source_dimension = sample.shape[1]
+        if self.reduction == "pca" and self.dimension < source_dimension:
+            if len(sample) <= self.dimension:
+                raise ValueError(f"{len(sample)} sampled vectors are too few to fit {self.dimension} components")
+            return Projection.fit_pca(sample, self.dimension)
+        return Projection.truncate(source_dimension, self.dimension)
+
+    @staticmethod
+    def sample_recall(sample: np.ndarray, step: Projection, queries: int = RECALL_QUERIES, k: int = RECALL_K) -> float:
+        """Mean recall@k of the reduced vectors against the current ones, searching the sample with sampled queries"""
+        if len(sample) <= k + 1:
+            return 1.0
+        sample = sample / np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+        reduced = step.apply(sample)
+        recalls = []
+        for row in range(min(queries, len(sample))):
+            expected = np.argsort(-(sample @ sample[row]))[1:k + 1]
+            found = np.argsort(-(reduced @ reduced[row]))[1:k + 1]
+            recalls.append(len(set(expected) & set(found)) / k)
+        return float(np.mean(recalls))
+
+    def backfill(self, source, target, counts: Dict[str, int], step: Projection) -> int:
+        """Copy every namespace to the new index with re-projected vectors; returns the number copied.
+
+        A page fetched before a mirrored delete (a cleared session, the garbage collector)
+        can be upserted after it. So each page is checked against the source once it is
+        written, and vectors the source no longer has are deleted from the target again:
+        a delete that lands after the check is mirrored to the target anyway.
+        """
+        copied = 0
+        total = sum(counts.values())
+        for namespace in counts:
+            for ids in self._iter_ids(source, namespace):
+                for start in range(0, len(ids), self.batch_size):
+                    fetched = _fetched_vectors(source.fetch(ids=ids[start:start + self.batch_size], namespace=namespace))
+                    if not fetched:
+                        continue
+                    vector_ids = list(fetched)
+                    fields = [_vector_fields(fetched[vector_id]) for vector_id in vector_ids]
+                    values = step.apply([values for values, _ in fields]).tolist()
+                    target.upsert(
+                        vectors=[(vector_id, vector, dict(metadata))
+                                 for vector_id, vector, (_, metadata) in zip(vector_ids, values, fields)],
+                        namespace=namespace
+                    )
+                    remaining = _fetched_vectors(source.fetch(ids=vector_ids, namespace=namespace))
+                    deleted = [vector_id for vector_id in vector_ids if vector_id not in remaining]
+                    if deleted:
+                        target.delete(ids=deleted, namespace=namespace)
+                    copied += len(vector_ids) - len(deleted)
+            logger.info(f"Copied namespace '{namespace}' ({copied}/{total} vectors)")
+        return copied
+
+    def verify(self, source, target, timeout: float = VERIFY_TIMEOUT_SECONDS) -> List[tuple]:
+        """Wait for the new index's counts to match; returns the (namespace, current, new) pairs that still differ"""
+        deadline = time.monotonic() + timeout
+        while True:
+            current, migrated = self.namespace_counts(source), self.namespace_counts(target)
+            differences = [
+                (namespace, current.get(namespace, 0), migrated.get(namespace, 0))
+                for namespace in sorted(set(current) | set(migrated))
+                if current.get(namespace, 0) != migrated.get(namespace, 0)
+            ]
+            if not differences or time.monotonic() >= deadline:
+                return differences
+            time.sleep(2)
+
+    def _settle(self):
+        """Wait until every process has re-read the alias"""
+        self.vector_service.aliases.lookup(refresh=True)
+        if self.settle_seconds > 0:
+            time.sleep(self.settle_seconds)
+
+    def run(self, dry_run: bool = False, min_recall: float = 0.0, force: bool = False,
+            drop_old: bool = False) -> dict:
+        """Migrate the alias and return a report; with dry_run only fit and estimate recall"""
+        started_at = time.perf_counter()
+        source = self.client.Index(self.source_name)
+        counts = self.namespace_counts(source)
+        report = {
+            "alias": self.alias,
+            "source": self.source_name,
+            "target": self.target_name,
+            "source_dimension": self.source_projection.dimension,
+            "dimension": self.dimension,
+            "reduction": self.reduction,
+            "vectors": sum(counts.values()),
+            "namespaces": len(counts),
+            "dry_run": dry_run,
+            "switched": False,
+        }
+
+        sample = self.sample_vectors(source, counts)
+        step = self.fit(sample)
+        report["samples"] = len(sample)
+        report["projection"] = self.source_projection.then(step).describe()
+        report["sample_recall"] = round(self.sample_recall(sample, step), 4)
+        logger.info(f"📐 Fitted {report['projection']} on {len(sample)} vectors; "
+                    f"estimated recall@{RECALL_K} {report['sample_recall']:.3f}")
+        if report["sample_recall"] < min_recall and not force:
+            report["aborted"] = f"estimated recall {report['sample_recall']} is below {min_recall}"
+            return self._finish(report, started_at)
+        if dry_run:
+            return self._finish(report, started_at)
+
+        if get_index_projection(self.target_name) or self.target_name in self._index_names():
+            raise RuntimeError(f"Index {self.target_name} already exists; choose another target name")
+        projection = self.source_projection.then(step)
+        if not save_index_projection(self.target_name, projection.source_dimension, projection.dimension,
+                                     projection.to_bytes()):
+            raise RuntimeError("Could not save the projection of the new index")
+        target = create_vector_client(self.target_name).Index(self.target_name)
+        logger.info(f"Created index {self.target_name} ({self.dimension} dimensions)")
+
+        # From here on every process writes to both indexes
+        set_index_alias(self.alias, self.source_name, migrating_to=self.target_name)
+        self._settle()
+        try:
+            report["copied"] = self.backfill(source, target, counts, step)
+            differences = self.verify(source, target)
+        except Exception:
+            set_index_alias(self.alias, self.source_name)
+            raise
+        report["count_differences"] = differences[:20]
+        if differences and not force:
+            set_index_alias(self.alias, self.source_name)
+            report["aborted"] = f"vector counts differ in {len(differences)} namespaces; the alias was not switched"
+            return self._finish(report, started_at)
+
+        set_index_alias(self.alias, self.target_name)
+        report["switched"] = True
+        logger.info(f"🔀 Alias {self.alias} now points to {self.target_name}")
+        if drop_old and self.source_name != self.target_name:
+            # Processes that have not re-read the alias still query the old index
+            self._settle()
+            self.client.delete_index(self.source_name)
+            report["dropped"] = self.source_name
+            logger.info(f"🗑️ Deleted index {self.source_name}")
+        else:
+            self.vector_service.aliases.lookup(refresh=True)
+        return self._finish(report, started_at)
+
+    def _index_names(self) -> List[str]:
+        indexes = self.client.list_indexes()
+        return indexes.names() if hasattr(indexes, 'names') else [index["name"] for index in indexes]
+
+    @staticmethod
+    def _finish(report: dict, started_at: float) -> dict:
+        report["seconds"] = round(time.perf_counter() - started_at, 3)
+        return report
+
+
+def alias_status(alias: str) -> Optional[dict]:
+    """Where an alias points and the projection of that index"""
+    row = get_index_alias(alias) or {"alias": alias, "index_name": alias, "migrating_to": None}
+    status = dict(row)
+    for key in ("index_name", "migrating_to"):
+        record = get_index_projection(row[key]) if row.get(key) else None
+        if record:
+            status[f"{key}_projection"] = Projection.from_bytes(record["projection"]).describe()
+    return status
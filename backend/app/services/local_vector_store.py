@@ -0,0 +1,680 @@
+import os
+import json
+import time
+import atexit
+import shutil
+import threading
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+from .ann_index import IVFIndex, LOCAL_INDEX_TYPE, LOCAL_IVF_MIN_VECTORS
+from .quantization import (
+    CODECS, Int8Codes, PQCodes, disk_matrix, ADC_CHUNK_ROWS, PQ_TRAIN_SAMPLES,
+    LOCAL_VECTOR_QUANTIZATION, LOCAL_PQ_MIN_VECTORS, LOCAL_RESCORE_FACTOR
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Local indexes are saved here at exit and loaded (memory-mapped) on first use; unset keeps them in memory only
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "")
+
+# Rows copied per pass when saving a (possibly memory-mapped) matrix
+SAVE_CHUNK_ROWS = 65536
+
+
+class QueryMatch:
+    """A single query result (same attributes as a Pinecone match)"""
+
+    def __init__(self, id: str, score: float, metadata: dict, values: list = None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+        self.values = values or []
+
+
+class Vector:
+    """A stored vector (same attributes as a Pinecone fetch result entry)"""
+
+    def __init__(self, id: str, values: list, metadata: dict):
+        self.id = id
+        self.values = values
+        self.metadata = metadata
+
+
+class FetchResponse:
+    """Fetch result container (same attributes as a Pinecone fetch response)"""
+
+    def __init__(self, vectors: Dict[str, Vector], namespace: str):
+        self.vectors = vectors
+        self.namespace = namespace
+
+
+class QueryResponse:
+    """Query result container (same attributes as a Pinecone query response)"""
+
+    def __init__(self, matches: List[QueryMatch], namespace: str):
+        self.matches = matches
+        self.namespace = namespace
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq, $ne, $in, $nin, $gt/$gte/$lt/$lte, $and, $or)"""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+    return True
+
+
+def _replace_file(path: str, write):
+    """Write a file next to path and move it into place, so a reader never sees it half written"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        write(f)
+    os.replace(temp_path, path)
+
+
+def _save_rows(path: str, matrix: np.ndarray, rows: np.ndarray):
+    """Like np.save(path, matrix[rows]), copied in chunks so a memory-mapped matrix is never loaded whole"""
+    if rows.size == 0:
+        _replace_file(path, lambda f: np.save(f, matrix[rows]))
+        return
+    temp_path = f"{path}.tmp"
+    out = np.lib.format.open_memmap(temp_path, mode="w+", dtype=matrix.dtype, shape=(rows.size,) + matrix.shape[1:])
+    for start in range(0, rows.size, SAVE_CHUNK_ROWS):
+        out[start:start + SAVE_CHUNK_ROWS] = matrix[rows[start:start + SAVE_CHUNK_ROWS]]
+    out.flush()
+    del out
+    os.replace(temp_path, path)
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first"""
+    k = min(k, scores.size)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class _Namespace:
+    """Vectors of one namespace, stored as L2-normalised rows of a growable float32 matrix.
+
+    With index type ivf, a namespace of at least LOCAL_IVF_MIN_VECTORS vectors also
+    keeps an IVF index (see ann_index) and unfiltered queries only score the rows of
+    the probed lists.
+
+    With a quantization (int8 or pq, see quantization), queries scan compact codes
+    instead and the best LOCAL_RESCORE_FACTOR x k candidates are rescored with the
+    full-precision vectors. Those then live in a memory-mapped file rather than in
+    process memory, or are not kept at all with LOCAL_RESCORE_FACTOR=0.
+    """
+
+    def __init__(self, dimension: int, index_type: str = LOCAL_INDEX_TYPE,
+                 quantization: str = LOCAL_VECTOR_QUANTIZATION):
+        self.dimension = dimension
+        self.index_type = index_type
+        self.quantization = quantization
+        self.ann: Optional[IVFIndex] = None
+        # Int8Codes / PQCodes of every row when quantized
+        self.codes = None
+        # Unit vectors written since the last refresh(), by row: encoded and indexed in one batch
+        self._staged: Dict[int, np.ndarray] = {}
+        self.dirty = False
+        self.vectors = self._new_matrix(0)
+        self.ids: List[Optional[str]] = []
+        self.metadata: List[Optional[dict]] = []
+        self.rows: Dict[str, int] = {}
+        self.live = np.zeros(0, dtype=bool)
+        self.size = 0
+        # content_hash metadata -> rows, so a session's document filter does not scan the namespace
+        self.document_rows: Dict[str, set] = {}
+
+    def _new_matrix(self, capacity: int, source: np.ndarray = None) -> Optional[np.ndarray]:
+        """Full-precision matrix: in memory, memory-mapped when quantized, or none without rescoring"""
+        if self.quantization == "none":
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+            if source is not None:
+                vectors[:len(source)] = source
+            return vectors
+        if LOCAL_RESCORE_FACTOR <= 0:
+            return None
+        return disk_matrix(capacity, self.dimension, source)
+
+    def _grow(self, needed: int):
+        capacity = len(self.live)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        if self.vectors is not None:
+            self.vectors = self._new_matrix(new_capacity, self.vectors[:capacity])
+        if self.codes is not None:
+            self.codes.ensure(new_capacity)
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:capacity] = self.live
+        self.live = live
+
+    def upsert(self, vector_id: str, values, metadata: dict):
+        vector = np.asarray(values, dtype=np.float32)
+        if vector.shape != (self.dimension,):
+            raise ValueError(f"Vector dimension {vector.shape[-1]} does not match index dimension {self.dimension}")
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+
+        row = self.rows.get(vector_id)
+        if row is None:
+            row = self.size
+            self._grow(row + 1)
+            self.size += 1
+            self.ids.append(vector_id)
+            self.metadata.append(None)
+            self.rows[vector_id] = row
+        else:
+            self._unindex(row)
+        if self.vectors is not None:
+            self.vectors[row] = vector
+        self.metadata[row] = dict(metadata or {})
+        self.live[row] = True
+        self.dirty = True
+        if self.quantization != "none" or self.index_type == "ivf":
+            self._staged[row] = vector
+        content_hash = self.metadata[row].get("content_hash")
+        if content_hash is not None:
+            self.document_rows.setdefault(content_hash, set()).add(row)
+
+    def _unindex(self, row: int):
+        content_hash = (self.metadata[row] or {}).get("content_hash")
+        rows = self.document_rows.get(content_hash)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self.document_rows[content_hash]
+
+    def full(self, rows) -> np.ndarray:
+        """Unit vectors of rows: full precision when kept, otherwise decoded from the codes"""
+        if self.vectors is not None:
+            return np.asarray(self.vectors[rows], dtype=np.float32)
+        return self.codes.decode(rows)
+
+    def candidate_rows(self, filter: Optional[dict], query: np.ndarray = None, nprobe: int = None) -> np.ndarray:
+        """Live rows that may match a filter; a content_hash $eq/$in condition is answered from document_rows.
+        
+        Without a filter, an IVF namespace returns the rows of the lists probed for the query.
+        Other filters get every live row: the rows matching them (a tenant's messages, say) are
+        spread over all lists, so filtering the probed ones would return fewer than k matches.
+        """
+        if not filter:
+            return self._all_rows(query, nprobe)
+        condition = filter.get("content_hash")
+        if condition is None:
+            return self._all_rows()
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if set(condition) == {"$eq"}:
+            hashes = [condition["$eq"]]
+        elif set(condition) == {"$in"}:
+            hashes = condition["$in"]
+        else:
+            return self._all_rows()
+        rows = set()
+        for content_hash in hashes:
+            rows.update(self.document_rows.get(content_hash, ()))
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _all_rows(self, query: np.ndarray = None, nprobe: int = None) -> np.ndarray:
+        if self.ann is not None and query is not None:
+            return self.ann.probe(query, nprobe)
+        return np.flatnonzero(self.live[:self.size])
+
+    def search(self, query: np.ndarray, candidates: np.ndarray, k: int):
+        """The k best of the (sorted) candidate rows for a unit query and their scores, best first"""
+        # Candidates are sorted rows, so this is every row: score in place instead of gathering a copy
+        rows = slice(0, self.size) if candidates.size == self.size else candidates
+        if self.codes is None:
+            scores = self.vectors[rows] @ query
+        else:
+            scores = self.codes.scores(query, rows)
+            if self.vectors is not None:
+                # Rescoring: exact scores of the best candidates by quantized score
+                candidates = candidates[np.sort(_top(scores, k * LOCAL_RESCORE_FACTOR))]
+                scores = self.full(candidates) @ query
+        top = _top(scores, k)
+        return candidates[top], scores[top]
+
+    def delete(self, vector_id: str):
+        row = self.rows.pop(vector_id, None)
+        if row is not None:
+            self._unindex(row)
+            self.live[row] = False
+            self.ids[row] = None
+            self.metadata[row] = None
+            self.dirty = True
+            if self.ann is not None:
+                self.ann.remove([row])
+
+    def refresh(self):
+        """Encode and index the rows written since the last call.
+
+        Trains the PQ codebooks and the IVF index once the namespace is large enough.
+        """
+        if not self._staged:
+            return
+        rows = np.array(sorted(self._staged), dtype=np.int64)
+        rows = rows[self.live[rows]]
+        vectors = np.array([self._staged[row] for row in rows], dtype=np.float32).reshape(-1, self.dimension)
+        self._staged = {}
+        if self.quantization != "none":
+            self._encode(rows, vectors)
+        if self.index_type == "ivf":
+            self._refresh_ann(rows, vectors)
+
+    def _encode(self, rows: np.ndarray, vectors: np.ndarray):
+        # pq namespaces hold int8 codes until the codebooks are trained
+        if self.codes is None:
+            self.codes = Int8Codes(self.dimension)
+        self.codes.ensure(len(self.live))
+        self.codes.encode(rows, vectors)
+        if self.quantization == "pq" and self.codes.kind != "pq" and self.count() >= LOCAL_PQ_MIN_VECTORS:
+            self._train_pq()
+
+    def _train_pq(self):
+        started_at = time.perf_counter()
+        live_rows = np.flatnonzero(self.live[:self.size])
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(live_rows, min(live_rows.size, PQ_TRAIN_SAMPLES), replace=False))
+        try:
+            codes = PQCodes.train(self.full(sample))
+        except ValueError as e:
+            logger.error(f"PQ is not available for this namespace, keeping int8 codes: {str(e)}")
+            self.quantization = "int8"
+            return
+        codes.ensure(len(self.live))
+        for start in range(0, live_rows.size, ADC_CHUNK_ROWS):
+            chunk = live_rows[start:start + ADC_CHUNK_ROWS]
+            codes.encode(chunk, self.full(chunk))
+        self.codes = codes
+        logger.info(f"🗜️ Trained PQ codebooks ({codes.subvectors} sub-vectors) and encoded {live_rows.size} vectors "
+                    f"in {time.perf_counter() - started_at:.1f}s")
+
+    def _refresh_ann(self, rows: np.ndarray, vectors: np.ndarray):
+        count = self.count()
+        if self.ann is None or self.ann.needs_retraining(count):
+            if count >= LOCAL_IVF_MIN_VECTORS:
+                started_at = time.perf_counter()
+                self.ann = IVFIndex.train(np.flatnonzero(self.live[:self.size]), self.full)
+                logger.info(f"🧭 Trained IVF index ({self.ann.nlist} lists) on {count} vectors "
+                            f"in {time.perf_counter() - started_at:.1f}s")
+            return
+        self.ann.add(rows, vectors)
+
+    def memory_bytes(self) -> int:
+        """Process memory held by vector data (memory-mapped full-precision vectors are in the page cache)"""
+        total = sum(array.nbytes for array in self.codes.arrays().values()) if self.codes is not None else 0
+        if self.vectors is not None and not isinstance(self.vectors, np.memmap):
+            total += self.vectors.nbytes
+        return total
+
+    def save(self, path: str):
+        """Write live rows to path (vectors.npy, quantization codes, records.jsonl, IVF state, state.json)"""
+        os.makedirs(path, exist_ok=True)
+        self.refresh()
+        live_rows = np.flatnonzero(self.live[:self.size])
+        vectors_path = os.path.join(path, "vectors.npy")
+        if self.vectors is not None:
+            _save_rows(vectors_path, self.vectors, live_rows)
+        elif os.path.exists(vectors_path):
+            os.remove(vectors_path)
+        if self.codes is not None:
+            arrays = self.codes.arrays()
+            for name in self.codes.row_arrays:
+                _save_rows(os.path.join(path, f"{name}.npy"), arrays[name], live_rows)
+            for name in self.codes.shared_arrays:
+                _replace_file(os.path.join(path, f"{name}.npy"), lambda f: np.save(f, arrays[name]))
+
+        def write_records(f):
+            for row in live_rows:
+                f.write((json.dumps({"id": self.ids[row], "metadata": self.metadata[row]}) + "\n").encode("utf-8"))
+        _replace_file(os.path.join(path, "records.jsonl"), write_records)
+
+        state = {
+            "dimension": self.dimension,
+            "count": int(live_rows.size),
+            "index_type": self.index_type,
+            "quantization": self.quantization,
+            "codes": self.codes.kind if self.codes is not None else None,
+            "ivf": None,
+        }
+        if self.ann is not None:
+            assignment = self.ann.assignment[live_rows] if live_rows.size else np.zeros(0, dtype=np.int32)
+            _replace_file(os.path.join(path, "centroids.npy"), lambda f: np.save(f, self.ann.centroids))
+            _replace_file(os.path.join(path, "assignment.npy"), lambda f: np.save(f, assignment))
+            state["ivf"] = {"trained_size": self.ann.trained_size}
+        _replace_file(os.path.join(path, "state.json"), lambda f: f.write(json.dumps(state).encode("utf-8")))
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, dimension: int) -> Optional["_Namespace"]:
+        """Load a namespace saved by save(); the vectors stay memory-mapped until the namespace grows"""
+        with open(os.path.join(path, "state.json"), encoding="utf-8") as f:
+            state = json.load(f)
+        if state["dimension"] != dimension:
+            logger.warning(f"Skipping saved namespace {path}: dimension {state['dimension']} != {dimension}")
+            return None
+
+        ns = cls(dimension, state.get("index_type", LOCAL_INDEX_TYPE), state.get("quantization", "none"))
+        vectors_path = os.path.join(path, "vectors.npy")
+        # Copy-on-write mapping: updated rows are private to this process until the next save
+        ns.vectors = np.load(vectors_path, mmap_mode="c") if os.path.exists(vectors_path) else None
+        if state.get("codes"):
+            codec = CODECS[state["codes"]]
+            ns.codes = codec.from_arrays(dimension, {
+                name: np.load(os.path.join(path, f"{name}.npy"))
+                for name in codec.row_arrays + codec.shared_arrays
+            })
+        with open(os.path.join(path, "records.jsonl"), encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                record = json.loads(line)
+                ns.ids.append(record["id"])
+                ns.metadata.append(record["metadata"])
+                ns.rows[record["id"]] = row
+                content_hash = (record["metadata"] or {}).get("content_hash")
+                if content_hash is not None:
+                    ns.document_rows.setdefault(content_hash, set()).add(row)
+        ns.size = len(ns.ids)
+        ns.live = np.ones(ns.size, dtype=bool)
+        if state.get("ivf"):
+            ns.ann = IVFIndex.from_assignment(
+                np.load(os.path.join(path, "centroids.npy")),
+                np.load(os.path.join(path, "assignment.npy")),
+                trained_size=state["ivf"]["trained_size"]
+            )
+        return ns
+
+    def count(self) -> int:
+        return len(self.rows)
+
+
+class LocalIndex:
+    """In-process vector index with the subset of the Pinecone Index API the services use.
+
+    Namespaces are searched by brute force, or through an IVF index with
+    LOCAL_INDEX_TYPE=ivf (queries accept nprobe= to trade recall for latency), over
+    float32 vectors or LOCAL_VECTOR_QUANTIZATION=int8/pq codes. With a
+    directory, namespaces saved there are loaded when the index is created and
+    save() writes the changed ones back.
+    """
+
+    def __init__(self, name: str, dimension: int = 768, directory: str = None, index_type: str = None,
+                 quantization: str = None):
+        self.name = name
+        self.dimension = dimension
+        self.directory = directory
+        self.index_type = (index_type or LOCAL_INDEX_TYPE).lower()
+        self.quantization = (quantization or LOCAL_VECTOR_QUANTIZATION).lower()
+        if self.quantization not in ("none",) + tuple(CODECS):
+            raise ValueError(f"Unknown LOCAL_VECTOR_QUANTIZATION '{self.quantization}' (expected none, int8 or pq)")
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._removed: set = set()
+        self._lock = threading.RLock()
+        if directory:
+            self._load()
+
+    def _namespace_path(self, namespace: str) -> str:
+        return os.path.join(self.directory, "ns-" + quote(namespace or "", safe=""))
+
+    def _load(self):
+        if not os.path.isdir(self.directory):
+            return
+        started_at = time.perf_counter()
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.startswith("ns-") or not os.path.isfile(os.path.join(path, "state.json")):
+                continue
+            try:
+                ns = _Namespace.load(path, self.dimension)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not load saved namespace {path}: {str(e)}")
+                continue
+            if ns is not None:
+                self._namespaces[unquote(name[3:])] = ns
+        if self._namespaces:
+            logger.info(f"Loaded {len(self._namespaces)} namespaces of local index {self.name} "
+                        f"in {time.perf_counter() - started_at:.1f}s")
+
+    def save(self):
+        """Write changed namespaces to the index directory and remove deleted ones"""
+        if not self.directory:
+            return
+        with self._lock:
+            for namespace in self._removed:
+                if namespace not in self._namespaces:
+                    shutil.rmtree(self._namespace_path(namespace), ignore_errors=True)
+            self._removed = set()
+            for namespace, ns in self._namespaces.items():
+                if ns.dirty:
+                    ns.save(self._namespace_path(namespace))
+
+    def _namespace(self, namespace: str, create: bool = False) -> Optional[_Namespace]:
+        ns = self._namespaces.get(namespace or "")
+        if ns is None and create:
+            ns = _Namespace(self.dimension, self.index_type, self.quantization)
+            self._namespaces[namespace or ""] = ns
+        return ns
+
+    def upsert(self, vectors, namespace: str = ""):
+        with self._lock:
+            ns = self._namespace(namespace, create=True)
+            try:
+                for item in vectors:
+                    if isinstance(item, dict):
+                        ns.upsert(item["id"], item["values"], item.get("metadata"))
+                    else:
+                        vector_id, values = item[0], item[1]
+                        ns.upsert(vector_id, values, item[2] if len(item) > 2 else None)
+            finally:
+                # Rows written before a bad item are searchable too
+                ns.refresh()
+            return {"upserted_count": len(vectors)}
+
+    def query(self, vector=None, top_k: int = 10, namespace: str = "", filter: dict = None,
+              include_metadata: bool = False, include_values: bool = False, id: str = None,
+              nprobe: int = None, **kwargs):
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None or ns.count() == 0:
+                return QueryResponse([], namespace)
+
+            if vector is None and id is not None:
+                row = ns.rows.get(id)
+                if row is None:
+                    return QueryResponse([], namespace)
+                query = ns.full([row])[0]
+            else:
+                query = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(query)
+                if norm > 0:
+                    query = query / norm
+
+            candidates = ns.candidate_rows(filter, query, nprobe)
+            if filter and candidates.size:
+                candidates = np.array(
+                    [row for row in candidates if matches_filter(ns.metadata[row], filter)],
+                    dtype=np.int64
+                )
+            if candidates.size == 0:
+                return QueryResponse([], namespace)
+
+            rows, scores = ns.search(query, candidates, top_k)
+            matches = []
+            for row, score in zip(rows, scores):
+                matches.append(QueryMatch(
+                    id=ns.ids[row],
+                    score=float(score),
+                    metadata=dict(ns.metadata[row]) if include_metadata else {},
+                    values=ns.full([row])[0].tolist() if include_values else None
+                ))
+            return QueryResponse(matches, namespace)
+
+    def fetch(self, ids: List[str], namespace: str = ""):
+        with self._lock:
+            ns = self._namespace(namespace)
+            vectors = {}
+            if ns is not None:
+                for vector_id in ids:
+                    row = ns.rows.get(vector_id)
+                    if row is not None:
+                        vectors[vector_id] = Vector(vector_id, ns.full([row])[0].tolist(), dict(ns.metadata[row]))
+            return FetchResponse(vectors, namespace)
+
+    def delete(self, ids: List[str] = None, delete_all: bool = False, namespace: str = "", filter: dict = None):
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {}
+            if delete_all:
+                del self._namespaces[namespace or ""]
+                self._removed.add(namespace or "")
+                return {}
+            targets = list(ids or [])
+            if filter:
+                targets.extend(
+                    vector_id for vector_id, row in ns.rows.items()
+                    if matches_filter(ns.metadata[row], filter)
+                )
+            for vector_id in targets:
+                ns.delete(vector_id)
+            return {}
+
+    def list(self, prefix: str = None, limit: int = 100, namespace: str = "", **kwargs):
+        """Yield pages of vector IDs in a namespace, optionally only those starting with prefix"""
+        with self._lock:
+            ns = self._namespace(namespace)
+            ids = sorted(vector_id for vector_id in (ns.rows if ns is not None else ())
+                         if prefix is None or vector_id.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            namespaces = {
+                name: {"vector_count": ns.count()}
+                for name, ns in self._namespaces.items() if ns.count() > 0
+            }
+            return {
+                "dimension": self.dimension,
+                "namespaces": namespaces,
+                "total_vector_count": sum(entry["vector_count"] for entry in namespaces.values()),
+            }
+
+
+class _IndexList(list):
+    def names(self):
+        return [index["name"] for index in self]
+
+
+class LocalVectorClient:
+    """Drop-in stand-in for the Pinecone client backed by in-process LocalIndex objects.
+
+    Indexes are shared by every client in the process, so separately constructed
+    services see the same data. Data is kept in memory, and with LOCAL_INDEX_DIR also
+    saved there when the process exits (one process per directory).
+    """
+
+    # Writes are visible to the next query, so callers need not wait for indexing
+    read_after_write = True
+
+    _indexes: Dict[str, LocalIndex] = {}
+    _lock = threading.Lock()
+    _exit_hook = False
+
+    def __init__(self, dimension: int = 768, directory: str = None, **kwargs):
+        self.dimension = dimension
+        self.directory = LOCAL_INDEX_DIR if directory is None else directory
+
+    def _new_index(self, name: str, dimension: int) -> LocalIndex:
+        if not self.directory:
+            return LocalIndex(name, dimension)
+        if not LocalVectorClient._exit_hook:
+            atexit.register(LocalVectorClient.save_all)
+            LocalVectorClient._exit_hook = True
+        return LocalIndex(name, dimension, directory=os.path.join(self.directory, quote(name, safe="")))
+
+    def _index(self, name: str) -> LocalIndex:
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._new_index(name, self.dimension)
+                self._indexes[name] = index
+            return index
+
+    def Index(self, name: str) -> LocalIndex:
+        return self._index(name)
+
+    def describe_index(self, name: str):
+        index = self._index(name)
+        return {"name": name, "dimension": index.dimension, "metric": "cosine", "status": {"ready": True}}
+
+    def create_index(self, name: str, dimension: int = 768, **kwargs):
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = self._new_index(name, dimension)
+
+    def delete_index(self, name: str):
+        with self._lock:
+            index = self._indexes.pop(name, None)
+        if index is not None and index.directory:
+            shutil.rmtree(index.directory, ignore_errors=True)
+
+    def list_indexes(self):
+        with self._lock:
+            return _IndexList({"name": name, "dimension": index.dimension} for name, index in self._indexes.items())
+
+    @classmethod
+    def save_all(cls):
+        """Save every index that has a directory"""
+        with cls._lock:
+            indexes = list(cls._indexes.values())
+        for index in indexes:
+            try:
+                index.save()
+            except OSError as e:
+                logger.error(f"Could not save local index {index.name}: {str(e)}")
+
+    @classmethod
+    def reset(cls):
+        """Drop all local indexes (used by benchmarks between runs)"""
+        with cls._lock:
+            cls._indexes = {}
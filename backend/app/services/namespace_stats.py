@@ -0,0 +1,104 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Optional
+from ..database.connection import (
+    add_namespace_vectors, clear_namespace_vectors, get_namespace_vector_counts,
+    get_last_namespace_reconciliation, reconcile_namespace_stats
+)
+from .tenancy import reconcile_tenants
+from ..utils.metrics import metrics, Counter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# How often the local counts are checked against describe_index_stats (0 disables the background
+# reconciliation); with several worker processes only one of them reconciles per interval
+NAMESPACE_STATS_RECONCILE_SECONDS = int(os.getenv("NAMESPACE_STATS_RECONCILE_SECONDS", "300"))
+# Namespaces written more recently than this are not reconciled (the index may lag behind writes)
+NAMESPACE_STATS_SETTLE_SECONDS = int(os.getenv("NAMESPACE_STATS_SETTLE_SECONDS", "60"))
+
+reconciliation_corrections = metrics.register(Counter(
+    "agi_namespace_stats_corrections_total",
+    "Namespace and tenant vector counts corrected by reconciliation (kind=namespace/tenant)"
+))
+
+
+class NamespaceStatsRegistry:
+    """Vector counts and last-write times per namespace, kept in SQLite (namespace_stats).
+
+    The vector service records every upsert and delete here, and reads the counts
+    instead of calling describe_index_stats, which returns every namespace in the
+    index. A background thread periodically overwrites the local counts with the
+    index's, correcting drift from overwritten IDs, failed writes or other clients,
+    and recounts the tenants of shards whose tenant counts no longer add up.
+    """
+
+    def __init__(self, reconcile_seconds: int = NAMESPACE_STATS_RECONCILE_SECONDS,
+                 settle_seconds: int = NAMESPACE_STATS_SETTLE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self.settle_seconds = settle_seconds
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid = None
+
+    def record_upsert(self, namespace: str, count: int):
+        add_namespace_vectors(namespace, count, time.time())
+
+    def record_delete(self, namespace: str, count: int):
+        add_namespace_vectors(namespace, -count, time.time())
+
+    def record_cleared(self, namespace: str):
+        clear_namespace_vectors(namespace, time.time())
+
+    def vector_count(self, namespace: str) -> Optional[int]:
+        """Vector count of a namespace, or None if it has not been written or reconciled yet"""
+        return get_namespace_vector_counts([namespace]).get(namespace)
+
+    def vector_counts(self, namespaces: list) -> dict:
+        return get_namespace_vector_counts(namespaces)
+
+    def reconcile(self, index) -> list:
+        """Replace the local counts with the index stats; returns the corrected (namespace, local, remote) triples"""
+        started_at = time.time()
+        stats = index.describe_index_stats()
+        remote_counts = {
+            namespace: stats_entry.get('vector_count', 0)
+            for namespace, stats_entry in stats.get('namespaces', {}).items()
+        }
+        corrections = reconcile_namespace_stats(remote_counts, started_at, self.settle_seconds)
+        if corrections:
+            reconciliation_corrections.inc(len(corrections), kind="namespace")
+            logger.info(f"Namespace stats reconciled: corrected {len(corrections)} of {len(remote_counts)} namespaces")
+        tenant_corrections = reconcile_tenants(index, remote_counts, self.settle_seconds)
+        if tenant_corrections:
+            reconciliation_corrections.inc(len(tenant_corrections), kind="tenant")
+            logger.info(f"Tenant vector counts reconciled: corrected {len(tenant_corrections)} tenants")
+        return corrections
+
+    def start_reconciler(self, get_index: Callable):
+        """Start the background reconciliation thread of this process (once; again after a fork)"""
+        if self.reconcile_seconds <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run_reconciler, args=(get_index,), name="namespace-stats-reconciler", daemon=True
+            )
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run_reconciler(self, get_index: Callable):
+        while True:
+            try:
+                # Another worker may have just done it
+                if time.time() - get_last_namespace_reconciliation() >= self.reconcile_seconds:
+                    self.reconcile(get_index())
+            except Exception as e:
+                logger.warning(f"Namespace stats reconciliation failed: {str(e)}")
+            time.sleep(self.reconcile_seconds)
+
+
+namespace_stats = NamespaceStatsRegistry()
@@ -0,0 +1,128 @@
+import os
+import logging
+import importlib.util
+from typing import List, Union, BinaryIO
+from ..utils.metrics import metrics, track, Counter
+
+# The PDF libraries are imported on first use to keep startup fast
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backend name ("auto", "pymupdf", "pypdf" or "pypdf2")
+PDF_EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "auto").lower()
+# In auto mode, files at least this large go to PyMuPDF; below it PyPDF2's lower
+# per-document overhead wins (see benchmarks/pdf_benchmark.py)
+PDF_LARGE_FILE_BYTES = int(os.getenv("PDF_LARGE_FILE_BYTES", str(256 * 1024)))
+
+pdf_extractions = metrics.register(Counter(
+    "agi_pdf_extractions_total", "PDF extractions by backend and result (ok/failed)"
+))
+
+PDFSource = Union[str, BinaryIO]
+
+
+class PDFExtractionBackend:
+    """Extracts the text of each page of a PDF given as a path or a binary file object"""
+
+    name = ""
+    module = ""
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def extract_pages(self, source: PDFSource) -> List[str]:
+        raise NotImplementedError
+
+
+class PyMuPDFBackend(PDFExtractionBackend):
+    """MuPDF (C library) based extraction; fastest on large documents"""
+
+    name = "pymupdf"
+    module = "fitz"
+
+    def extract_pages(self, source: PDFSource) -> List[str]:
+        try:
+            import pymupdf
+        except ImportError:  # PyMuPDF < 1.24 only ships the fitz name
+            import fitz as pymupdf
+
+        if isinstance(source, str):
+            document = pymupdf.open(source)
+        else:
+            document = pymupdf.open(stream=source.read(), filetype="pdf")
+        with document:
+            return [page.get_text() for page in document]
+
+
+class PyPDFBackend(PDFExtractionBackend):
+    """Pure-Python pypdf"""
+
+    name = "pypdf"
+    module = "pypdf"
+
+    def extract_pages(self, source: PDFSource) -> List[str]:
+        from pypdf import PdfReader
+        return [page.extract_text() or "" for page in PdfReader(source).pages]
+
+
+class PyPDF2Backend(PDFExtractionBackend):
+    """Pure-Python PyPDF2 (the original extractor); low overhead on small files"""
+
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def extract_pages(self, source: PDFSource) -> List[str]:
+        from PyPDF2 import PdfReader
+        return [page.extract_text() or "" for page in PdfReader(source).pages]
+
+
+BACKENDS = {backend.name: backend for backend in (PyMuPDFBackend(), PyPDFBackend(), PyPDF2Backend())}
+
+
+def _source_size(source: PDFSource) -> int:
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def backend_order(size: int, preferred: str = None) -> List[PDFExtractionBackend]:
+    """Backends to try for a document of the given size, best first, then the fallbacks"""
+    preferred = (preferred or PDF_EXTRACTION_BACKEND).lower()
+    if preferred in BACKENDS:
+        names = [preferred] + [name for name in ("pymupdf", "pypdf2", "pypdf") if name != preferred]
+    else:
+        if preferred != "auto":
+            logger.warning(f"Unknown PDF_EXTRACTION_BACKEND '{preferred}', using auto")
+        if size >= PDF_LARGE_FILE_BYTES:
+            names = ["pymupdf", "pypdf2", "pypdf"]
+        else:
+            names = ["pypdf2", "pymupdf", "pypdf"]
+    return [BACKENDS[name] for name in names if BACKENDS[name].is_available()]
+
+
+def extract_pages(source: PDFSource, preferred: str = None) -> List[str]:
+    """Extract page texts, falling back to the next backend when one fails on the file"""
+    backends = backend_order(_source_size(source), preferred)
+    if not backends:
+        raise RuntimeError("No PDF extraction backend is installed (install PyMuPDF, pypdf or PyPDF2)")
+
+    start = None if isinstance(source, str) else source.tell()
+    errors = []
+    for backend in backends:
+        if start is not None:
+            source.seek(start)
+        try:
+            with track(f"pdf.extract.{backend.name}"):
+                pages = backend.extract_pages(source)
+            pdf_extractions.inc(backend=backend.name, result="ok")
+            return pages
+        except Exception as e:
+            pdf_extractions.inc(backend=backend.name, result="failed")
+            logger.warning(f"PDF backend {backend.name} failed, trying next: {str(e)}")
+            errors.append(f"{backend.name}: {str(e)}")
+
+    raise RuntimeError("All PDF extraction backends failed (" + "; ".join(errors) + ")")
@@ -1,44 +1,58 @@
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
-import os
+from typing import List, Tuple
+from ..utils.metrics import timed
+from .pdf_backends import extract_pages
+from .extraction_cache import extraction_cache, sha256_file
+from .upload_writer import UploadWriter
+
+# The PDF libraries and the LangChain splitter are imported on first use to keep startup fast
 
 class PDFService:
     @staticmethod
+    @timed("pdf.extract")
     def extract_text_from_pdfs(pdf_docs) -> str:
         """Extract text from multiple PDF files"""
-        text = ""
+        texts = []
         for pdf in pdf_docs:
             try:
-                pdf_reader = PdfReader(pdf)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text
+                texts.extend(extract_pages(pdf))
             except Exception as e:
                 print(f"Error reading PDF: {str(e)}")
                 continue
-        return text
+        return "".join(texts)
     
     @staticmethod
-    def extract_text_from_pdf(file_path: str) -> str:
-        """Extract text from a single PDF file"""
-        text = ""
+    @timed("pdf.extract")
+    def extract_pages_from_pdf(file_path: str, content_hash: str = None) -> List[str]:
+        """Extract the text of each page of a single PDF file.
+        
+        Results are cached by the sha256 of the file bytes, so the same PDF is only parsed once.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text
+            if extraction_cache.enabled:
+                content_hash = content_hash or sha256_file(file_path)
+                pages = extraction_cache.get(content_hash)
+                if pages is not None:
+                    return pages
+            
+            pages = extract_pages(file_path)
+            if extraction_cache.enabled:
+                extraction_cache.put(content_hash, pages)
+            return pages
         except Exception as e:
             print(f"Error reading PDF {file_path}: {str(e)}")
-        return text
+            return []
+    
+    @staticmethod
+    def extract_text_from_pdf(file_path: str) -> str:
+        """Extract text from a single PDF file"""
+        return "".join(PDFService.extract_pages_from_pdf(file_path))
     
     @staticmethod
+    @timed("pdf.chunk")
     def split_text_into_chunks(text: str, chunk_size: int = 10000, chunk_overlap: int = 1000) -> List[str]:
         """Split text into chunks for processing"""
         try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
             splitter = RecursiveCharacterTextSplitter(
                 chunk_size=chunk_size, 
                 chunk_overlap=chunk_overlap
@@ -49,18 +63,18 @@ class PDFService:
             # Fallback: simple splitting
             return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
     
+    @staticmethod
+    @timed("pdf.save")
+    def save_uploaded_files_with_hashes(uploaded_files, upload_dir: str) -> List[Tuple[str, str]]:
+        """Stream uploaded files to disk, hashing and validating them on the way; returns (path, sha256) pairs.
+        
+        Raises UploadRejected if any file is not a PDF or exceeds the size or page limits;
+        nothing is saved in that case.
+        """
+        saved = UploadWriter().save_all(uploaded_files, upload_dir)
+        return [(upload.file_path, upload.content_hash) for upload in saved]
+    
     @staticmethod
     def save_uploaded_files(uploaded_files, upload_dir: str) -> List[str]:
         """Save uploaded files to disk and return file paths"""
-        os.makedirs(upload_dir, exist_ok=True)
-        file_paths = []
-        
-        for uploaded_file in uploaded_files:
-            # Use secure filename for Flask file uploads
-            from werkzeug.utils import secure_filename
-            filename = secure_filename(uploaded_file.filename)
-            file_path = os.path.join(upload_dir, filename)
-            uploaded_file.save(file_path)
-            file_paths.append(file_path)
-            
-        return file_paths
\ No newline at end of file
+        return [file_path for file_path, _ in PDFService.save_uploaded_files_with_hashes(uploaded_files, upload_dir)]
@@ -0,0 +1,136 @@
+import io
+import os
+import json
+import logging
+from typing import List
+
+import numpy as np
+from .embedding_provider import fit_dimension
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# How migrate_index.py reduces vectors to a smaller dimension: truncate (Matryoshka-style) or pca
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "pca").lower()
+# Vectors sampled from the source index to fit a PCA projection
+PCA_FIT_SAMPLES = int(os.getenv("PCA_FIT_SAMPLES", "20000"))
+
+REDUCTIONS = ("truncate", "pca")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class Projection:
+    """Maps embedding model vectors to the vectors stored in an index, one step after another.
+
+    A truncate step keeps the first dimensions (zero-pads to a larger dimension),
+    which preserves the ranking of Matryoshka embeddings. A pca step centers the
+    vectors and projects them on principal components fitted on the index's own
+    vectors. Every step renormalizes, so cosine similarity is computed in the reduced
+    space. An index created by a migration has its source's steps plus one more,
+    so new embeddings end up where the migrated vectors did.
+    """
+
+    def __init__(self, source_dimension: int, steps: List[dict] = None):
+        self.source_dimension = source_dimension
+        self.steps = list(steps or [])
+
+    @property
+    def dimension(self) -> int:
+        return self.steps[-1]["dimension"] if self.steps else self.source_dimension
+
+    @property
+    def is_identity(self) -> bool:
+        return not self.steps
+
+    @classmethod
+    def truncate(cls, source_dimension: int, dimension: int) -> "Projection":
+        steps = [] if dimension == source_dimension else [{"kind": "truncate", "dimension": dimension}]
+        return cls(source_dimension, steps)
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dimension: int) -> "Projection":
+        """Principal components of a sample of (unit) vectors"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if dimension >= vectors.shape[1]:
+            raise ValueError(f"PCA needs a smaller dimension than {vectors.shape[1]}")
+        mean = vectors.mean(axis=0)
+        centered = (vectors - mean).astype(np.float64)
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered / max(len(vectors) - 1, 1))
+        order = np.argsort(eigenvalues)[::-1][:dimension]
+        explained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+        step = {
+            "kind": "pca",
+            "dimension": dimension,
+            "explained_variance": round(explained, 4),
+            "mean": mean.astype(np.float32),
+            "components": eigenvectors[:, order].T.astype(np.float32),
+        }
+        return cls(vectors.shape[1], [step])
+
+    def then(self, other: "Projection") -> "Projection":
+        """This projection followed by another that starts at this one's dimension"""
+        if other.source_dimension != self.dimension:
+            raise ValueError(f"Cannot chain a {other.source_dimension}-dimension projection after {self.dimension}")
+        return Projection(self.source_dimension, self.steps + other.steps)
+
+    def after(self, prefix: "Projection") -> "Projection":
+        """The steps that follow prefix: maps vectors stored with prefix to vectors stored with this projection"""
+        if not self._starts_with(prefix):
+            raise ValueError("Projection does not extend the given one")
+        return Projection(prefix.dimension, self.steps[len(prefix.steps):])
+
+    def _starts_with(self, prefix: "Projection") -> bool:
+        if prefix.source_dimension != self.source_dimension or len(prefix.steps) > len(self.steps):
+            return False
+        for step, other in zip(self.steps, prefix.steps):
+            if step["kind"] != other["kind"] or step["dimension"] != other["dimension"]:
+                return False
+            if step["kind"] == "pca" and not np.array_equal(step["components"], other["components"]):
+                return False
+        return True
+
+    def apply(self, vectors) -> np.ndarray:
+        """Project a batch of vectors (rows) and return unit rows"""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        for step in self.steps:
+            if step["kind"] == "pca":
+                # Centering is not scale invariant: inputs are normalized like the fitted sample
+                vectors = _normalize(vectors)
+                vectors = _normalize((vectors - step["mean"]) @ step["components"].T)
+            else:
+                vectors = fit_dimension(vectors, step["dimension"])
+        return vectors.astype(np.float32, copy=False)
+
+    def describe(self) -> str:
+        parts = [str(self.source_dimension)]
+        for step in self.steps:
+            detail = f", {step['explained_variance']:.0%} of variance" if "explained_variance" in step else ""
+            parts.append(f"{step['kind']} {step['dimension']}{detail}")
+        return " -> ".join(parts)
+
+    def to_bytes(self) -> bytes:
+        arrays = {}
+        header = {"source_dimension": self.source_dimension, "steps": []}
+        for i, step in enumerate(self.steps):
+            header["steps"].append({key: value for key, value in step.items() if key not in ("mean", "components")})
+            if step["kind"] == "pca":
+                arrays[f"mean{i}"] = step["mean"]
+                arrays[f"components{i}"] = step["components"]
+        buffer = io.BytesIO()
+        np.savez(buffer, header=np.array(json.dumps(header)), **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Projection":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            header = json.loads(str(arrays["header"]))
+            steps = []
+            for i, step in enumerate(header["steps"]):
+                if step["kind"] == "pca":
+                    step = dict(step, mean=arrays[f"mean{i}"], components=arrays[f"components{i}"])
+                steps.append(step)
+        return cls(header["source_dimension"], steps)
@@ -0,0 +1,195 @@
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# How local namespaces hold vectors for scanning: none (float32), int8 (4x smaller) or pq (product quantization)
+LOCAL_VECTOR_QUANTIZATION = os.getenv("LOCAL_VECTOR_QUANTIZATION", "none").lower()
+# PQ code bytes per vector (sub-vectors of dimension / LOCAL_PQ_SUBVECTORS values each; 192 = 16x for 768 dims)
+LOCAL_PQ_SUBVECTORS = int(os.getenv("LOCAL_PQ_SUBVECTORS", "192"))
+# pq namespaces use int8 codes until they hold this many vectors, then the PQ codebooks are trained
+LOCAL_PQ_MIN_VECTORS = int(os.getenv("LOCAL_PQ_MIN_VECTORS", "10000"))
+# The best k x this many candidates by quantized score are rescored with full-precision vectors,
+# which are then kept in a memory-mapped file instead of process memory; 0 keeps no full-precision copy
+LOCAL_RESCORE_FACTOR = int(os.getenv("LOCAL_RESCORE_FACTOR", "8"))
+# Where full-precision vectors of quantized namespaces are memory-mapped (not a tmpfs: it would be RAM again)
+LOCAL_VECTOR_SPILL_DIR = os.getenv("LOCAL_VECTOR_SPILL_DIR", os.path.join(BACKEND_DIR, "cache", "local_vectors"))
+
+PQ_CENTROIDS = 256
+PQ_TRAIN_ITERATIONS = 12
+PQ_TRAIN_SAMPLES = 16384
+# Candidates scored per pass (bounds the temporary float32 / index arrays)
+ADC_CHUNK_ROWS = 8192
+
+
+def disk_matrix(capacity: int, dimension: int, source: Optional[np.ndarray] = None,
+                directory: str = None) -> np.ndarray:
+    """A float32 matrix in an unlinked file, so its pages live in the page cache rather than process memory"""
+    directory = directory or LOCAL_VECTOR_SPILL_DIR
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryFile(dir=directory) as f:
+        f.truncate(max(capacity, 1) * dimension * 4)
+        matrix = np.memmap(f, dtype=np.float32, mode="r+", shape=(max(capacity, 1), dimension))
+    if source is not None:
+        for start in range(0, len(source), ADC_CHUNK_ROWS):
+            chunk = source[start:start + ADC_CHUNK_ROWS]
+            matrix[start:start + len(chunk)] = chunk
+    return matrix
+
+
+class Int8Codes:
+    """Per-vector symmetric int8 quantization: v ~ scale * code, with code in [-127, 127].
+
+    Needs no training. A query is scored against the codes directly (asymmetric: the
+    query stays float32) and the per-vector scale is applied afterwards.
+    """
+
+    kind = "int8"
+    # Arrays saved with a namespace: one entry per row, and shared by all rows
+    row_arrays = ("codes", "scales")
+    shared_arrays = ()
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.codes = np.zeros((0, dimension), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def ensure(self, capacity: int):
+        if capacity <= len(self.scales):
+            return
+        codes = np.zeros((capacity, self.dimension), dtype=np.int8)
+        codes[:len(self.codes)] = self.codes
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:len(self.scales)] = self.scales
+        self.codes, self.scales = codes, scales
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        self.codes[rows] = np.rint(vectors / scales[:, None]).astype(np.int8)
+        self.scales[rows] = scales
+
+    def decode(self, rows) -> np.ndarray:
+        return self.codes[rows].astype(np.float32) * self.scales[rows][:, None]
+
+    def scores(self, query: np.ndarray, rows) -> np.ndarray:
+        codes, scales = self.codes[rows], self.scales[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), ADC_CHUNK_ROWS):
+            chunk = codes[start:start + ADC_CHUNK_ROWS]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        return scores * scales
+
+    def bytes_per_vector(self) -> int:
+        return self.dimension + 4
+
+    def arrays(self) -> dict:
+        return {"codes": self.codes, "scales": self.scales}
+
+    @classmethod
+    def from_arrays(cls, dimension: int, arrays: dict) -> "Int8Codes":
+        codec = cls(dimension)
+        codec.codes, codec.scales = arrays["codes"], arrays["scales"]
+        return codec
+
+
+class PQCodes:
+    """Product quantization: each sub-vector is replaced by the index of its nearest of 256 centroids.
+
+    A query is scored with asymmetric distance computation: a lookup table of the
+    query's dot product with every centroid of every sub-space, summed over a
+    vector's codes.
+    """
+
+    kind = "pq"
+    row_arrays = ("codes",)
+    shared_arrays = ("codebooks",)
+
+    def __init__(self, codebooks: np.ndarray):
+        # (subvectors, 256, sub-dimension)
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)
+        self.subvectors, _, self.subdimension = self.codebooks.shape
+        self.dimension = self.subvectors * self.subdimension
+        self.codes = np.zeros((0, self.subvectors), dtype=np.uint8)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, subvectors: int = LOCAL_PQ_SUBVECTORS, seed: int = 0) -> "PQCodes":
+        """k-means codebooks per sub-space on a sample of the vectors"""
+        from .ann_index import nearest_centroids
+        dimension = vectors.shape[1]
+        if dimension % subvectors:
+            raise ValueError(f"LOCAL_PQ_SUBVECTORS={subvectors} does not divide the dimension {dimension}")
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), min(len(vectors), PQ_TRAIN_SAMPLES),
+                                                       replace=False))], dtype=np.float32)
+        subdimension = dimension // subvectors
+        centroids = min(PQ_CENTROIDS, len(sample))
+        codebooks = np.zeros((subvectors, PQ_CENTROIDS, subdimension), dtype=np.float32)
+        for m in range(subvectors):
+            part = np.ascontiguousarray(sample[:, m * subdimension:(m + 1) * subdimension])
+            codebook = part[rng.choice(len(part), centroids, replace=False)].copy()
+            for _ in range(PQ_TRAIN_ITERATIONS):
+                # Euclidean k-means: nearest by max(x.c - |c|^2 / 2)
+                assignment = nearest_centroids(
+                    np.hstack((part, np.ones((len(part), 1), dtype=np.float32))),
+                    np.hstack((codebook, -0.5 * (codebook ** 2).sum(axis=1, keepdims=True)))
+                )
+                counts = np.bincount(assignment, minlength=centroids)
+                sums = np.stack([np.bincount(assignment, weights=part[:, j], minlength=centroids)
+                                 for j in range(subdimension)], axis=1)
+                used = counts > 0
+                codebook[used] = sums[used] / counts[used][:, None]
+            codebooks[m, :centroids] = codebook
+        return cls(codebooks)
+
+    def ensure(self, capacity: int):
+        if capacity <= len(self.codes):
+            return
+        codes = np.zeros((capacity, self.subvectors), dtype=np.uint8)
+        codes[:len(self.codes)] = self.codes
+        self.codes = codes
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        parts = vectors.reshape(len(vectors), self.subvectors, self.subdimension)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        squared_norms = (self.codebooks ** 2).sum(axis=2)
+        for m in range(self.subvectors):
+            codes[:, m] = np.argmax(parts[:, m] @ self.codebooks[m].T - 0.5 * squared_norms[m], axis=1)
+        self.codes[rows] = codes
+
+    def decode(self, rows) -> np.ndarray:
+        codes = self.codes[rows]
+        parts = self.codebooks[np.arange(self.subvectors), codes]
+        return parts.reshape(len(codes), self.dimension)
+
+    def scores(self, query: np.ndarray, rows) -> np.ndarray:
+        table = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.subvectors, self.subdimension))
+        codes = self.codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        # Offsets turn the (sub-space, code) pairs into indexes of the flattened table
+        offsets = np.arange(self.subvectors, dtype=np.int64) * PQ_CENTROIDS
+        flat_table = table.ravel()
+        for start in range(0, len(codes), ADC_CHUNK_ROWS):
+            chunk = codes[start:start + ADC_CHUNK_ROWS]
+            scores[start:start + len(chunk)] = flat_table[chunk + offsets].sum(axis=1)
+        return scores
+
+    def bytes_per_vector(self) -> int:
+        return self.subvectors
+
+    def arrays(self) -> dict:
+        return {"codes": self.codes, "codebooks": self.codebooks}
+
+    @classmethod
+    def from_arrays(cls, dimension: int, arrays: dict) -> "PQCodes":
+        codec = cls(arrays["codebooks"])
+        codec.codes = arrays["codes"]
+        return codec
+
+
+CODECS = {codec.kind: codec for codec in (Int8Codes, PQCodes)}
@@ -0,0 +1,62 @@
+import os
+import threading
+import logging
+from typing import Callable, Dict, Any
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """Per-process registry of lazily created services.
+
+    Services hold network clients (Gemini, Pinecone) that must not be shared across
+    forked workers, so instances are created on first use and dropped when the
+    registry notices it is running in a different process than the one that built them.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Reentrant: a factory may get() the services it depends on
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register a factory; the service is not created until get() is called"""
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """Return the service instance for this process, creating it if needed"""
+        self._check_pid()
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                logger.info(f"Creating service '{name}' in process {os.getpid()}")
+                instance = self._factories[name]()
+                self._instances[name] = instance
+            return instance
+
+    def is_created(self, name: str) -> bool:
+        """Whether the service already exists in this process"""
+        self._check_pid()
+        return name in self._instances
+
+    def warm(self):
+        """Create every registered service now instead of on the first request"""
+        for name in list(self._factories):
+            self.get(name)
+
+    def reset(self):
+        """Drop all instances (e.g. after fork) so they are recreated on next use"""
+        with self._lock:
+            self._instances = {}
+            self._pid = os.getpid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            logger.info(f"Process changed ({self._pid} -> {os.getpid()}), discarding inherited services")
+            self.reset()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional
+from .pdf_service import PDFService
+from .blob_store import BlobStore
+from .upload_writer import UploadRejected
+from .extraction_cache import sha256_file
+from ..utils.metrics import metrics, Counter, track
+from ..utils.rate_limiter import api_lane, LANE_EXTRACTION
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Documents screened in parallel per request (each runs its own extraction -> tech stack -> user info)
+SCREENING_CONCURRENCY = int(os.getenv("SCREENING_CONCURRENCY", "8"))
+# Most documents accepted by one screening request
+SCREENING_MAX_FILES = int(os.getenv("SCREENING_MAX_FILES", "500"))
+# Server-side directories that may be screened must be inside this one; unset disables directory screening
+SCREENING_ROOT = os.getenv("SCREENING_ROOT", "")
+
+screened_documents = metrics.register(Counter(
+    "agi_screened_documents_total",
+    "Documents processed by bulk screening, by result (ok/error)"
+))
+
+
+class ScreeningItem:
+    """One document of a screening request"""
+
+    def __init__(self, index: int, filename: str, file_path: str = None, content_hash: str = None,
+                 error: str = None):
+        self.index = index
+        self.filename = filename
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.error = error
+
+
+class ScreeningService:
+    """Bulk resume screening: text extraction, tech stack and user information per document.
+
+    Documents go through the pipeline in parallel (at most `concurrency` at once) and
+    each result is yielded as soon as its document finishes, so callers can stream
+    them. The Gemini calls run in the extraction lane of the API governor. A document
+    that fails yields an error event; the others carry on.
+    """
+
+    def __init__(self, ai_service, pdf_service: PDFService = None, concurrency: int = None):
+        self.ai_service = ai_service
+        self.pdf_service = pdf_service or PDFService()
+        self.concurrency = max(1, concurrency or SCREENING_CONCURRENCY)
+
+    @staticmethod
+    def items_from_uploads(uploaded_files, base_upload_dir: str) -> List[ScreeningItem]:
+        """Store uploaded PDFs in the blob store; a rejected file becomes an item carrying its error"""
+        if len(uploaded_files) > SCREENING_MAX_FILES:
+            raise ValueError(f"Too many files (limit {SCREENING_MAX_FILES})")
+        blob_store = BlobStore(base_upload_dir)
+        items = []
+        for index, uploaded_file in enumerate(uploaded_files):
+            filename = uploaded_file.filename or f"document-{index + 1}.pdf"
+            try:
+                upload = blob_store.save_uploads([uploaded_file])[0]
+                items.append(ScreeningItem(index, filename, upload.file_path, upload.content_hash))
+            except UploadRejected as e:
+                items.append(ScreeningItem(index, filename, error=str(e)))
+        return items
+
+    @staticmethod
+    def items_from_directory(directory: str) -> List[ScreeningItem]:
+        """PDFs of a directory under SCREENING_ROOT, by name; raises ValueError for other paths"""
+        if not SCREENING_ROOT:
+            raise ValueError("Directory screening is not enabled (set SCREENING_ROOT)")
+        root = os.path.realpath(SCREENING_ROOT)
+        path = os.path.realpath(os.path.join(root, directory))
+        if os.path.commonpath([root, path]) != root or not os.path.isdir(path):
+            raise ValueError(f"Directory not found under the screening root: {directory}")
+
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(".pdf"))
+        if len(names) > SCREENING_MAX_FILES:
+            raise ValueError(f"Too many files (limit {SCREENING_MAX_FILES})")
+        return [ScreeningItem(index, name, os.path.join(path, name)) for index, name in enumerate(names)]
+
+    def screen_document(self, item: ScreeningItem) -> dict:
+        """Run the pipeline for one document; raises on failure"""
+        if item.error:
+            raise ValueError(item.error)
+
+        started_at = time.perf_counter()
+        content_hash = item.content_hash or sha256_file(item.file_path)
+        with track("screening.extract_text"):
+            text = "".join(self.pdf_service.extract_pages_from_pdf(item.file_path, content_hash))
+        if not text.strip():
+            raise ValueError("No text found in PDF")
+
+        tech_stack = self.ai_service.extract_tech_stack_from_text(text)
+        user_info = self.ai_service.extract_user_information_from_text(text)
+        return {
+            "content_hash": content_hash,
+            "tech_stack": tech_stack,
+            "user_info": user_info,
+            "seconds": round(time.perf_counter() - started_at, 3),
+        }
+
+    def _run(self, item: ScreeningItem) -> dict:
+        with api_lane(LANE_EXTRACTION):
+            return self.screen_document(item)
+
+    def screen(self, items: List[ScreeningItem], concurrency: Optional[int] = None) -> Iterator[dict]:
+        """Yield a start event, one result or error event per document in completion order, and a done event"""
+        started_at = time.perf_counter()
+        total = len(items)
+        workers = max(1, min(concurrency or self.concurrency, self.concurrency, total or 1))
+        yield {"type": "start", "total": total, "concurrency": workers}
+
+        completed = failed = 0
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screening")
+        try:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._run, item): item for item in items
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                completed += 1
+                event = {"index": item.index, "filename": item.filename}
+                try:
+                    event.update(type="result", **future.result())
+                    screened_documents.inc(result="ok")
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Screening {item.filename} failed: {str(e)}")
+                    event.update(type="error", error=str(e))
+                    screened_documents.inc(result="error")
+                event["progress"] = {"completed": completed, "total": total}
+                yield event
+        finally:
+            # A client that disconnects stops the documents that have not started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield {
+            "type": "done",
+            "completed": completed,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - started_at, 3),
+        }
+
+    def screen_ndjson(self, items: List[ScreeningItem], concurrency: Optional[int] = None) -> Iterator[str]:
+        for event in self.screen(items, concurrency):
+            yield json.dumps(event) + "\n"
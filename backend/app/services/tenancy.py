@@ -0,0 +1,151 @@
+import os
+import uuid
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from ..database.connection import (
+    get_vector_tenant, record_tenant_vectors, delete_vector_tenant, list_vector_tenants, reconcile_tenant_counts
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Logical per-session namespaces are stored in this many shard namespaces; 0 keeps one
+# physical namespace per session (the layout before sharding)
+VECTOR_NAMESPACE_SHARDS = int(os.getenv("VECTOR_NAMESPACE_SHARDS", "64"))
+# Logical namespaces that are sharded. Document chunks already live in one shared
+# namespace, so only the per-session chat namespaces need it.
+SHARDED_NAMESPACE_PREFIXES = ("chat_",)
+# Vector IDs in a shard are "<tenant>#<uuid>", so a tenant's vectors can be listed by prefix
+TENANT_ID_SEPARATOR = "#"
+
+
+class NamespaceTenancy:
+    """Maps logical namespaces (tenants) onto a bounded set of shard namespaces.
+
+    A tenant's vectors carry a 'tenant' metadata field and are selected from their
+    shard with a metadata filter, so the index holds a fixed number of namespaces
+    however many sessions exist. The shard and the vector count of each tenant are
+    kept in SQLite (vector_tenants), which is what reads use instead of index stats.
+
+    Tenants without a vector_tenants row were written before sharding (or with
+    sharding disabled) and are read from their own namespace as before. A tenant
+    whose own namespace already had vectors at its first sharded write keeps
+    reading both.
+    """
+
+    def __init__(self, shards: int = None):
+        self.shards = VECTOR_NAMESPACE_SHARDS if shards is None else shards
+
+    def is_sharded(self, tenant: str) -> bool:
+        return self.shards > 0 and tenant.startswith(SHARDED_NAMESPACE_PREFIXES)
+
+    def shard_for(self, tenant: str) -> str:
+        """Stable shard namespace for a tenant"""
+        digest = hashlib.blake2b(tenant.encode("utf-8"), digest_size=8).digest()
+        return f"shard-{int.from_bytes(digest, 'big') % self.shards:03d}"
+
+    @staticmethod
+    def vector_id(tenant: str, message_id: str = None) -> str:
+        return f"{tenant}{TENANT_ID_SEPARATOR}{message_id or uuid.uuid4()}"
+
+    def scope(self, tenant: str) -> List[tuple]:
+        """(namespace, metadata filter, vector count) triples to search for a tenant's vectors"""
+        placement = get_vector_tenant(tenant)
+        if not placement:
+            return [(tenant, None, None)]
+        scope = [(placement["shard"], {"tenant": tenant}, placement["vector_count"])]
+        if placement["has_legacy"]:
+            scope.append((tenant, None, None))
+        return scope
+
+    def write_namespace(self, tenant: str, index) -> Optional[str]:
+        """Shard namespace new vectors of a tenant go to, or None to write to the tenant's own namespace"""
+        placement = get_vector_tenant(tenant)
+        if placement:
+            return placement["shard"]
+        if not self.is_sharded(tenant):
+            return None
+
+        # First sharded write: remember whether the old per-session namespace has data to keep reading
+        has_legacy = self._has_vectors(index, tenant)
+        shard = self.shard_for(tenant)
+        record_tenant_vectors(tenant, shard, 0, has_legacy=has_legacy)
+        return shard
+
+    @staticmethod
+    def _has_vectors(index, namespace: str) -> bool:
+        try:
+            for page in index.list(namespace=namespace, limit=1):
+                return bool(page)
+            return False
+        except Exception as e:
+            logger.warning(f"Could not check namespace {namespace} for existing vectors: {str(e)}")
+            return True
+
+    @staticmethod
+    def record_write(tenant: str, shard: str, count: int):
+        record_tenant_vectors(tenant, shard, count)
+
+    def clear(self, tenant: str, index) -> Optional[dict]:
+        """Delete a sharded tenant's vectors from its shard; returns its placement, or None if it is not sharded.
+
+        The placement's "deleted" is the number of vectors deleted, or None when they were
+        deleted by filter without listing them. The recorded vector_count can be too high
+        (replayed writes count again), so it is not what the shard's count should drop by.
+        """
+        placement = get_vector_tenant(tenant)
+        if not placement:
+            return None
+
+        shard = placement["shard"]
+        deleted = 0
+        try:
+            for page in index.list(prefix=f"{tenant}{TENANT_ID_SEPARATOR}", namespace=shard):
+                if page:
+                    index.delete(ids=list(page), namespace=shard)
+                    deleted += len(page)
+        except Exception as e:
+            # Indexes without ID listing (pod-based Pinecone) support deleting by metadata filter
+            logger.info(f"Listing {shard} failed ({str(e)}), deleting tenant {tenant} by filter")
+            index.delete(filter={"tenant": tenant}, namespace=shard)
+            deleted = None
+        delete_vector_tenant(tenant)
+        logger.info(f"🗑️ Cleared tenant {tenant} from {shard}")
+        return dict(placement, deleted=deleted)
+
+
+def count_tenant_vectors(index, shard: str) -> Dict[str, int]:
+    """Vectors per tenant in a shard, counted from the listed vector IDs"""
+    counts = {}
+    for page in index.list(namespace=shard):
+        for vector_id in page or ():
+            tenant = vector_id.rpartition(TENANT_ID_SEPARATOR)[0]
+            if tenant:
+                counts[tenant] = counts.get(tenant, 0) + 1
+    return counts
+
+
+def reconcile_tenants(index, shard_counts: dict, settle_seconds: float) -> list:
+    """Recount the tenants of shards whose index vector count differs from the sum of their tenants' counts.
+
+    Tenant counts are only added to on writes, and a replayed or retried message batch
+    overwrites its vectors but counts them again. Returns the corrected
+    (tenant, local, counted) triples.
+    """
+    totals = {}
+    for tenant in list_vector_tenants():
+        totals[tenant["shard"]] = totals.get(tenant["shard"], 0) + tenant["vector_count"]
+
+    corrections = []
+    for shard, total in totals.items():
+        if shard_counts.get(shard, 0) == total:
+            continue
+        try:
+            counts = count_tenant_vectors(index, shard)
+        except Exception as e:
+            # Indexes without ID listing cannot be recounted
+            logger.warning(f"Could not recount the tenants of {shard}: {str(e)}")
+            continue
+        corrections.extend(reconcile_tenant_counts(shard, counts, settle_seconds))
+    return corrections
@@ -0,0 +1,144 @@
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from typing import List
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes read from an upload stream at a time
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+# Per-file limits (the request as a whole is capped by Flask's MAX_CONTENT_LENGTH)
+UPLOAD_MAX_FILE_MB = float(os.getenv("UPLOAD_MAX_FILE_MB", "16"))
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", "2000"))
+
+# The PDF header must start within the first 1024 bytes
+PDF_MAGIC = b"%PDF-"
+HEADER_WINDOW = 1024
+
+# Page objects in the raw file ("/Type /Page" but not "/Type /Pages"). Pages inside compressed
+# object streams are not visible, so this is a lower bound used to reject oversized files early.
+PAGE_OBJECT_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+PAGE_PATTERN_OVERLAP = 32
+
+
+class UploadRejected(ValueError):
+    """An uploaded file failed validation; the message is safe to show to the user"""
+
+
+class SavedUpload:
+    """A file committed to disk by UploadWriter"""
+
+    def __init__(self, filename: str, file_path: str, content_hash: str, size: int, page_objects: int):
+        self.filename = filename
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.size = size
+        self.page_objects = page_objects
+        # Set by BlobStore when identical bytes were already stored
+        self.deduplicated = False
+
+
+class UploadWriter:
+    """Streams uploaded files to disk in fixed-size chunks.
+
+    While a file is copied to a temp file in the destination directory, its sha256 is
+    computed and the size limit, page limit and PDF magic bytes are checked, so a bad
+    file is rejected without being read into memory. Files are only renamed into place
+    once every file of the upload has passed.
+    """
+
+    def __init__(self, max_file_bytes: int = None, max_pages: int = None, chunk_size: int = None):
+        self.max_file_bytes = int(UPLOAD_MAX_FILE_MB * 1024 * 1024) if max_file_bytes is None else max_file_bytes
+        self.max_pages = UPLOAD_MAX_PAGES if max_pages is None else max_pages
+        self.chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+
+    def _stream_to_temp(self, uploaded_file, filename: str, upload_dir: str):
+        """Copy one upload to a temp file; returns (temp path, sha256, size, page objects)"""
+        stream = getattr(uploaded_file, "stream", uploaded_file)
+        digest = hashlib.sha256()
+        size = 0
+        page_objects = 0
+        header = b""
+        tail = b""
+
+        fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise UploadRejected(
+                            f"File '{filename}' is too large (limit {self.max_file_bytes / (1024 * 1024):g}MB)"
+                        )
+
+                    if len(header) < HEADER_WINDOW:
+                        header += chunk[:HEADER_WINDOW - len(header)]
+                        if len(header) >= HEADER_WINDOW and PDF_MAGIC not in header:
+                            raise UploadRejected(f"File '{filename}' is not a PDF")
+
+                    # Count page objects, keeping a small overlap so matches across chunks are seen once
+                    window = tail + chunk
+                    page_objects += sum(
+                        1 for match in PAGE_OBJECT_PATTERN.finditer(window) if match.end() > len(tail)
+                    )
+                    if self.max_pages and page_objects > self.max_pages:
+                        raise UploadRejected(f"File '{filename}' has too many pages (limit {self.max_pages})")
+                    tail = window[-PAGE_PATTERN_OVERLAP:]
+
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            if PDF_MAGIC not in header:
+                raise UploadRejected(f"File '{filename}' is not a PDF")
+            return temp_path, digest.hexdigest(), size, page_objects
+        except BaseException:
+            self._discard(temp_path)
+            raise
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stage_all(self, uploaded_files, staging_dir: str) -> list:
+        """Stream every file into staging_dir; returns (temp path, SavedUpload) pairs, or raises and keeps nothing"""
+        from werkzeug.utils import secure_filename
+        os.makedirs(staging_dir, exist_ok=True)
+
+        staged = []
+        try:
+            for uploaded_file in uploaded_files:
+                original_name = getattr(uploaded_file, "filename", None) or getattr(uploaded_file, "name", "upload.pdf")
+                filename = secure_filename(original_name) or "upload.pdf"
+                temp_path, content_hash, size, page_objects = self._stream_to_temp(uploaded_file, original_name, staging_dir)
+                staged.append((temp_path, SavedUpload(
+                    filename=filename,
+                    file_path=temp_path,
+                    content_hash=content_hash,
+                    size=size,
+                    page_objects=page_objects
+                )))
+        except BaseException:
+            for temp_path, _ in staged:
+                self._discard(temp_path)
+            raise
+        return staged
+
+    def save_all(self, uploaded_files, upload_dir: str) -> List[SavedUpload]:
+        """Validate and save every file under its own name in upload_dir, or none of them"""
+        staged = self.stage_all(uploaded_files, upload_dir)
+
+        # Every file passed: move them into place (atomic on the same filesystem)
+        for temp_path, saved in staged:
+            saved.file_path = os.path.join(upload_dir, saved.filename)
+            os.replace(temp_path, saved.file_path)
+            logger.info(f"Saved upload {saved.filename} ({saved.size} bytes, sha256 {saved.content_hash[:12]})")
+        return [saved for _, saved in staged]
@@ -1,11 +1,22 @@
 import os
-from typing import List
+import uuid
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Pinecone as LangchainPinecone
-from langchain_core.documents import Document
-from pinecone import Pinecone, ServerlessSpec
 import logging
+from ..utils.metrics import track, timed, estimate_tokens
+from ..utils.rate_limiter import embedding_governor
+from ..database.connection import get_namespace_documents, get_index_dimension, EMBEDDING_DIMENSION
+from .tenancy import NamespaceTenancy
+from .namespace_stats import namespace_stats
+from .chat_buffer import chat_buffer, CHAT_WRITE_BUFFER
+from . import embedding_provider
+from .index_alias import IndexAliases, IndexTarget
+
+# LangChain, the Gemini SDK and the Pinecone client are imported where they are first
+# used so that importing this module (and the web app) stays fast
 
 # Load environment variables
 load_dotenv()
@@ -13,51 +24,111 @@ load_dotenv()
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Texts per embedding request (GoogleGenerativeAIEmbeddings sends batches of up to 100)
+EMBEDDING_REQUEST_BATCH = 100
+
+# Index queries run in parallel by one batch search
+SEARCH_BATCH_MAX_WORKERS = int(os.getenv("SEARCH_BATCH_MAX_WORKERS", "8"))
+
+# Namespace holding the chunks of every uploaded document once, keyed by content hash.
+# A session's documents are selected from it with a metadata filter on content_hash.
+DOCUMENT_VECTOR_NAMESPACE = os.getenv("DOCUMENT_VECTOR_NAMESPACE", "documents")
+
+def create_embeddings():
+    """Build the embeddings client (EMBEDDING_PROVIDER, see embedding_provider), or None when it is not configured"""
+    return embedding_provider.create_embeddings(dimension=EMBEDDING_DIMENSION)
+
+def create_vector_client(index_name: str):
+    """Build the vector store client and make sure the index exists.
+    
+    A missing index is created with the dimension of its saved projection, or
+    INDEX_DIMENSION. VECTOR_BACKEND=local uses an in-process NumPy index instead of
+    Pinecone (no network, data kept in memory) for development, benchmarks and CI.
+    """
+    dimension = get_index_dimension(index_name)
+    if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "local":
+        from .local_vector_store import LocalVectorClient
+        client = LocalVectorClient(dimension=dimension)
+        client.create_index(name=index_name, dimension=dimension)
+        logger.info(f"Using local vector index: {index_name}")
+        return client
+    
+    pinecone_api_key = os.getenv("PINECONE_API_KEY")
+    if not pinecone_api_key:
+        logger.warning("PINECONE_API_KEY not found. Vector storage may not work.")
+        return None
+    
+    # Initialize Pinecone with new API
+    from pinecone import Pinecone, ServerlessSpec
+    client = Pinecone(api_key=pinecone_api_key)
+    
+    # Check if index exists, create if not
+    try:
+        client.describe_index(index_name)
+        logger.info(f"Using existing Pinecone index: {index_name}")
+    except:
+        logger.info(f"Creating new Pinecone index: {index_name} ({dimension} dimensions)")
+        client.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        )
+    return client
+
 class VectorService:
     def __init__(self):
+        # PINECONE_INDEX_NAME is an alias: the physical index (and its dimension) can change at runtime
+        self.index_alias = os.getenv("PINECONE_INDEX_NAME", "chat-pdf-index")
+        self.aliases = IndexAliases(self.index_alias)
         try:
-            # Initialize embeddings
-            google_api_key = os.getenv("GOOGLE_API_KEY")
-            if not google_api_key:
-                logger.warning("GOOGLE_API_KEY not found. Embeddings may not work.")
-                self.embeddings = None
-            else:
-                self.embeddings = GoogleGenerativeAIEmbeddings(
-                    model="models/embedding-001",
-                    google_api_key=google_api_key
-                )
-            
-            # Initialize Pinecone
-            self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
-            self.index_name = os.getenv("PINECONE_INDEX_NAME", "chat-pdf-index")
-            
-            if not self.pinecone_api_key:
-                logger.warning("PINECONE_API_KEY not found. Vector storage may not work.")
-                self.pc = None
-            else:
-                # Initialize Pinecone with new API
-                self.pc = Pinecone(api_key=self.pinecone_api_key)
-                
-                # Check if index exists, create if not
-                try:
-                    self.pc.describe_index(self.index_name)
-                    logger.info(f"Using existing Pinecone index: {self.index_name}")
-                except:
-                    logger.info(f"Creating new Pinecone index: {self.index_name}")
-                    self.pc.create_index(
-                        name=self.index_name,
-                        dimension=768,  # Google embeddings dimension
-                        metric="cosine",
-                        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-                    )
+            self.tenancy = NamespaceTenancy()
+            self.embeddings = create_embeddings()
+            self.pc = create_vector_client(self.index_name)
+            if self.pc:
+                namespace_stats.start_reconciler(self.index)
+            if self.pc and self.embeddings and CHAT_WRITE_BUFFER:
+                chat_buffer.start(self.store_chat_messages)
                     
         except Exception as e:
             logger.error(f"Error initializing Vector Service: {str(e)}")
+            self.tenancy = NamespaceTenancy()
             self.embeddings = None
             self.pc = None
         
-    def store_document_vectors(self, text_chunks: List[str], namespace: str):
-        """Store document text chunks as vectors in Pinecone with namespace"""
+    @property
+    def index_name(self) -> str:
+        """Physical index the alias currently points to"""
+        return self.aliases.index_name()
+    
+    def target(self) -> IndexTarget:
+        """Where the alias points now; a write resolves it once so its embeddings fit the index it writes to"""
+        return self.aliases.resolve(self.pc)
+    
+    def index(self, target: IndexTarget = None):
+        """The active index (writes are mirrored to the migration target while the alias is being migrated)"""
+        return (target or self.target()).index(self.pc)
+    
+    def _project(self, vectors: List[List[float]], target: IndexTarget = None) -> List[List[float]]:
+        """Reduce embeddings to the dimension of the target index"""
+        projection = (target or self.target()).projection
+        if projection.is_identity or not vectors:
+            return vectors
+        return projection.apply(vectors).tolist()
+    
+    @staticmethod
+    def document_chunk_id(namespace: str, content_hash: str, chunk_index: int) -> str:
+        """Vector ID of one chunk of a document in a namespace"""
+        return f"{namespace}_{content_hash[:16]}_chunk_{chunk_index}"
+    
+    def store_document_vectors(self, text_chunks: List[str], namespace: str, content_hash: str = None,
+                               wait_for_index: bool = True):
+        """Store document text chunks as vectors in Pinecone with namespace.
+        
+        With a content_hash the vector IDs are derived from it, so the chunks of one
+        document can later be found (and copied) by hash. wait_for_index=False skips the
+        post-write verification (used for all but the last document of an upload).
+        """
         try:
             if not self.embeddings or not self.pc:
                 logger.error("Vector service not properly configured. Cannot store vectors.")
@@ -68,17 +139,18 @@ class VectorService:
             logger.info(f"Index name: {self.index_name}")
             
             # Get the index object
-            index = self.pc.Index(self.index_name)
+            target = self.target()
+            index = self.index(target)
             logger.info(f"Index object created successfully: {type(index)}")
             
             # Generate embeddings for all chunks
-            embeddings_list = self.embeddings.embed_documents(text_chunks)
+            embeddings_list = self.embed_documents(text_chunks, target)
             logger.info(f"Generated {len(embeddings_list)} embeddings")
             
             # Prepare vectors for upsert
             vectors_to_upsert = []
             for i, (chunk, embedding) in enumerate(zip(text_chunks, embeddings_list)):
-                vector_id = f"{namespace}_chunk_{i}"
+                vector_id = self.document_chunk_id(namespace, content_hash, i) if content_hash else f"{namespace}_chunk_{i}"
                 metadata = {
                     'namespace': namespace,
                     'chunk_index': i,
@@ -86,31 +158,36 @@ class VectorService:
                     'type': 'document',
                     'text': chunk[:1000]  # Store first 1000 chars of text
                 }
+                if content_hash:
+                    metadata['content_hash'] = content_hash
                 vectors_to_upsert.append((vector_id, embedding, metadata))
             
             # Upsert vectors to Pinecone
-            index.upsert(vectors=vectors_to_upsert, namespace=namespace)
+            with track("vector.upsert"):
+                index.upsert(vectors=vectors_to_upsert, namespace=namespace)
+            namespace_stats.record_upsert(namespace, len(vectors_to_upsert))
             logger.info(f"✅ Stored {len(text_chunks)} chunks in namespace {namespace}")
             
+            if not wait_for_index:
+                return True
+            
             # Wait a moment for Pinecone to process the vectors
             import time
-            time.sleep(2)
+            if not getattr(self.pc, 'read_after_write', False):
+                time.sleep(2)
             
-            # Verify the vectors were stored by checking stats
+            # Verify the vectors were stored by fetching the last one (a point read, not full index stats)
             try:
-                stats = index.describe_index_stats()
-                namespace_stats = stats.get('namespaces', {}).get(namespace, {})
-                vector_count = namespace_stats.get('vector_count', 0)
-                logger.info(f"Verification: Namespace {namespace} now has {vector_count} vectors")
+                last_id = vectors_to_upsert[-1][0]
+                visible = self._is_visible(index, last_id, namespace)
+                logger.info(f"Verification: last chunk in namespace {namespace} {'is' if visible else 'is not yet'} visible")
                 
-                if vector_count == 0:
+                if not visible:
                     logger.warning(f"Warning: No vectors found immediately after upload in namespace {namespace}")
                     # Wait a bit more and check again
                     time.sleep(3)
-                    stats = index.describe_index_stats()
-                    namespace_stats = stats.get('namespaces', {}).get(namespace, {})
-                    vector_count = namespace_stats.get('vector_count', 0)
-                    logger.info(f"Second verification: Namespace {namespace} now has {vector_count} vectors")
+                    visible = self._is_visible(index, last_id, namespace)
+                    logger.info(f"Second verification: last chunk in namespace {namespace} {'is' if visible else 'is not yet'} visible")
                     
             except Exception as e:
                 logger.warning(f"Could not verify vector storage: {e}")
@@ -122,6 +199,185 @@ class VectorService:
             logger.error(f"❌ Error storing vectors: {str(e)}")
             raise e
     
+    @staticmethod
+    def _is_visible(index, vector_id: str, namespace: str) -> bool:
+        response = index.fetch(ids=[vector_id], namespace=namespace)
+        fetched = response.vectors if hasattr(response, 'vectors') else response.get('vectors', {})
+        return vector_id in fetched
+    
+    @timed("vector.copy_document")
+    def copy_document_vectors(self, content_hash: str, chunk_count: int, source_namespace: str,
+                              target_namespace: str, batch_size: int = 100) -> bool:
+        """Copy a document's chunk vectors between namespaces without re-embedding.
+        
+        Returns False if any chunk is missing from the source, in which case the caller
+        should ingest the document normally.
+        """
+        if not self.pc or not chunk_count:
+            return False
+        
+        index = self.index()
+        for start in range(0, chunk_count, batch_size):
+            ids = [
+                self.document_chunk_id(source_namespace, content_hash, i)
+                for i in range(start, min(start + batch_size, chunk_count))
+            ]
+            response = index.fetch(ids=ids, namespace=source_namespace)
+            fetched = response.vectors if hasattr(response, 'vectors') else response.get('vectors', {})
+            if len(fetched) != len(ids):
+                logger.warning(f"Document {content_hash[:12]} is incomplete in {source_namespace}; cannot copy")
+                return False
+            
+            vectors_to_upsert = []
+            for i, vector_id in enumerate(ids, start=start):
+                vector = fetched[vector_id]
+                values = vector.values if hasattr(vector, 'values') else vector['values']
+                metadata = dict((vector.metadata if hasattr(vector, 'metadata') else vector.get('metadata')) or {})
+                metadata['namespace'] = target_namespace
+                vectors_to_upsert.append((self.document_chunk_id(target_namespace, content_hash, i), values, metadata))
+            
+            with track("vector.upsert"):
+                index.upsert(vectors=vectors_to_upsert, namespace=target_namespace)
+            namespace_stats.record_upsert(target_namespace, len(vectors_to_upsert))
+        
+        logger.info(f"♻️ Reused {chunk_count} vectors of document {content_hash[:12]} in namespace {target_namespace}")
+        return True
+    
+    def delete_document_vectors(self, content_hash: str, chunk_count: int, namespace: str = DOCUMENT_VECTOR_NAMESPACE,
+                                batch_size: int = 1000):
+        """Delete the chunk vectors of one document (called once no session references it)"""
+        if not self.pc or not chunk_count:
+            return
+        
+        index = self.index()
+        for start in range(0, chunk_count, batch_size):
+            ids = [
+                self.document_chunk_id(namespace, content_hash, i)
+                for i in range(start, min(start + batch_size, chunk_count))
+            ]
+            index.delete(ids=ids, namespace=namespace)
+            namespace_stats.record_delete(namespace, len(ids))
+        logger.info(f"🗑️ Deleted {chunk_count} vectors of document {content_hash[:12]} from namespace {namespace}")
+    
+    def document_scope(self, namespace: str) -> List[tuple]:
+        """Where to search for a session's documents: (namespace, metadata filter, vector count) triples.
+        
+        Documents stored in the shared namespace are selected by content hash, and
+        documents from before that are searched directly. Namespaces without document
+        rows, such as chat history, are resolved through the tenancy layer. The vector
+        count is None when only the index knows it.
+        """
+        documents = get_namespace_documents(namespace)
+        if not documents:
+            return self.tenancy.scope(namespace)
+        
+        scope = []
+        shared = {}
+        for document in documents:
+            if document['vector_namespace']:
+                hashes = shared.setdefault(document['vector_namespace'], {})
+                hashes[document['content_hash']] = document['chunk_count'] or 0
+        for vector_namespace, hashes in shared.items():
+            scope.append((vector_namespace, {'content_hash': {'$in': sorted(hashes)}}, sum(hashes.values())))
+        if any(not document['vector_namespace'] for document in documents):
+            scope.append((namespace, None, None))
+        return scope
+    
+    def count_scope_vectors(self, namespace: str):
+        """Number of vectors visible in a namespace, from local counts only; None if not known yet.
+        
+        Counts come from the document rows, the tenancy layer and the namespace stats
+        registry, so this never calls describe_index_stats. A namespace is unknown until
+        it has been written or reconciled since the registry was introduced.
+        """
+        scope = self.document_scope(namespace)
+        unknown = [query_namespace for query_namespace, _, vector_count in scope if vector_count is None]
+        registered = namespace_stats.vector_counts(unknown)
+        total = 0
+        for query_namespace, _, vector_count in scope:
+            if vector_count is None:
+                vector_count = registered.get(query_namespace)
+                if vector_count is None:
+                    return None
+            total += vector_count
+        return total
+    
+    def _embedding_call(self, func, tokens: int):
+        """Call the embeddings client through the rate limiter, unless it runs locally"""
+        if not getattr(self.embeddings, "rate_limited", True):
+            return func()
+        return embedding_governor.call(func, tokens=tokens)
+    
+    async def _aembedding_call(self, func, tokens: int):
+        if not getattr(self.embeddings, "rate_limited", True):
+            return await func()
+        return await embedding_governor.acall(func, tokens=tokens)
+    
+    @timed("vector.embed_documents")
+    def embed_documents(self, texts: List[str], target: IndexTarget = None) -> List[List[float]]:
+        """Embed texts through the rate limiter, one request-sized batch per call.
+        
+        Separate calls let interactive requests take the next free slot between the
+        batches of a large document instead of waiting for all of it. The vectors are
+        reduced to the dimension of the target index (the alias's current one by default).
+        """
+        embeddings = []
+        for start in range(0, len(texts), EMBEDDING_REQUEST_BATCH):
+            batch = texts[start:start + EMBEDDING_REQUEST_BATCH]
+            embeddings.extend(self._embedding_call(
+                lambda: self.embeddings.embed_documents(batch),
+                tokens=sum(estimate_tokens(text) for text in batch)
+            ))
+        return self._project(embeddings, target)
+    
+    @timed("vector.embed_query")
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a single query string"""
+        vector = self._embedding_call(lambda: self.embeddings.embed_query(query), tokens=estimate_tokens(query))
+        return self._project([vector])[0]
+    
+    @timed("vector.query")
+    def query_by_vector(self, vector: List[float], namespace: str, k: int = 5, scope: List[tuple] = None,
+                        shared: Dict[str, object] = None) -> List:
+        """Return the k nearest document chunks in a namespace for an already-embedded query.
+        
+        scope is the namespace's document_scope() when the caller already has it. Chunks
+        found in shared (by vector ID) are reused instead of building a new Document, and
+        new ones are added to it.
+        """
+        index = self.index()
+        
+        matches = []
+        if scope is None:
+            scope = self.document_scope(namespace)
+        for query_namespace, metadata_filter, _ in scope:
+            query_response = index.query(
+                vector=vector,
+                top_k=k,
+                namespace=query_namespace,
+                filter=metadata_filter,
+                include_metadata=True
+            )
+            matches.extend(query_response.matches)
+        if len(scope) > 1:
+            matches = sorted(matches, key=lambda match: match.score, reverse=True)[:k]
+        
+        from langchain_core.documents import Document
+        
+        results = []
+        for match in matches:
+            document = shared.get(match.id) if shared is not None else None
+            if document is None:
+                metadata = dict(match.metadata or {})
+                text = metadata.pop('text', None)
+                if text is None:
+                    continue
+                document = Document(page_content=text, metadata=metadata)
+                if shared is not None:
+                    shared[match.id] = document
+            results.append(document)
+        return results
+    
     def search_documents(self, query: str, namespace: str, k: int = 5) -> List:
         """Search for relevant documents from namespace"""
         try:
@@ -131,15 +387,8 @@ class VectorService:
             
             logger.info(f"Searching documents in namespace {namespace} with query: {query[:50]}...")
             
-            # Create vectorstore from existing index
-            vectorstore = LangchainPinecone.from_existing_index(
-                index_name=self.index_name,
-                embedding=self.embeddings,
-                namespace=namespace
-            )
-            
             # Search for similar documents
-            results = vectorstore.similarity_search(query, k=k)
+            results = self.query_by_vector(self.embed_query(query), namespace, k=k)
             
             logger.info(f"🔍 Found {len(results)} relevant documents for query")
             return results
@@ -148,6 +397,77 @@ class VectorService:
             logger.error(f"❌ Error searching documents: {str(e)}")
             return []
     
+    def search_documents_batch(self, queries: List[str], namespace: str, k: int = 5) -> List[List]:
+        """Search a namespace for several queries at once; returns one result list per query.
+        
+        The queries are embedded together (one embedding request per 100 queries), the
+        namespace's scope is resolved once and the index queries run in parallel. A chunk
+        retrieved for several queries is the same Document object in each of their lists.
+        """
+        if not queries:
+            return []
+        try:
+            if not self.embeddings or not self.pc:
+                logger.error("Vector service not properly configured. Cannot search documents.")
+                return [[] for _ in queries]
+            
+            logger.info(f"Searching documents in namespace {namespace} for {len(queries)} queries")
+            vectors = self.embed_documents(list(queries))
+            scope = self.document_scope(namespace)
+            shared = {}
+            workers = max(1, min(len(vectors), SEARCH_BATCH_MAX_WORKERS))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vector-search") as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self.query_by_vector, vector, namespace, k,
+                                    scope, shared)
+                    for vector in vectors
+                ]
+                results = [future.result() for future in futures]
+            
+            retrieved = sum(len(docs) for docs in results)
+            logger.info(f"🔍 Found {retrieved} relevant documents ({len(shared)} distinct) for {len(queries)} queries")
+            return results
+            
+        except Exception as e:
+            logger.error(f"❌ Error searching documents: {str(e)}")
+            return [[] for _ in queries]
+    
+    @timed("vector.embed_query")
+    async def aembed_query(self, query: str) -> List[float]:
+        """Embed a single query string without blocking the event loop"""
+        vector = await self._aembedding_call(lambda: self.embeddings.aembed_query(query), tokens=estimate_tokens(query))
+        return self._project([vector])[0]
+    
+    async def aquery_by_vector(self, vector: List[float], namespace: str, k: int = 5) -> List:
+        """Async version of query_by_vector; the Pinecone client is blocking so it runs in a worker thread"""
+        return await asyncio.to_thread(self.query_by_vector, vector, namespace, k)
+    
+    async def asearch_documents(self, query: str, namespace: str, k: int = 5) -> List:
+        """Async version of search_documents"""
+        try:
+            if not self.embeddings or not self.pc:
+                logger.error("Vector service not properly configured. Cannot search documents.")
+                return []
+            
+            vector = await self.aembed_query(query)
+            results = await self.aquery_by_vector(vector, namespace, k)
+            
+            logger.info(f"🔍 Found {len(results)} relevant documents for query")
+            return results
+            
+        except Exception as e:
+            logger.error(f"❌ Error searching documents: {str(e)}")
+            return []
+    
+    async def aget_all_documents(self, namespace: str, k: int = 20) -> List:
+        """Async version of get_all_documents"""
+        return await asyncio.to_thread(self.get_all_documents, namespace, k)
+    
+    async def aget_chat_history(self, namespace: str, k: int = 50) -> List:
+        """Async version of get_chat_history"""
+        return await asyncio.to_thread(self.get_chat_history, namespace, k)
+    
+    @timed("vector.store_chat_message")
     def store_chat_message(self, message: str, namespace: str, metadata: dict):
         """Store chat message in vector database"""
         try:
@@ -158,36 +478,73 @@ class VectorService:
             logger.info(f"Storing chat message in namespace: {namespace}")
             logger.info(f"Message preview: {message[:100]}...")
             
-            # Add text to metadata for retrieval
-            metadata['text'] = message
-            
-            vectorstore = LangchainPinecone.from_texts(
-                texts=[message],
-                embedding=self.embeddings,
-                index_name=self.index_name,
-                namespace=namespace,
-                metadatas=[metadata]
-            )
+            entry = {"id": str(uuid.uuid4()), "namespace": namespace, "text": message, "metadata": metadata}
+            vector_id = self.store_chat_messages([entry])[0]
             
             logger.info(f"✅ Successfully stored chat message in namespace {namespace}")
-            return vectorstore
+            return vector_id
             
         except Exception as e:
             logger.error(f"❌ Error storing chat message: {str(e)}")
             return None
     
+    def enqueue_chat_message(self, message: str, namespace: str, metadata: dict):
+        """Queue a chat message for the write-behind buffer (stored in the background, journaled until then)"""
+        if not CHAT_WRITE_BUFFER or not self.embeddings or not self.pc:
+            return self.store_chat_message(message, namespace, metadata)
+        return chat_buffer.append(message, namespace, metadata)
+    
+    @timed("vector.store_chat_messages")
+    def store_chat_messages(self, entries: List[dict]) -> List[str]:
+        """Embed a batch of chat messages at once and upsert them, one call per namespace.
+        
+        entries are {"id", "namespace", "text", "metadata"} dicts; the same id always
+        gives the same vector ID, so storing an entry again overwrites it. Returns the
+        vector IDs. Raises on failure (the write-behind buffer retries the batch).
+        """
+        if not self.embeddings or not self.pc:
+            raise RuntimeError("Vector service not properly configured")
+        
+        target = self.target()
+        embeddings = self.embed_documents([entry["text"] for entry in entries], target)
+        
+        index = self.index(target)
+        by_namespace = {}
+        vector_ids = []
+        for entry, embedding in zip(entries, embeddings):
+            namespace = entry["namespace"]
+            # Add text to metadata for retrieval
+            metadata = dict(entry["metadata"], text=entry["text"])
+            shard = self.tenancy.write_namespace(namespace, index)
+            if shard:
+                # Sharded: stored in a shared namespace, tagged with the logical namespace
+                vector_id = self.tenancy.vector_id(namespace, entry["id"])
+                metadata['tenant'] = namespace
+            else:
+                vector_id = entry["id"]
+            by_namespace.setdefault((shard or namespace, shard and namespace), []).append(
+                (vector_id, embedding, metadata)
+            )
+            vector_ids.append(vector_id)
+        
+        for (write_namespace, tenant), vectors in by_namespace.items():
+            with track("vector.upsert"):
+                index.upsert(vectors=vectors, namespace=write_namespace)
+            namespace_stats.record_upsert(write_namespace, len(vectors))
+            if tenant:
+                self.tenancy.record_write(tenant, write_namespace, len(vectors))
+        logger.info(f"✅ Stored {len(entries)} chat messages in {len(by_namespace)} namespaces")
+        return vector_ids
+    
+    def similarity_search(self, query: str, namespace: str, k: int = 5) -> List:
+        """Embed a query and return the k most similar entries in a namespace"""
+        return self.query_by_vector(self.embed_query(query), namespace, k=k)
+    
     def search_similar_content(self, query: str, session_id: str, k: int = 5) -> List[str]:
         """Search for relevant content from user's documents"""
         try:
-            # Create vectorstore from existing index
-            vectorstore = LangchainPinecone.from_existing_index(
-                index_name=self.index_name,
-                embedding=self.embeddings,
-                namespace=session_id
-            )
-            
             # Search for similar documents
-            results = vectorstore.similarity_search(query, k=k)
+            results = self.similarity_search(query, session_id, k=k)
             
             # Extract text content
             relevant_texts = [doc.page_content for doc in results]
@@ -203,7 +560,7 @@ class VectorService:
         """Clear all vectors for a specific session"""
         try:
             # In new Pinecone API, access index directly using the index name
-            index = self.pc.Index(self.index_name)
+            index = self.index()
             
             # Delete all vectors in the session namespace
             index.delete(delete_all=True, namespace=session_id)
@@ -216,14 +573,8 @@ class VectorService:
     def get_session_stats(self, session_id: str) -> dict:
         """Get statistics for a session's stored documents"""
         try:
-            index = self.pc.Index(self.index_name)
-            stats = index.describe_index_stats()
-            
-            # Get namespace-specific stats
-            namespace_stats = stats.get('namespaces', {}).get(session_id, {})
-            
             return {
-                'total_vectors': namespace_stats.get('vector_count', 0),
+                'total_vectors': self.count_scope_vectors(session_id) or 0,
                 'session_id': session_id
             }
             
@@ -231,6 +582,7 @@ class VectorService:
             print(f"❌ Error getting session stats: {str(e)}")
             return {'total_vectors': 0, 'session_id': session_id}
     
+    @timed("vector.get_all_documents")
     def get_all_documents(self, namespace: str, k: int = 20) -> List:
         """Get all documents from namespace"""
         try:
@@ -238,89 +590,43 @@ class VectorService:
                 logger.error("Vector service not properly configured. Cannot get documents.")
                 return []
             
-            # Get the index object
-            index = self.pc.Index(self.index_name)
-            
             logger.info(f"Attempting to retrieve documents from namespace {namespace}")
             
-            # First, check namespace stats to see if any vectors exist
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    stats = index.describe_index_stats()
-                    namespace_stats = stats.get('namespaces', {}).get(namespace, {})
-                    vector_count = namespace_stats.get('vector_count', 0)
-                    logger.info(f"Attempt {retry + 1}: Namespace {namespace} has {vector_count} vectors")
-                    
-                    if vector_count > 0:
-                        break
-                    elif retry < max_retries - 1:
-                        logger.info(f"No vectors found, waiting 2 seconds before retry...")
-                        import time
-                        time.sleep(2)
-                    else:
-                        logger.warning(f"No vectors found in namespace {namespace} after {max_retries} attempts")
-                        return []
-                        
-                except Exception as e:
-                    logger.warning(f"Could not get namespace stats on attempt {retry + 1}: {e}")
-                    if retry < max_retries - 1:
-                        import time
-                        time.sleep(2)
+            # First, check the locally tracked count to see if any vectors exist. It is updated
+            # by the write itself, so there is no index lag to wait out.
+            try:
+                vector_count = self.count_scope_vectors(namespace)
+                logger.info(f"Namespace {namespace} has {vector_count if vector_count is not None else 'unknown'} vectors")
+                if vector_count == 0:
+                    logger.warning(f"No vectors found in namespace {namespace}")
+                    return []
+            except Exception as e:
+                logger.warning(f"Could not get namespace vector count: {e}")
             
             # Try multiple approaches to retrieve documents
             documents = []
             
             # Approach 1: Try with a very generic query
             try:
-                query_embedding = self.embeddings.embed_query("content text information")
-                
-                query_response = index.query(
-                    vector=query_embedding,
-                    top_k=k,
-                    namespace=namespace,
-                    include_metadata=True
-                )
-                
-                logger.info(f"Query returned {len(query_response.matches)} matches")
-                
-                for match in query_response.matches:
-                    if 'text' in match.metadata:
-                        # Create a simple document object
-                        doc = type('Document', (), {
-                            'page_content': match.metadata['text'],
-                            'metadata': match.metadata
-                        })()
-                        documents.append(doc)
+                documents = self.similarity_search("content text information", namespace, k=k)
+                logger.info(f"Query returned {len(documents)} matches")
                         
             except Exception as e:
                 logger.warning(f"Query approach failed: {e}")
             
-            # Approach 2: If no documents found, try using LangChain vectorstore
+            # Approach 2: If no documents found, try other generic search terms
             if not documents:
-                try:
-                    logger.info("Trying LangChain vectorstore approach")
-                    vectorstore = LangchainPinecone.from_existing_index(
-                        index_name=self.index_name,
-                        embedding=self.embeddings,
-                        namespace=namespace
-                    )
-                    
-                    # Try similarity search with generic terms
-                    search_terms = ["information", "content", "text", "data", "document"]
-                    for term in search_terms:
-                        try:
-                            results = vectorstore.similarity_search(term, k=k)
-                            if results:
-                                documents.extend(results)
-                                logger.info(f"Found {len(results)} documents with search term '{term}'")
-                                break
-                        except Exception as e:
-                            logger.warning(f"Search with term '{term}' failed: {e}")
-                            continue
-                            
-                except Exception as e:
-                    logger.warning(f"LangChain approach failed: {e}")
+                search_terms = ["information", "content", "text", "data", "document"]
+                for term in search_terms:
+                    try:
+                        results = self.similarity_search(term, namespace, k=k)
+                        if results:
+                            documents.extend(results)
+                            logger.info(f"Found {len(results)} documents with search term '{term}'")
+                            break
+                    except Exception as e:
+                        logger.warning(f"Search with term '{term}' failed: {e}")
+                        continue
             
             logger.info(f"Retrieved {len(documents)} documents from namespace {namespace}")
             return documents
@@ -329,6 +635,7 @@ class VectorService:
             logger.error(f"Error getting all documents: {str(e)}")
             return []
     
+    @timed("vector.get_chat_history")
     def get_chat_history(self, namespace: str, k: int = 50) -> List:
         """Get chat history from namespace - searches for individual messages"""
         try:
@@ -338,50 +645,45 @@ class VectorService:
                 
             logger.info(f"Getting chat history from namespace: {namespace}")
             
-            # First check if namespace exists and has vectors
+            # Messages of this session still in the write-behind buffer are stored first
+            if chat_buffer.has_pending(namespace) and not chat_buffer.flush():
+                logger.warning(f"Buffered chat messages of {namespace} are not stored yet")
+            
+            # First check if namespace has vectors (known locally for sharded namespaces)
             try:
-                index = self.pc.Index(self.index_name)
-                stats = index.describe_index_stats()
-                namespace_stats = stats.get('namespaces', {}).get(namespace, {})
-                vector_count = namespace_stats.get('vector_count', 0)
-                logger.info(f"Chat namespace {namespace} has {vector_count} vectors")
+                vector_count = self.count_scope_vectors(namespace)
+                logger.info(f"Chat namespace {namespace} has {vector_count if vector_count is not None else 'unknown'} vectors")
                 
                 if vector_count == 0:
                     logger.info(f"No chat messages found in namespace {namespace}")
                     return []
                     
             except Exception as e:
-                logger.warning(f"Could not check namespace stats: {e}")
+                logger.warning(f"Could not check namespace vector count: {e}")
             
-            # Try to use LangChain vectorstore to get chat history
+            # Search the chat namespace for individual messages
             try:
-                vectorstore = LangchainPinecone.from_existing_index(
-                    index_name=self.index_name,
-                    embedding=self.embeddings,
-                    namespace=namespace
-                )
-                
                 # Try different search strategies for individual messages
                 docs = []
                 
                 # Strategy 1: Search for user messages
-                user_docs = vectorstore.similarity_search("user message question", k=k//2)
+                user_docs = self.similarity_search("user message question", namespace, k=k//2)
                 logger.info(f"Found {len(user_docs)} user message docs")
                 docs.extend(user_docs)
                 
                 # Strategy 2: Search for assistant messages
-                assistant_docs = vectorstore.similarity_search("assistant response answer", k=k//2)
+                assistant_docs = self.similarity_search("assistant response answer", namespace, k=k//2)
                 logger.info(f"Found {len(assistant_docs)} assistant message docs")
                 docs.extend(assistant_docs)
                 
                 # Strategy 3: If no results, try broader search
                 if not docs:
-                    docs = vectorstore.similarity_search("message chat conversation", k=k)
+                    docs = self.similarity_search("message chat conversation", namespace, k=k)
                     logger.info(f"Found {len(docs)} docs with 'message chat conversation' search")
                 
                 # Strategy 4: Generic search to get any documents
                 if not docs:
-                    docs = vectorstore.similarity_search("", k=k)
+                    docs = self.similarity_search("", namespace, k=k)
                     logger.info(f"Found {len(docs)} docs with empty search")
                 
                 # Remove duplicates based on content
@@ -397,13 +699,14 @@ class VectorService:
                 return unique_docs
                 
             except Exception as e:
-                logger.error(f"Error using LangChain vectorstore for chat history: {str(e)}")
+                logger.error(f"Error searching chat history: {str(e)}")
                 return []
             
         except Exception as e:
             logger.error(f"Error getting chat history: {str(e)}")
             return []
     
+    @timed("vector.clear_namespace")
     def clear_namespace(self, namespace: str):
         """Clear all vectors from a namespace"""
         try:
@@ -412,8 +715,14 @@ class VectorService:
                 return
                 
             # Get the index directly from Pinecone
-            index = self.pc.Index(self.index_name)
+            index = self.index()
+            chat_buffer.discard(namespace)
+            tenant = self.tenancy.clear(namespace, index)
+            # Vectors deleted by filter were not counted; reconciliation corrects the shard's count
+            if tenant and tenant["deleted"]:
+                namespace_stats.record_delete(tenant["shard"], tenant["deleted"])
             index.delete(delete_all=True, namespace=namespace)
+            namespace_stats.record_cleared(namespace)
             logger.info(f"🗑️ Cleared namespace: {namespace}")
         except Exception as e:
             if "Namespace not found" not in str(e):
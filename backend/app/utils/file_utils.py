@@ -24,20 +24,34 @@ class FileUtils:
         """Check if file is a PDF"""
         return filename.lower().endswith('.pdf')
     
+    @staticmethod
+    def get_upload_size(file) -> int:
+        """Size of an uploaded file in bytes, found by seeking instead of reading it"""
+        stream = getattr(file, 'stream', file)
+        try:
+            position = stream.tell()
+            size = stream.seek(0, os.SEEK_END)
+            stream.seek(position)
+            return size
+        except (AttributeError, OSError):
+            return getattr(file, 'content_length', 0) or 0
+    
     @staticmethod
     def validate_uploaded_files(uploaded_files, max_size_mb: int = 10) -> List[str]:
         """Validate uploaded files"""
         errors = []
         
         for file in uploaded_files:
+            name = getattr(file, 'filename', None) or getattr(file, 'name', '')
+            
             # Check if it's a PDF
-            if not FileUtils.is_pdf_file(file.name):
-                errors.append(f"File '{file.name}' is not a PDF")
+            if not FileUtils.is_pdf_file(name):
+                errors.append(f"File '{name}' is not a PDF")
             
             # Check file size
-            file_size_mb = len(file.getvalue()) / (1024 * 1024)
+            file_size_mb = FileUtils.get_upload_size(file) / (1024 * 1024)
             if file_size_mb > max_size_mb:
-                errors.append(f"File '{file.name}' is too large ({file_size_mb:.1f}MB > {max_size_mb}MB)")
+                errors.append(f"File '{name}' is too large ({file_size_mb:.1f}MB > {max_size_mb}MB)")
         
         return errors
     
@@ -0,0 +1,262 @@
+import time
+import bisect
+import asyncio
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Latency buckets in seconds, from a fast SQLite query up to a long Gemini generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage timings of the request being handled (read by the Server-Timing header)
+_request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Current value with labels (e.g. a limit or a queue depth)"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus semantics)"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels) -> dict:
+        """Count, sum and bucket counts for one label set"""
+        series = self._series.get(_label_key(labels))
+        if series is None:
+            return {"count": 0, "sum": 0.0, "buckets": [0] * (len(self.buckets) + 1)}
+        with self._lock:
+            return {"count": series[2], "sum": series[1], "buckets": list(series[0])}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics for service stages, caches, LLM tokens and HTTP requests"""
+
+    def __init__(self):
+        self.stage_duration = Histogram("agi_stage_duration_seconds", "Time spent in each service stage")
+        self.stage_calls = Counter("agi_stage_calls_total", "Calls per service stage")
+        self.stage_errors = Counter("agi_stage_errors_total", "Calls per service stage that raised")
+        self.cache_requests = Counter("agi_cache_requests_total", "Cache lookups by cache and result")
+        self.llm_tokens = Counter("agi_llm_tokens_total", "LLM tokens by direction (prompt/completion)")
+        self.request_duration = Histogram("agi_http_request_duration_seconds", "HTTP request latency")
+        self._extra: List = []
+
+    def register(self, metric):
+        """Add another Counter/Histogram (or any object with render()) to the export"""
+        self._extra.append(metric)
+        return metric
+
+    def record_stage(self, stage: str, seconds: float, error: bool = False):
+        self.stage_duration.observe(seconds, stage=stage)
+        self.stage_calls.inc(stage=stage)
+        if error:
+            self.stage_errors.inc(stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    def record_cache(self, cache: str, hit: bool):
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+    def record_tokens(self, prompt_tokens: int, completion_tokens: int, model: str = "gemini"):
+        if prompt_tokens:
+            self.llm_tokens.inc(prompt_tokens, direction="prompt", model=model)
+        if completion_tokens:
+            self.llm_tokens.inc(completion_tokens, direction="completion", model=model)
+
+    def record_request(self, method: str, endpoint: str, status: int, seconds: float):
+        self.request_duration.observe(seconds, method=method, endpoint=endpoint, status=str(status))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in (self.stage_duration, self.stage_calls, self.stage_errors,
+                       self.cache_requests, self.llm_tokens, self.request_duration, *self._extra):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def track(stage: str):
+    """Time a block of code as a named stage"""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        metrics.record_stage(stage, time.perf_counter() - start, error)
+
+
+def timed(stage: str):
+    """Decorator version of track(); works for sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token) when the API does not report usage"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def record_llm_usage(prompt: str, response, output_text: str, model: str = "gemini") -> Tuple[int, int]:
+    """Record token counts from a LangChain response, falling back to an estimate; returns (prompt, completion)"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        usage = (getattr(response, "response_metadata", None) or {}).get("usage_metadata", {}) or {}
+    prompt_tokens = usage.get("input_tokens") or usage.get("prompt_token_count") or estimate_tokens(prompt)
+    completion_tokens = usage.get("output_tokens") or usage.get("candidates_token_count") or estimate_tokens(output_text)
+    metrics.record_tokens(prompt_tokens, completion_tokens, model=model)
+    return prompt_tokens, completion_tokens
+
+
+def start_request_timing():
+    """Begin collecting stage timings for the current request"""
+    return _request_timings.set([])
+
+
+def finish_request_timing(token=None) -> List[Tuple[str, float]]:
+    """Stop collecting and return the (stage, seconds) pairs recorded for the request"""
+    timings = _request_timings.get() or []
+    if token is not None:
+        _request_timings.reset(token)
+    else:
+        _request_timings.set(None)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_seconds: float = None) -> str:
+    """Format stage timings as a Server-Timing header value (durations in ms)"""
+    totals: Dict[str, list] = {}
+    for stage, seconds in timings:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for stage, (seconds, count) in totals.items():
+        part = f"{stage};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,461 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional
+from .metrics import metrics, Counter, Gauge, Histogram
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Client-side limits per process (divide the project's quota by the number of worker processes)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "150"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "2000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Calls slower than this count as overload and shrink the concurrency limit
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "60"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1500"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "0"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+EMBEDDING_SLOW_CALL_SECONDS = float(os.getenv("EMBEDDING_SLOW_CALL_SECONDS", "10"))
+# Retries of throttled or unavailable calls (exponential backoff with full jitter, or the server's retry-after)
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", "4"))
+API_RETRY_MAX_SECONDS = float(os.getenv("API_RETRY_MAX_SECONDS", "30"))
+# Calls waiting longer than this for a slot fail instead of piling up
+API_QUEUE_TIMEOUT_SECONDS = float(os.getenv("API_QUEUE_TIMEOUT_SECONDS", "120"))
+
+# Every governed call runs in a lane: chat and history, extraction and question generation,
+# or bulk work (document ingestion, background chat persistence)
+LANE_INTERACTIVE = "interactive"
+LANE_EXTRACTION = "extraction"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_EXTRACTION, LANE_BULK)
+
+
+def _lane_setting(name: str, default: str) -> dict:
+    """Parse a "lane=value,..." env setting; lanes left out keep their default"""
+    values = {}
+    for setting in (default, os.getenv(name, "")):
+        for item in setting.split(","):
+            lane, _, value = item.partition("=")
+            try:
+                values[lane.strip()] = float(value)
+            except ValueError:
+                continue
+    return values
+
+
+# Relative share of the slots each lane gets while several lanes are waiting
+API_LANE_WEIGHTS = _lane_setting("API_LANE_WEIGHTS", "interactive=8,extraction=3,bulk=1")
+# Most of the concurrency limit a lane may hold, so interactive calls find a slot without waiting
+# for a long bulk call to finish
+API_LANE_MAX_SHARE = _lane_setting("API_LANE_MAX_SHARE", "interactive=1,extraction=0.75,bulk=0.5")
+# Part of each per-minute budget that only interactive calls may use
+API_INTERACTIVE_RESERVE = float(os.getenv("API_INTERACTIVE_RESERVE", "0.2"))
+
+# Requests outside the interactive lane, by path prefix
+REQUEST_LANES = (
+    ("/api/documents/upload", LANE_BULK),
+    ("/api/extract/", LANE_EXTRACTION),
+    ("/api/questions/", LANE_EXTRACTION),
+)
+
+_lane: contextvars.ContextVar = contextvars.ContextVar("api_lane", default=LANE_INTERACTIVE)
+
+api_calls = metrics.register(Counter(
+    "agi_api_calls_total",
+    "Governed API calls by api and result (ok/throttled/error/retried/timeout)"
+))
+api_queue_seconds = metrics.register(Histogram(
+    "agi_api_queue_seconds",
+    "Time governed API calls waited for a concurrency slot and rate limit, per api and lane"
+))
+api_concurrency_limit = metrics.register(Gauge(
+    "agi_api_concurrency_limit",
+    "Current adaptive concurrency limit per api"
+))
+api_lane_queued = metrics.register(Gauge(
+    "agi_api_lane_queue_depth",
+    "Governed API calls waiting for a slot, per api and lane"
+))
+api_lane_in_flight = metrics.register(Gauge(
+    "agi_api_lane_in_flight",
+    "Governed API calls running, per api and lane"
+))
+
+_THROTTLE_PATTERN = re.compile(r"\b429\b|resource.?exhausted|rate.?limit|quota", re.IGNORECASE)
+_UNAVAILABLE_PATTERN = re.compile(r"\b50[023]\b|unavailable|deadline.?exceeded|timed? ?out", re.IGNORECASE)
+# "Please retry in 12.3s." or a retry_delay { seconds: 12 } detail
+_RETRY_DELAY_PATTERN = re.compile(r"retry (?:in|after) (\d+(?:\.\d+)?)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+class GovernorTimeout(RuntimeError):
+    """A call waited longer than the queue timeout for a slot"""
+
+
+@contextmanager
+def api_lane(lane: str):
+    """Run governed calls made inside the block (and in tasks started from it) in a lane"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def lane_for_path(path: str) -> str:
+    for prefix, lane in REQUEST_LANES:
+        if path.startswith(prefix):
+            return lane
+    return LANE_INTERACTIVE
+
+
+def start_request_lane(path: str):
+    """Put the governed calls of the request being handled in its path's lane"""
+    return _lane.set(lane_for_path(path))
+
+
+def finish_request_lane(token=None):
+    if token is not None:
+        _lane.reset(token)
+
+
+def is_throttled(error: Exception) -> bool:
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return status == 429 or bool(_THROTTLE_PATTERN.search(f"{type(error).__name__} {error}"))
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if status in (500, 502, 503):
+        return True
+    return is_throttled(error) or bool(_UNAVAILABLE_PATTERN.search(f"{type(error).__name__} {error}"))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay the server asked for: a Retry-After header, or Gemini's retry_delay / "retry in Ns" """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1) or match.group(2)) if match else None
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously. reserve() always takes the amount and returns how
+    long to wait before using it, so large requests go into debt instead of starving. A caller
+    passing a reserve fraction waits until the budget is back above that part of the capacity."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, reserve: float = 0.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            floor = self.capacity * reserve
+            return 0.0 if self._tokens >= floor else (floor - self._tokens) / self.rate
+
+
+class _Lane:
+    __slots__ = ("name", "weight", "max_share", "queue", "in_flight", "virtual_time")
+
+    def __init__(self, name: str, weight: float, max_share: float):
+        self.name = name
+        self.weight = max(weight, 0.01)
+        self.max_share = min(max(max_share, 0.0), 1.0)
+        self.queue = deque()
+        self.in_flight = 0
+        self.virtual_time = 0.0
+
+
+class _Waiter:
+    __slots__ = ("lane", "granted", "wake")
+
+    def __init__(self, lane: _Lane, wake: Callable[[], None]):
+        self.lane = lane
+        self.granted = False
+        self.wake = wake
+
+
+class APIGovernor:
+    """Client-side rate and concurrency control for one external API.
+
+    Every call takes a concurrency slot, then its share of the requests/min and
+    tokens/min buckets, waiting where needed. Calls queue per lane (see api_lane
+    and lane_for_path); free slots go to the waiting lane that has received the
+    least relative to its weight (start-time fair queueing), and no lane but the
+    interactive one can hold more than its max share of the slots or dip into
+    the interactive reserve of the budgets. The concurrency limit is adapted
+    AIMD-style: +1/limit per successful call, halved on a 429 and reduced by 10%
+    on a call slower than slow_call_seconds, at most once per typical call latency
+    (the calls in flight when the limit drops were started under the old one). Throttled
+    or unavailable calls are retried with full-jitter exponential backoff, at least
+    as long as the server's retry-after, which also holds back every other call.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 16, min_concurrency: int = 1, slow_call_seconds: float = 0,
+                 retry_attempts: int = API_RETRY_ATTEMPTS, retry_max_seconds: float = API_RETRY_MAX_SECONDS,
+                 queue_timeout: float = API_QUEUE_TIMEOUT_SECONDS):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.slow_call_seconds = slow_call_seconds
+        self.retry_attempts = retry_attempts
+        self.retry_max_seconds = retry_max_seconds
+        self.queue_timeout = queue_timeout
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._lanes = {
+            lane: _Lane(lane, API_LANE_WEIGHTS.get(lane, 1.0), API_LANE_MAX_SHARE.get(lane, 1.0)) for lane in LANES
+        }
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+        self._last_decrease = 0.0
+        self._latency = 0.0
+        self._paused_until = 0.0
+        api_concurrency_limit.set(self._limit, api=name)
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    # Slots
+
+    def _lane_cap(self, lane: _Lane) -> int:
+        return max(1, int(self.limit * lane.max_share))
+
+    def _enqueue(self, wake: Callable[[], None]) -> _Waiter:
+        """Queue for a slot in the current lane; the waiter may be granted right away"""
+        with self._lock:
+            lane = self._lanes.get(_lane.get()) or self._lanes[LANE_INTERACTIVE]
+            waiter = _Waiter(lane, wake)
+            if not lane.queue:
+                # An idle lane does not bank credit for the time it was not waiting
+                lane.virtual_time = max(lane.virtual_time, self._virtual_time)
+            lane.queue.append(waiter)
+            self._grant_waiters()
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Stop waiting; returns True if the slot was granted meanwhile (the caller then owns it)"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.lane.queue.remove(waiter)
+            self._publish()
+            return False
+
+    def _grant_waiters(self):
+        # Called with the lock held
+        while self._in_flight < self.limit:
+            ready = [lane for lane in self._lanes.values() if lane.queue and lane.in_flight < self._lane_cap(lane)]
+            if not ready:
+                break
+            lane = min(ready, key=lambda candidate: candidate.virtual_time)
+            waiter = lane.queue.popleft()
+            self._virtual_time = lane.virtual_time
+            lane.virtual_time += 1.0 / lane.weight
+            lane.in_flight += 1
+            self._in_flight += 1
+            waiter.granted = True
+            waiter.wake()
+        self._publish()
+
+    def _publish(self):
+        for lane in self._lanes.values():
+            api_lane_queued.set(len(lane.queue), api=self.name, lane=lane.name)
+            api_lane_in_flight.set(lane.in_flight, api=self.name, lane=lane.name)
+
+    def lane_stats(self) -> dict:
+        """Queued and running calls per lane"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "lanes": {
+                    lane.name: {"queued": len(lane.queue), "in_flight": lane.in_flight, "cap": self._lane_cap(lane)}
+                    for lane in self._lanes.values()
+                },
+            }
+
+    def _release(self, lane: _Lane, seconds: float, throttled: bool = False, retry_after: float = None):
+        with self._lock:
+            self._in_flight -= 1
+            lane.in_flight -= 1
+            now = time.monotonic()
+            # Moving average of call latency; a 429 usually comes back fast, so it is not counted
+            if not throttled and seconds:
+                self._latency = seconds if not self._latency else 0.8 * self._latency + 0.2 * seconds
+            if throttled or (self.slow_call_seconds and seconds > self.slow_call_seconds):
+                if now - self._last_decrease >= self._latency:
+                    factor = 0.5 if throttled else 0.9
+                    self._limit = max(float(self.min_concurrency), self._limit * factor)
+                    self._last_decrease = now
+                    logger.info(f"{self.name}: concurrency limit lowered to {self.limit} "
+                                f"({'throttled' if throttled else f'{seconds:.1f}s call'})")
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            api_concurrency_limit.set(round(self._limit, 2), api=self.name)
+            self._grant_waiters()
+
+    def _rate_delay(self, lane: _Lane, tokens: int, requests: int) -> float:
+        """Take the call's share of the buckets; returns how long to wait before sending it"""
+        reserve = 0.0 if lane.name == LANE_INTERACTIVE else API_INTERACTIVE_RESERVE
+        delay = max(self._paused_until - time.monotonic(), 0.0)
+        if self.requests:
+            delay = max(delay, self.requests.reserve(requests, reserve))
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.reserve(tokens, reserve))
+        return delay
+
+    def charge_tokens(self, tokens: int):
+        """Charge tokens only known after the call (e.g. the completion) to the tokens/min budget"""
+        if self.tokens and tokens:
+            self.tokens.reserve(tokens)
+
+    def _acquire(self, tokens: int, requests: int) -> _Lane:
+        started = time.monotonic()
+        event = threading.Event()
+        waiter = self._enqueue(event.set)
+        if not event.wait(self.queue_timeout) and not self._abandon(waiter):
+            api_calls.inc(api=self.name, result="timeout")
+            raise GovernorTimeout(f"{self.name}: no capacity after {self.queue_timeout:.0f}s")
+        delay = self._rate_delay(waiter.lane, tokens, requests)
+        if delay:
+            time.sleep(delay)
+        api_queue_seconds.observe(time.monotonic() - started, api=self.name, lane=waiter.lane.name)
+        return waiter.lane
+
+    async def _aacquire(self, tokens: int, requests: int) -> _Lane:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(wake)
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    api_calls.inc(api=self.name, result="timeout")
+                    raise GovernorTimeout(f"{self.name}: no capacity after {self.queue_timeout:.0f}s")
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self._release(waiter.lane, 0.0)
+                raise
+        try:
+            delay = self._rate_delay(waiter.lane, tokens, requests)
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._release(waiter.lane, 0.0)
+            raise
+        api_queue_seconds.observe(time.monotonic() - started, api=self.name, lane=waiter.lane.name)
+        return waiter.lane
+
+    # Calls
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is final"""
+        if attempt >= self.retry_attempts or not is_retryable(error):
+            return None
+        backoff = random.uniform(0, min(self.retry_max_seconds, 0.5 * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Spread the retries of everything throttled together over a little more than the pause
+            return min(max(retry_after, 0.0) + backoff * 0.1, self.retry_max_seconds * 2)
+        return backoff
+
+    def _finish(self, lane: _Lane, error: Exception, attempt: int, seconds: float) -> Optional[float]:
+        throttled = is_throttled(error)
+        delay = self._retry_delay(error, attempt)
+        self._release(lane, seconds, throttled=throttled,
+                      retry_after=retry_after_seconds(error) if throttled else None)
+        if delay is None:
+            api_calls.inc(api=self.name, result="throttled" if throttled else "error")
+        else:
+            api_calls.inc(api=self.name, result="retried")
+            logger.info(f"{self.name}: {type(error).__name__} on attempt {attempt + 1}, "
+                        f"retrying in {delay:.1f}s: {str(error)[:200]}")
+        return delay
+
+    def call(self, func: Callable[[], object], tokens: int = 0, requests: int = 1):
+        """Run func() under the governor; tokens/requests are its estimated share of the budgets"""
+        attempt = 0
+        while True:
+            lane = self._acquire(tokens, requests)
+            started = time.monotonic()
+            try:
+                result = func()
+            except Exception as e:
+                delay = self._finish(lane, e, attempt, time.monotonic() - started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release(lane, time.monotonic() - started)
+            api_calls.inc(api=self.name, result="ok")
+            return result
+
+    async def acall(self, func: Callable[[], Awaitable], tokens: int = 0, requests: int = 1):
+        """Async version of call(); func() returns the awaitable to run"""
+        attempt = 0
+        while True:
+            lane = await self._aacquire(tokens, requests)
+            started = time.monotonic()
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                self._release(lane, time.monotonic() - started)
+                raise
+            except Exception as e:
+                delay = self._finish(lane, e, attempt, time.monotonic() - started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._release(lane, time.monotonic() - started)
+            api_calls.inc(api=self.name, result="ok")
+            return result
+
+
+# Shared by every service in the process
+llm_governor = APIGovernor(
+    "gemini", requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    max_concurrency=LLM_MAX_CONCURRENCY, slow_call_seconds=LLM_SLOW_CALL_SECONDS
+)
+embedding_governor = APIGovernor(
+    "embeddings", requests_per_minute=EMBEDDING_REQUESTS_PER_MINUTE, tokens_per_minute=EMBEDDING_TOKENS_PER_MINUTE,
+    max_concurrency=EMBEDDING_MAX_CONCURRENCY, slow_call_seconds=EMBEDDING_SLOW_CALL_SECONDS
+)
@@ -0,0 +1,103 @@
+import re
+import asyncio
+import functools
+import threading
+from typing import Callable, Dict, Hashable
+from .metrics import metrics, Counter
+
+coalesced_calls = metrics.register(Counter(
+    "agi_coalesced_calls_total",
+    "Calls that waited for an identical in-flight call instead of running, by operation"
+))
+
+
+def normalize_text(text) -> str:
+    """Whitespace- and case-insensitive form of a free-text argument, for call keys"""
+    return re.sub(r"\s+", " ", str(text or "")).strip().casefold()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving while it runs get its result.
+
+    Sync callers (threads) and async callers (tasks of one event loop) are tracked
+    separately. Nothing is kept after a call completes, so this deduplicates
+    concurrent work only and never serves stale results.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def do(self, key: Hashable, func: Callable[[], object]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            coalesced_calls.inc(operation=key[0])
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, func: Callable[[], object]):
+        """Async version of do(); func() returns the awaitable to run.
+
+        The work runs in its own task, so a caller that goes away (cancelled
+        request) does not cancel it for the others waiting on it.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            coalesced_calls.inc(operation=key[0])
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(operation: str, key: Callable[..., tuple]):
+    """Decorator: concurrent calls with the same key(*args, **kwargs) share one execution.
+
+    Works for sync and async functions. The key is prefixed with the operation name.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                call_key = (operation,) + tuple(key(*args, **kwargs))
+                return await single_flight.ado(call_key, lambda: func(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = (operation,) + tuple(key(*args, **kwargs))
+            return single_flight.do(call_key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the AGI Task Backend.
+
+The chat, extraction, question generation and history flows are served by async
+handlers, so a single worker can keep many slow Gemini/Pinecone calls in flight.
+Every other route falls through to the Flask app.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse
+from starlette.routing import Mount
+
+from app.factory import create_app
+from app.models.chat_session import ChatSessionModel
+from app.utils.metrics import metrics, start_request_timing, finish_request_timing, server_timing_header
+from app.utils.rate_limiter import start_request_lane, finish_request_lane
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Threads used for blocking client calls (Pinecone, SQLite) made from async handlers
+ASGI_IO_THREADS = int(os.getenv("ASGI_IO_THREADS", "64"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Size the default executor used by asyncio.to_thread for blocking client calls"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_IO_THREADS, thread_name_prefix="asgi-io")
+    )
+    yield
+
+
+app = FastAPI(title="AGI Task Backend", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"]
+)
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Record request latency and add the Server-Timing header to async handlers"""
+    started_at = time.perf_counter()
+    token = start_request_timing()
+    lane_token = start_request_lane(request.url.path)
+    try:
+        response = await call_next(request)
+    finally:
+        timings = finish_request_timing(token)
+        finish_request_lane(lane_token)
+    # Requests that fall through to the mounted Flask app are timed by Flask itself
+    route = request.scope.get("route")
+    if route is not None and not isinstance(route, Mount):
+        elapsed = time.perf_counter() - started_at
+        metrics.record_request(request.method, route.path, response.status_code, elapsed)
+        response.headers['Server-Timing'] = server_timing_header(timings, elapsed)
+    return response
+
+
+# Share the Flask app's lazily created services with the async handlers
+flask_app = create_app()
+services = flask_app.extensions['services']
+
+
+async def _json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# Information extraction endpoints
+@app.post('/api/extract/user-info')
+async def extract_user_info(request: Request):
+    """Extract user information from uploaded documents"""
+    try:
+        data = await _json_body(request)
+        user_id = data.get('user_id')
+        session_id = data.get('session_id')
+
+        if not all([user_id, session_id]):
+            return JSONResponse({'error': 'User ID and Session ID are required'}, status_code=400)
+
+        doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+        result = await services.get('ai_service').aextract_user_information(doc_namespace)
+
+        return JSONResponse({'extracted_info': result}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"User info extraction error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.post('/api/extract/tech-stack')
+async def extract_tech_stack(request: Request):
+    """Extract tech stack from uploaded documents"""
+    try:
+        data = await _json_body(request)
+        user_id = data.get('user_id')
+        session_id = data.get('session_id')
+
+        if not all([user_id, session_id]):
+            return JSONResponse({'error': 'User ID and Session ID are required'}, status_code=400)
+
+        doc_namespace = ChatSessionModel.get_session_namespace(user_id, session_id)
+        result = await services.get('ai_service').aextract_tech_stack_only(doc_namespace)
+
+        return JSONResponse({'tech_stack': result}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Tech stack extraction error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+# Technical questions generation endpoint
+@app.post('/api/questions/generate')
+async def generate_technical_questions(request: Request):
+    """Generate technical questions based on tech stack"""
+    try:
+        data = await _json_body(request)
+        tech_stack = data.get('tech_stack')
+        difficulty = data.get('difficulty', 'medium')
+        fan_out = bool(data.get('fan_out', False))
+
+        if not tech_stack:
+            return JSONResponse({'error': 'Tech stack is required'}, status_code=400)
+
+        valid_difficulties = ['easy', 'medium', 'hard']
+        if difficulty.lower() not in valid_difficulties:
+            return JSONResponse({'error': f'Invalid difficulty. Choose from: {", ".join(valid_difficulties)}'}, status_code=400)
+
+        result = await services.get('ai_service').agenerate_technical_questions(tech_stack, difficulty, fan_out=fan_out)
+
+        return JSONResponse({'questions': result}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Question generation error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+# Chat endpoints
+@app.post('/api/chat/ask')
+async def ask_question(request: Request):
+    """Ask a question about the uploaded documents"""
+    try:
+        data = await _json_body(request)
+        question = data.get('question')
+        user_id = data.get('user_id')
+        session_id = data.get('session_id')
+
+        if not all([question, user_id, session_id]):
+            return JSONResponse({'error': 'Question, User ID, and Session ID are required'}, status_code=400)
+
+        result = await services.get('chat_router').aask_question(question, user_id, session_id)
+
+        return JSONResponse({'answer': result}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Chat error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+# History endpoints
+@app.get('/api/history/sessions')
+async def get_user_sessions(user_id: str = None):
+    """Get all sessions for a user"""
+    try:
+        if not user_id:
+            return JSONResponse({'error': 'User ID is required'}, status_code=400)
+
+        sessions = await services.get('history_router').aget_all_user_sessions(user_id)
+        logger.info(f"Found {len(sessions)} sessions for user {user_id}")
+
+        return JSONResponse({'sessions': sessions}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Get sessions error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@app.get('/api/history/chat')
+async def get_chat_history(user_id: str = None, session_id: str = None):
+    """Get chat history for a user and optional session"""
+    try:
+        if not user_id:
+            return JSONResponse({'error': 'User ID is required'}, status_code=400)
+
+        history = await services.get('history_router').aget_chat_history(user_id, session_id)
+        logger.info(f"Found {len(history)} chat history items")
+
+        return JSONResponse({'history': history}, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Get chat history error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+# Everything else (auth, sessions, uploads, health) is served by the Flask app
+app.mount('/', WSGIMiddleware(flask_app))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 5000))
+    logger.info(f"Starting ASGI server on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency of the local vector index (LOCAL_INDEX_TYPE=ivf against flat,
+and LOCAL_VECTOR_QUANTIZATION=int8/pq against float32).
+
+Builds a namespace of synthetic clustered unit vectors (a Gaussian mixture, which
+resembles embeddings of a corpus with many topics far better than uniform noise),
+trains the IVF index and measures, for each nprobe, recall@k against exact search
+and single-query latency on one thread. It also times incremental inserts,
+tombstone deletes and a save/memory-mapped load round trip. Each quantization is
+then measured on a copy of the namespace: memory and disk bytes per vector, and
+recall against the float32 results with and without full-precision rescoring.
+
+Run from the backend directory (1M x 768 needs about 4 GB of RAM for the vectors):
+    python -m benchmarks.ann_benchmark
+    python -m benchmarks.ann_benchmark --vectors 1000000 --dimension 384 --nprobe 4,8,16 --output ann.json
+    python -m benchmarks.ann_benchmark --vectors 100000 --quantization int8,pq --nprobe 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+# Single-core numbers: BLAS must not use the other cores (set before NumPy loads it)
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def clustered_vectors(count: int, centers: np.ndarray, spread: float, rng: np.random.Generator,
+                      chunk: int = 50000):
+    """Yield unit vectors near random centers, chunk by chunk"""
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        vectors = centers[rng.integers(0, len(centers), size)]
+        vectors = vectors + rng.standard_normal(vectors.shape, dtype=np.float32) * spread
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        yield start, vectors.astype(np.float32)
+
+
+def percentile_ms(samples, q: float) -> float:
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def measure_queries(index, queries: np.ndarray, k: int, **query_kwargs):
+    """IDs returned and per-query seconds"""
+    results, seconds = [], []
+    for query in queries:
+        started_at = time.perf_counter()
+        response = index.query(vector=query, top_k=k, namespace="bench", **query_kwargs)
+        seconds.append(time.perf_counter() - started_at)
+        results.append([match.id for match in response.matches])
+    return results, seconds
+
+
+def saved_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(set(found) & set(expected)) / max(len(expected), 1)
+                          for found, expected in zip(results, truth)]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local vector index recall/latency benchmark")
+    parser.add_argument("--vectors", type=int, default=200000, help="vectors in the namespace")
+    parser.add_argument("--dimension", type=int, default=768, help="vector dimension")
+    parser.add_argument("--clusters", type=int, default=2000, help="topics of the synthetic corpus")
+    parser.add_argument("--topic-cosine", type=float, default=0.6,
+                        help="expected cosine similarity of two vectors of the same topic (lower = harder)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per measurement")
+    parser.add_argument("--k", type=int, default=10, help="top-k")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = sqrt(vectors))")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32", help="comma-separated nprobe values")
+    parser.add_argument("--inserts", type=int, default=10000, help="vectors inserted after training")
+    parser.add_argument("--deletes", type=int, default=10000, help="vectors deleted after training")
+    parser.add_argument("--quantization", default="int8,pq",
+                        help="comma-separated quantizations to compare with float32 (int8, pq; empty = none)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    from app.services.local_vector_store import LocalIndex
+    from app.services.ann_index import IVFIndex
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimension), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    nprobes = [int(value) for value in args.nprobe.split(",") if value.strip()]
+    # |noise|^2 = dimension * spread^2, and the same-topic cosine is about 1 / (1 + |noise|^2)
+    spread = float(np.sqrt((1.0 / args.topic_cosine - 1.0) / args.dimension))
+
+    report = {
+        "benchmark": "ann",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "vectors": args.vectors,
+        "dimension": args.dimension,
+        "k": args.k,
+        "queries": args.queries,
+        "topic_cosine": args.topic_cosine,
+    }
+
+    # Vectors are loaded exactly (flat) and the IVF index is trained once at the end
+    index = LocalIndex("ann-benchmark", args.dimension, index_type="flat", quantization="none")
+    started_at = time.perf_counter()
+    for start, vectors in clustered_vectors(args.vectors, centers, spread, rng):
+        index.upsert([(f"v{start + i}", vectors[i]) for i in range(len(vectors))], namespace="bench")
+    ns = index._namespace("bench")
+    report["load_seconds"] = round(time.perf_counter() - started_at, 2)
+    print(f"Loaded {args.vectors} x {args.dimension} vectors in {report['load_seconds']}s")
+
+    started_at = time.perf_counter()
+    ns.index_type = "ivf"
+    ns.ann = IVFIndex.train(np.flatnonzero(ns.live[:ns.size]), ns.full, nlist=args.nlist or None, seed=args.seed)
+    report["train_seconds"] = round(time.perf_counter() - started_at, 2)
+    report["nlist"] = ns.ann.nlist
+    print(f"Trained IVF ({ns.ann.nlist} lists) in {report['train_seconds']}s")
+
+    # Incremental inserts and tombstone deletes after training
+    _, extra = next(clustered_vectors(args.inserts, centers, spread, rng, chunk=max(args.inserts, 1)))
+    started_at = time.perf_counter()
+    for start in range(0, args.inserts, 1000):
+        index.upsert([(f"n{start + i}", extra[start + i]) for i in range(min(1000, args.inserts - start))],
+                     namespace="bench")
+    insert_seconds = time.perf_counter() - started_at
+    deleted = [f"v{i}" for i in rng.choice(args.vectors, min(args.deletes, args.vectors), replace=False)]
+    started_at = time.perf_counter()
+    for start in range(0, len(deleted), 1000):
+        index.delete(ids=deleted[start:start + 1000], namespace="bench")
+    delete_seconds = time.perf_counter() - started_at
+    report["inserts_per_s"] = round(args.inserts / max(insert_seconds, 1e-9))
+    report["deletes_per_s"] = round(len(deleted) / max(delete_seconds, 1e-9))
+    print(f"Incremental inserts: {report['inserts_per_s']}/s, deletes: {report['deletes_per_s']}/s")
+
+    _, queries = next(clustered_vectors(args.queries, centers, spread, rng, chunk=args.queries))
+
+    # Exact results: the same namespace without its IVF index
+    ann, ns.ann = ns.ann, None
+    truth, exact_seconds = measure_queries(index, queries, args.k)
+    ns.ann = ann
+    report["flat"] = {"p50_ms": percentile_ms(exact_seconds, 50), "p95_ms": percentile_ms(exact_seconds, 95)}
+
+    print(f"\n{'search':<12} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p95 ms':>9}")
+    print(f"{'flat':<12} {1.0:>10.3f} {report['flat']['p50_ms']:>9.2f} {report['flat']['p95_ms']:>9.2f}")
+    report["ivf"] = []
+    for nprobe in nprobes:
+        results, seconds = measure_queries(index, queries, args.k, nprobe=nprobe)
+        entry = {"nprobe": nprobe, "recall": round(recall(results, truth), 4),
+                 "p50_ms": percentile_ms(seconds, 50), "p95_ms": percentile_ms(seconds, 95)}
+        report["ivf"].append(entry)
+        print(f"{'ivf/' + str(nprobe):<12} {entry['recall']:>10.3f} {entry['p50_ms']:>9.2f} {entry['p95_ms']:>9.2f}")
+
+    # Quantized copies of the namespace, searched flat and through their own IVF index
+    nprobe = nprobes[len(nprobes) // 2]
+    live_rows = np.flatnonzero(ns.live[:ns.size])
+    report["float32"] = {"ram_bytes_per_vector": round(ns.memory_bytes() / ns.count(), 1)}
+    report["quantization"] = []
+    quantizations = [value.strip() for value in args.quantization.split(",") if value.strip()]
+    if quantizations:
+        print(f"\n{'codes':<8} {'RAM B/vec':>10} {'disk B/vec':>11} {'codes only':>11} {'flat recall':>12} {'no rescore':>11} "
+              f"{'flat p50':>9} {'ivf/' + str(nprobe) + ' recall':>13} {'ivf p50':>8}")
+        print(f"{'float32':<8} {report['float32']['ram_bytes_per_vector']:>10} {args.dimension * 4:>11} {'-':>11} "
+              f"{1.0:>12.3f} {'-':>11} {report['flat']['p50_ms']:>9.2f}")
+    for quantization in quantizations:
+        quantized = LocalIndex("ann-benchmark-" + quantization, args.dimension, index_type="flat",
+                               quantization=quantization)
+        started_at = time.perf_counter()
+        for start in range(0, live_rows.size, 10000):
+            rows = live_rows[start:start + 10000]
+            quantized.upsert([(ns.ids[row], ns.vectors[row]) for row in rows], namespace="bench")
+        qns = quantized._namespace("bench")
+        entry = {"quantization": quantization, "codes": qns.codes.kind,
+                 "encode_seconds": round(time.perf_counter() - started_at, 2),
+                 "ram_bytes_per_vector": round(qns.memory_bytes() / qns.count(), 1)}
+
+        results, seconds = measure_queries(quantized, queries, args.k)
+        entry["flat"] = {"recall": round(recall(results, truth), 4), "p50_ms": percentile_ms(seconds, 50)}
+        vectors, qns.vectors = qns.vectors, None
+        results, _ = measure_queries(quantized, queries, args.k)
+        qns.vectors = vectors
+        entry["flat_no_rescore"] = {"recall": round(recall(results, truth), 4)}
+
+        qns.index_type = "ivf"
+        qns.ann = IVFIndex.train(np.flatnonzero(qns.live[:qns.size]), qns.full, nlist=ns.ann.nlist, seed=args.seed)
+        results, seconds = measure_queries(quantized, queries, args.k, nprobe=nprobe)
+        entry["ivf"] = {"nprobe": nprobe, "recall": round(recall(results, truth), 4),
+                        "p50_ms": percentile_ms(seconds, 50)}
+
+        work_dir = tempfile.mkdtemp(prefix="ann-benchmark-")
+        try:
+            quantized.directory = work_dir
+            quantized.save()
+            entry["disk_bytes_per_vector"] = round(saved_bytes(work_dir) / qns.count(), 1)
+            vectors, qns.vectors = qns.vectors, None
+            qns.dirty = True
+            shutil.rmtree(work_dir)
+            quantized.save()
+            entry["disk_bytes_per_vector_no_rescore"] = round(saved_bytes(work_dir) / qns.count(), 1)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        del quantized, qns, vectors
+
+        report["quantization"].append(entry)
+        print(f"{entry['codes']:<8} {entry['ram_bytes_per_vector']:>10} {entry['disk_bytes_per_vector']:>11} "
+              f"{entry['disk_bytes_per_vector_no_rescore']:>11} {entry['flat']['recall']:>12.3f} {entry['flat_no_rescore']['recall']:>11.3f} "
+              f"{entry['flat']['p50_ms']:>9.2f} {entry['ivf']['recall']:>13.3f} {entry['ivf']['p50_ms']:>8.2f}")
+
+    # Save and memory-mapped load
+    work_dir = tempfile.mkdtemp(prefix="ann-benchmark-")
+    try:
+        index.directory = work_dir
+        started_at = time.perf_counter()
+        index.save()
+        report["save_seconds"] = round(time.perf_counter() - started_at, 2)
+        del index, ns, ann
+        started_at = time.perf_counter()
+        loaded = LocalIndex("ann-benchmark", args.dimension, directory=work_dir, index_type="ivf")
+        report["load_mmap_seconds"] = round(time.perf_counter() - started_at, 2)
+        results, seconds = measure_queries(loaded, queries, args.k, nprobe=nprobe)
+        report["after_load"] = {"nprobe": nprobe, "recall": round(recall(results, truth), 4),
+                                "p50_ms": percentile_ms(seconds, 50)}
+        print(f"\nSaved in {report['save_seconds']}s, loaded (memory-mapped) in {report['load_mmap_seconds']}s; "
+              f"ivf/{nprobe} after load: recall {report['after_load']['recall']:.3f}, "
+              f"p50 {report['after_load']['p50_ms']:.2f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the Flask API.
+
+Drives create_app() through the Flask test client with Gemini and Pinecone replaced by
+offline fakes (benchmarks/fakes.py) that add configurable latency, and reports
+throughput and p50/p95/p99 latency for the upload (new and repeated PDFs), ask, extract,
+generate and history flows at several concurrency levels. Runs without network access
+or API keys.
+
+Run from the backend directory:
+    python -m benchmarks.e2e_benchmark
+    python -m benchmarks.e2e_benchmark --concurrency 1,4,16 --requests 48 --output e2e.json
+    python -m benchmarks.e2e_benchmark --compare e2e_baseline.json --fail-on-regression 20
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import threading
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# upload sends a new PDF every time; reupload repeats one already ingested (deduplicated path)
+SCENARIOS = ["upload", "reupload", "ask", "extract", "generate", "history"]
+
+QUESTIONS = [
+    "What experience does the candidate have with Kubernetes?",
+    "Which databases has the candidate used in production?",
+    "Summarize the candidate's work on latency and throughput.",
+    "What cloud platforms are mentioned?",
+]
+
+
+def git_revision() -> dict:
+    """Current commit and whether the tree has local changes (None outside a git checkout)"""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip())
+        return {"sha": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": None, "dirty": None}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: list, errors: int, wall_seconds: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000.0, 2)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+class BenchmarkApp:
+    """The Flask app wired to offline fakes, plus the users, sessions and data the scenarios need"""
+
+    def __init__(self, args, work_dir: str):
+        self.args = args
+        self.work_dir = work_dir
+
+        # Must be set before the app modules are imported (connection.py reads DATABASE_URL at import)
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+        os.environ["UPLOAD_FOLDER"] = os.path.join(work_dir, "uploads")
+        os.environ["VECTOR_BACKEND"] = "local"
+        os.environ["EXTRACTION_CACHE_DIR"] = os.path.join(work_dir, "extraction-cache")
+
+        from app.services import vector_service, ai_service
+        from benchmarks.fakes import Latency, HashingEmbeddings, FakeChatModel, LatencyVectorClient
+
+        seconds = lambda ms: ms / 1000.0
+        jitter = seconds(args.jitter_ms)
+        embed_latency = Latency(seconds(args.embed_latency_ms), seconds(args.embed_ms_per_text), jitter, args.seed)
+        llm_latency = Latency(seconds(args.llm_latency_ms), seconds(args.llm_ms_per_token), jitter, args.seed + 1)
+        vector_latency = Latency(seconds(args.vector_latency_ms), 0.0, jitter, args.seed + 2)
+
+        vector_service.create_embeddings = lambda: HashingEmbeddings(latency=embed_latency)
+        vector_service.create_vector_client = lambda index_name: LatencyVectorClient(
+            latency=vector_latency, dimension=vector_service.get_index_dimension(index_name))
+        ai_service.create_chat_model = lambda: FakeChatModel(latency=llm_latency)
+
+        from app.factory import create_app
+        from benchmarks.pdf_fixtures import make_resume_pdf
+
+        self.app = create_app()
+        self.services = self.app.extensions["services"]
+        self.pdf_bytes = make_resume_pdf(pages=args.pages, seed=args.seed)
+        self._local = threading.local()
+
+    def client(self):
+        """One test client per worker thread"""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self.app.test_client()
+            self._local.client = client
+        return client
+
+    def setup(self, max_concurrency: int, unique_uploads: int = 0):
+        # Distinct PDFs for the upload scenario, generated up front so it is not timed
+        from benchmarks.pdf_fixtures import make_resume_pdf
+        self._unique_pdfs = [
+            make_resume_pdf(pages=self.args.pages, seed=self.args.seed + 1 + i) for i in range(unique_uploads)
+        ]
+        self._unique_lock = threading.Lock()
+
+        client = self.client()
+        response = client.post("/api/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench-password"
+        })
+        self.user_id = response.get_json()["user_id"]
+
+        def new_session(name):
+            return client.post("/api/sessions/create", json={
+                "user_id": self.user_id, "session_name": name
+            }).get_json()["session_id"]
+
+        # Upload requests rotate over their own sessions; the read flows share a seeded one
+        self.upload_sessions = [new_session(f"upload-{i}") for i in range(max_concurrency)]
+        self.session_id = new_session("seeded")
+        self.upload(self.session_id)
+
+        vector = self.services.get("history_router").vector_service
+        from app.models.chat_session import ChatSessionModel
+        chat_namespace = ChatSessionModel.get_chat_namespace(self.user_id, self.session_id)
+        for turn in range(self.args.history_turns):
+            timestamp = datetime(2024, 1, 1, 12, turn // 60, turn % 60).isoformat()
+            vector.store_chat_message(QUESTIONS[turn % len(QUESTIONS)], chat_namespace, {
+                "role": "user", "timestamp": timestamp, "type": "question"
+            })
+            vector.store_chat_message("Based on the documents, the answer is ...", chat_namespace, {
+                "role": "assistant", "timestamp": timestamp + ".5", "type": "answer"
+            })
+
+    def upload(self, session_id: str, pdf_bytes: bytes = None):
+        return self.client().post("/api/documents/upload", data={
+            "user_id": self.user_id,
+            "session_id": session_id,
+            "files": (io.BytesIO(pdf_bytes or self.pdf_bytes), "resume.pdf"),
+        }, content_type="multipart/form-data")
+
+    def next_unique_pdf(self) -> bytes:
+        with self._unique_lock:
+            if self._unique_pdfs:
+                return self._unique_pdfs.pop()
+        # Pool exhausted: generate one inline (included in the timing)
+        from benchmarks.pdf_fixtures import make_resume_pdf
+        return make_resume_pdf(pages=self.args.pages, seed=int(time.time() * 1e6))
+
+    def request(self, scenario: str, i: int):
+        client = self.client()
+        if scenario == "upload":
+            return self.upload(self.upload_sessions[i % len(self.upload_sessions)], self.next_unique_pdf())
+        if scenario == "reupload":
+            return self.upload(self.upload_sessions[i % len(self.upload_sessions)])
+        if scenario == "ask":
+            return client.post("/api/chat/ask", json={
+                "question": QUESTIONS[i % len(QUESTIONS)], "user_id": self.user_id, "session_id": self.session_id
+            })
+        if scenario == "extract":
+            return client.post("/api/extract/tech-stack", json={
+                "user_id": self.user_id, "session_id": self.session_id
+            })
+        if scenario == "generate":
+            return client.post("/api/questions/generate", json={
+                "tech_stack": "Python, Flask, PostgreSQL, Redis, Docker, Kubernetes, AWS",
+                "difficulty": "medium",
+                "fan_out": self.args.fan_out,
+            })
+        if scenario == "history":
+            return client.get(f"/api/history/chat?user_id={self.user_id}&session_id={self.session_id}")
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def is_error(response) -> bool:
+    """Routes report most failures as a 200 with a ❌/WARNING message, so inspect the body too"""
+    if response.status_code >= 400:
+        return True
+    body = response.get_data(as_text=True)
+    return "❌" in body or '"error"' in body
+
+
+def run_level(bench: BenchmarkApp, scenario: str, concurrency: int, requests: int, warmup: int) -> dict:
+    for i in range(warmup):
+        bench.request(scenario, i)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        response = bench.request(scenario, i)
+        elapsed = time.perf_counter() - start
+        failed = is_error(response)
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """Rows of (scenario, concurrency, metric, baseline, current, change %) for p50/p95/throughput"""
+    rows = []
+    for scenario, levels in report["results"].items():
+        for level, current in levels.items():
+            previous = baseline.get("results", {}).get(scenario, {}).get(level)
+            if not previous:
+                continue
+            for metric in ("p50_ms", "p95_ms", "throughput_rps"):
+                before, after = previous[metric], current[metric]
+                change = ((after - before) / before * 100.0) if before else 0.0
+                rows.append((scenario, level, metric, before, after, round(change, 1)))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end API benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="measured requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests before each level")
+    parser.add_argument("--pages", type=int, default=2, help="pages in the uploaded PDF")
+    parser.add_argument("--history-turns", type=int, default=10, help="question/answer pairs seeded into chat history")
+    parser.add_argument("--fan-out", action="store_true", help="use fan-out mode for question generation")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="fixed latency per LLM call")
+    parser.add_argument("--llm-ms-per-token", type=float, default=0.0, help="extra LLM latency per completion token")
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0, help="fixed latency per embedding call")
+    parser.add_argument("--embed-ms-per-text", type=float, default=0.5, help="extra embedding latency per text")
+    parser.add_argument("--vector-latency-ms", type=float, default=15.0, help="latency per vector store call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter added to every latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--fail-on-regression", type=float, help="exit 1 if any p95 grows by more than this percent")
+    parser.add_argument("--verbose", action="store_true", help="show application logs and prints")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    import logging
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    work_dir = tempfile.mkdtemp(prefix="e2e-benchmark-")
+    report = {
+        "benchmark": "e2e",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "verbose")},
+        "results": {},
+    }
+    try:
+        # The services print progress to stdout; keep the report readable unless --verbose
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with quiet:
+            bench = BenchmarkApp(args, work_dir)
+            unique_uploads = (args.requests + args.warmup) * len(levels) if "upload" in scenarios else 0
+            bench.setup(max(levels), unique_uploads)
+            for scenario in scenarios:
+                report["results"][scenario] = {}
+                for level in levels:
+                    report["results"][scenario][str(level)] = run_level(
+                        bench, scenario, level, args.requests, args.warmup
+                    )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'scenario':<10} {'conc':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    for scenario, results in report["results"].items():
+        for level, entry in results.items():
+            print(f"{scenario:<10} {level:>4} {entry['throughput_rps']:>8.2f} {entry['p50_ms']:>9.1f} "
+                  f"{entry['p95_ms']:>9.1f} {entry['p99_ms']:>9.1f} {entry['errors']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = any(entry["errors"] for results in report["results"].values() for entry in results.values())
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {(baseline.get('git') or {}).get('sha') or args.compare}:")
+        for scenario, level, metric, before, after, change in compare(report, baseline):
+            flag = ""
+            if metric == "p95_ms" and args.fail_on_regression is not None and change > args.fail_on_regression:
+                flag = "  ✗ regression"
+                failed = True
+            print(f"  {scenario:<10} {level:>4} {metric:<15} {before:>9.1f} -> {after:>9.1f} ({change:+.1f}%){flag}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
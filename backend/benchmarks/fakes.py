@@ -0,0 +1,184 @@
+"""
+Offline stand-ins for Gemini (chat + embeddings) and Pinecone used by the benchmarks.
+
+Each fake sleeps for a configurable latency so the benchmark reflects the shape of
+real network calls without needing API keys.
+"""
+
+import re
+import time
+import random
+import asyncio
+import hashlib
+from typing import List
+
+import numpy as np
+
+from app.services.local_vector_store import LocalVectorClient, LocalIndex
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class Latency:
+    """Injected latency in seconds: base + per_item * n, with optional uniform jitter"""
+
+    def __init__(self, base: float = 0.0, per_item: float = 0.0, jitter: float = 0.0, seed: int = None):
+        self.base = base
+        self.per_item = per_item
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def sample(self, items: int = 1) -> float:
+        delay = self.base + self.per_item * items
+        if self.jitter:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def sleep(self, items: int = 1):
+        delay = self.sample(items)
+        if delay:
+            time.sleep(delay)
+
+    async def asleep(self, items: int = 1):
+        delay = self.sample(items)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words embeddings (feature hashing), so similar texts get similar vectors"""
+
+    def __init__(self, dimension: int = 768, latency: Latency = None):
+        self.dimension = dimension
+        self.latency = latency or Latency()
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        if not vector.any():
+            vector[0] = 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.sleep(len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.latency.sleep(1)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self.latency.asleep(len(texts))
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await self.latency.asleep(1)
+        return self._embed(text)
+
+
+class FakeMessage:
+    """Minimal stand-in for a LangChain AIMessage"""
+
+    def __init__(self, content: str, prompt_tokens: int, completion_tokens: int):
+        self.content = content
+        self.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+
+class FakeChatModel:
+    """Chat model returning canned answers shaped like the prompt asks for.
+
+    Latency scales with the completion length (per_item is seconds per output token).
+    """
+
+    TECH_STACK_ANSWER = "Python, Flask, FastAPI, PostgreSQL, Redis, Docker, Kubernetes, AWS, React, TypeScript"
+
+    def __init__(self, latency: Latency = None):
+        self.latency = latency or Latency()
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        lowered = prompt.lower()
+        if "### 1." in prompt or "technical questions" in lowered or "interview questions" in lowered:
+            return "\n\n".join(
+                f"### {n}. **Question {n}:** Explain how you would design component {n} for scale.\n"
+                f"**Expected answer:** Discuss trade-offs, failure modes and measurement."
+                for n in range(1, 5)
+            )
+        if "user question:" in lowered:
+            return "Based on the provided context, the document describes the requested topic in detail."
+        if "tech stack" in lowered or "technologies" in lowered:
+            return self.TECH_STACK_ANSWER
+        if "extract" in lowered:
+            return (
+                "**Name:** Jane Doe\n**Email:** jane@example.com\n**Skills:** "
+                + self.TECH_STACK_ANSWER
+            )
+        return "Based on the provided context, the document describes the requested topic in detail."
+
+    def _respond(self, prompt: str):
+        self.calls += 1
+        content = self._answer(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        return FakeMessage(content, prompt_tokens, completion_tokens), completion_tokens
+
+    def invoke(self, prompt, *args, **kwargs):
+        message, completion_tokens = self._respond(str(prompt))
+        self.latency.sleep(completion_tokens)
+        return message
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        message, completion_tokens = self._respond(str(prompt))
+        await self.latency.asleep(completion_tokens)
+        return message
+
+
+class LatencyIndex:
+    """Wraps a LocalIndex and sleeps before each call to mimic a remote vector store"""
+
+    def __init__(self, index: LocalIndex, latency: Latency):
+        self._index = index
+        self._latency = latency
+
+    def upsert(self, vectors, namespace: str = "", **kwargs):
+        self._latency.sleep(len(vectors))
+        return self._index.upsert(vectors, namespace=namespace)
+
+    def query(self, *args, **kwargs):
+        self._latency.sleep(1)
+        return self._index.query(*args, **kwargs)
+
+    def fetch(self, *args, **kwargs):
+        self._latency.sleep(1)
+        return self._index.fetch(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._latency.sleep(1)
+        return self._index.delete(*args, **kwargs)
+
+    def list(self, *args, **kwargs):
+        for page in self._index.list(*args, **kwargs):
+            self._latency.sleep(1)
+            yield page
+
+    def describe_index_stats(self, **kwargs):
+        self._latency.sleep(1)
+        return self._index.describe_index_stats(**kwargs)
+
+
+class LatencyVectorClient(LocalVectorClient):
+    """LocalVectorClient whose indexes add per-call latency"""
+
+    def __init__(self, latency: Latency = None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency or Latency()
+
+    def Index(self, name: str):
+        return LatencyIndex(super().Index(name), self.latency)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cold-start import benchmark for the backend.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports the
+cumulative import time of each entry module and fails when it exceeds its budget or
+when a heavy SDK (LangChain, Gemini, Pinecone, PDF libraries) is imported eagerly.
+
+Run from the backend directory:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 10 --output import_time.json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> budget in milliseconds (median cumulative import time)
+DEFAULT_BUDGETS = {
+    "app.factory": 600,
+    "app.database.connection": 100,
+    "app.services.ai_service": 300,
+    "app.services.pdf_service": 50,
+}
+
+# Modules that must only be loaded on first use
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_google_genai",
+    "google.generativeai",
+    "pinecone",
+    "PyPDF2",
+    "pypdf",
+    "fitz",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_import(module: str) -> dict:
+    """Import a module in a fresh interpreter and return its cumulative time and loaded heavy modules"""
+    code = (
+        f"import {module}, sys, json; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # The top-level entry for the module has no indentation
+        if match and match.group(4) == module and match.group(3) == " ":
+            cumulative_us = int(match.group(2))
+
+    return {
+        "cumulative_ms": (cumulative_us or 0) / 1000.0,
+        "heavy_modules": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def run_benchmark(budgets: dict, runs: int) -> dict:
+    """Measure each module `runs` times and compare the median to its budget"""
+    report = {"python": sys.version.split()[0], "runs": runs, "modules": {}}
+    for module, budget_ms in budgets.items():
+        samples = [measure_import(module) for _ in range(runs)]
+        timings = [sample["cumulative_ms"] for sample in samples]
+        heavy = sorted({name for sample in samples for name in sample["heavy_modules"]})
+        median_ms = statistics.median(timings)
+        report["modules"][module] = {
+            "median_ms": round(median_ms, 1),
+            "min_ms": round(min(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "budget_ms": budget_ms,
+            "eager_heavy_modules": heavy,
+            "passed": median_ms <= budget_ms and not heavy,
+        }
+    report["passed"] = all(entry["passed"] for entry in report["modules"].values())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import-time regression benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply all budgets (slow CI machines)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    budgets = {module: budget * args.budget_scale for module, budget in DEFAULT_BUDGETS.items()}
+    report = run_benchmark(budgets, args.runs)
+
+    for module, entry in report["modules"].items():
+        status = "✓" if entry["passed"] else "✗"
+        print(f"{status} {module:<28} median {entry['median_ms']:>8.1f} ms  (budget {entry['budget_ms']:.0f} ms)")
+        if entry["eager_heavy_modules"]:
+            print(f"    eagerly imported: {', '.join(entry['eager_heavy_modules'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the PDF ingestion hot paths.
+
+Generates synthetic corpora (a short resume, a 500-page report and scanned-like image
+pages) and measures, for every installed extraction library, pages/sec, MB/sec and
+peak RSS, each backend/corpus pair in a fresh interpreter so memory is not shared.
+Chunkers and page-text assembly are timed in-process on the extracted report text.
+The backend with the best throughput that extracts all the text is reported as the
+recommended default.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_benchmark
+    python -m benchmarks.pdf_benchmark --corpora resume,report --repeat 5 --output pdf.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Extraction backends: each takes a file path and returns the text of every page
+
+def extract_pypdf2(path: str) -> List[str]:
+    from PyPDF2 import PdfReader
+    with open(path, "rb") as f:
+        return [page.extract_text() or "" for page in PdfReader(f).pages]
+
+
+def extract_pypdf(path: str) -> List[str]:
+    from pypdf import PdfReader
+    with open(path, "rb") as f:
+        return [page.extract_text() or "" for page in PdfReader(f).pages]
+
+
+def extract_pymupdf(path: str) -> List[str]:
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF < 1.24 only ships the fitz name
+        import fitz as pymupdf
+    with pymupdf.open(path) as document:
+        return [page.get_text() for page in document]
+
+
+def extract_pdfplumber(path: str) -> List[str]:
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def extract_pdfminer(path: str) -> List[str]:
+    from pdfminer.high_level import extract_text
+    # pdfminer separates pages with form feeds
+    return extract_text(path).split("\f")[:-1] or [""]
+
+
+BACKENDS: Dict[str, Callable[[str], List[str]]] = {
+    "pypdf2": extract_pypdf2,
+    "pypdf": extract_pypdf,
+    "pymupdf": extract_pymupdf,
+    "pdfplumber": extract_pdfplumber,
+    "pdfminer": extract_pdfminer,
+}
+
+BACKEND_MODULES = {
+    "pypdf2": "PyPDF2",
+    "pypdf": "pypdf",
+    "pymupdf": "fitz",
+    "pdfplumber": "pdfplumber",
+    "pdfminer": "pdfminer.high_level",
+}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(backend: str, path: str, repeat: int) -> dict:
+    """Time one backend on one file in this (fresh) process"""
+    __import__(BACKEND_MODULES[backend])
+    rss_before = peak_rss_mb()
+    extract = BACKENDS[backend]
+
+    timings = []
+    pages = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = extract(path)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "best_s": min(timings),
+        "median_s": sorted(timings)[len(timings) // 2],
+        "pages": len(pages),
+        # Backends differ mostly in whitespace, so compare visible characters
+        "chars": sum(len("".join(text.split())) for text in pages),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure_backend(backend: str, path: str, repeat: int, timeout: float) -> dict:
+    """Run run_worker in a fresh interpreter and return its result (or the error)"""
+    command = [sys.executable, "-m", "benchmarks.pdf_benchmark", "--worker", backend, path, "--repeat", str(repeat)]
+    try:
+        result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout:.0f}s"}
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1]
+        return {"error": last_line}
+
+    entry = json.loads(result.stdout.strip().splitlines()[-1])
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    entry["pages_per_s"] = round(entry["pages"] / entry["best_s"], 1) if entry["best_s"] else None
+    entry["mb_per_s"] = round(size_mb / entry["best_s"], 2) if entry["best_s"] else None
+    if entry["peak_rss_mb"] is not None:
+        entry["rss_delta_mb"] = round(entry["peak_rss_mb"] - entry["rss_before_mb"], 1)
+    return entry
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_text_paths(pages: List[str], repeat: int) -> dict:
+    """Time page-text assembly and the chunkers on already extracted text"""
+    def concatenate():
+        text = ""
+        for page_text in pages:
+            if page_text:
+                text += page_text
+        return text
+
+    def join():
+        return "".join(page_text for page_text in pages if page_text)
+
+    text = join()
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    results = {"text_mb": round(size_mb, 2), "assembly": {}, "chunkers": {}}
+
+    for name, func in (("concatenate", concatenate), ("join", join)):
+        seconds = best_of(func, repeat)
+        results["assembly"][name] = {"best_s": round(seconds, 5), "mb_per_s": round(size_mb / seconds, 1)}
+
+    def recursive_splitter(chunk_size=10000, chunk_overlap=1000):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return splitter.split_text(text)
+
+    def fixed_window(chunk_size=10000, chunk_overlap=1000):
+        step = chunk_size - chunk_overlap
+        return [text[i:i + chunk_size] for i in range(0, len(text), step)]
+
+    chunkers = {"langchain_recursive": recursive_splitter, "fixed_window": fixed_window}
+    for name, chunker in chunkers.items():
+        try:
+            chunks = chunker()
+            seconds = best_of(chunker, repeat)
+            results["chunkers"][name] = {
+                "best_s": round(seconds, 4),
+                "mb_per_s": round(size_mb / seconds, 1),
+                "chunks": len(chunks),
+            }
+        except ImportError as e:
+            results["chunkers"][name] = {"error": str(e)}
+    return results
+
+
+def recommend_backend(results: dict) -> str:
+    """Fastest backend (total time over all corpora) that extracts at least 95% of the best character count everywhere"""
+    candidates = {}
+    for backend, corpora in results.items():
+        if any("error" in entry for entry in corpora.values()):
+            continue
+        candidates[backend] = sum(entry["best_s"] for entry in corpora.values())
+
+    for backend in list(candidates):
+        for corpus, entry in results[backend].items():
+            best_chars = max(
+                results[other][corpus].get("chars", 0) for other in results if corpus in results[other]
+            )
+            if best_chars and entry["chars"] < 0.95 * best_chars:
+                candidates.pop(backend)
+                break
+    return min(candidates, key=candidates.get) if candidates else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF extraction and chunking micro-benchmarks")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated extraction backends")
+    parser.add_argument("--corpora", default="resume,report,scanned", help="comma-separated synthetic corpora")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (best is reported)")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per backend/corpus run")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        backend, path = args.worker
+        print(json.dumps(run_worker(backend, path, args.repeat)))
+        return
+
+    from benchmarks.pdf_fixtures import CORPORA
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    corpora = [name.strip() for name in args.corpora.split(",") if name.strip()]
+    unknown = (set(backends) - set(BACKENDS)) | (set(corpora) - set(CORPORA))
+    if unknown:
+        sys.exit(f"Unknown backends/corpora: {', '.join(sorted(unknown))}")
+
+    report = {
+        "benchmark": "pdf",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "corpora": {},
+        "extraction": {backend: {} for backend in backends},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="pdf-benchmark-")
+    try:
+        paths = {}
+        for corpus in corpora:
+            paths[corpus] = os.path.join(work_dir, f"{corpus}.pdf")
+            with open(paths[corpus], "wb") as f:
+                f.write(CORPORA[corpus]())
+            report["corpora"][corpus] = {"size_mb": round(os.path.getsize(paths[corpus]) / (1024 * 1024), 2)}
+
+        print(f"{'backend':<11} {'corpus':<8} {'pages/s':>9} {'MB/s':>8} {'peak RSS MB':>12} {'text chars':>10}")
+        for backend in backends:
+            for corpus in corpora:
+                entry = measure_backend(backend, paths[corpus], args.repeat, args.timeout)
+                report["extraction"][backend][corpus] = entry
+                if "error" in entry:
+                    print(f"{backend:<11} {corpus:<8} error: {entry['error']}")
+                else:
+                    rss = f"{entry['peak_rss_mb']:.0f}" if entry["peak_rss_mb"] is not None else "n/a"
+                    print(f"{backend:<11} {corpus:<8} {entry['pages_per_s']:>9.1f} {entry['mb_per_s']:>8.2f} "
+                          f"{rss:>12} {entry['chars']:>10}")
+
+        # Text paths are timed on the largest corpus that any backend could read
+        text_corpus = next((c for c in ("report", "resume", "scanned") if c in paths), None)
+        pages = None
+        for backend in ("pymupdf", "pypdf", "pypdf2"):
+            try:
+                pages = BACKENDS[backend](paths[text_corpus])
+                break
+            except Exception:
+                continue
+        if pages:
+            report["text"] = dict(benchmark_text_paths(pages, args.repeat), corpus=text_corpus)
+            print(f"\nText paths on '{text_corpus}' ({report['text']['text_mb']} MB of text):")
+            for group in ("assembly", "chunkers"):
+                for name, entry in report["text"][group].items():
+                    if "error" in entry:
+                        print(f"  {group:<9} {name:<20} error: {entry['error']}")
+                    else:
+                        print(f"  {group:<9} {name:<20} {entry['mb_per_s']:>8.1f} MB/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report["recommended_backend"] = recommend_backend(report["extraction"])
+    print(f"\nRecommended default extraction backend: {report['recommended_backend']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Synthetic PDF fixtures for the benchmarks.
+
+Builds small, valid text PDFs without any third-party library so the benchmarks can
+run on a clean CI machine.
+"""
+
+import random
+from typing import List
+
+WORDS = (
+    "python flask fastapi django postgresql redis docker kubernetes aws gcp terraform "
+    "react typescript javascript node graphql rest api microservices kafka spark "
+    "machine learning pytorch tensorflow pandas numpy sql nosql mongodb ci cd github "
+    "designed built led migrated optimized scaled reduced latency improved throughput "
+    "team project platform service pipeline customers production reliability"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str], font_size: int = 10, image_side: int = 0, seed: int = 0) -> bytes:
+    """Build a PDF with one page per string; lines are split on newlines.
+
+    image_side > 0 adds a full-page grayscale image of that many pixels square to every
+    page (random noise, so it does not compress), imitating a scanned document.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # filled in once the page tree exists
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for text in pages:
+        lines = []
+        image_resource = b""
+        if image_side:
+            pixels = bytes(rng.getrandbits(8) for _ in range(image_side * image_side))
+            image_id = add(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream"
+                % (image_side, image_side, len(pixels), pixels)
+            )
+            image_resource = b" /XObject << /Im1 %d 0 R >>" % image_id
+            lines.append(b"q 612 0 0 842 0 0 cm /Im1 Do Q")
+        lines.append(f"BT /F1 {font_size} Tf {font_size + 2} TL 50 800 Td".encode())
+        for line in text.split("\n"):
+            lines.append(f"({_escape(line)}) Tj T*".encode("latin-1", "replace"))
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >>%s >> /Contents %d 0 R >>"
+            % (pages_id, font_id, image_resource, content_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+def make_resume_pdf(pages: int = 2, lines_per_page: int = 60, seed: int = 0) -> bytes:
+    """A resume-like PDF filled with technology words (deterministic for a given seed)"""
+    rng = random.Random(seed)
+    page_texts = []
+    for page in range(pages):
+        lines = [f"Jane Doe - Senior Engineer - page {page + 1}"]
+        for _ in range(lines_per_page - 1):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(12)))
+        page_texts.append("\n".join(lines))
+    return make_pdf(page_texts)
+
+
+def make_report_pdf(pages: int = 500, lines_per_page: int = 70, seed: int = 0) -> bytes:
+    """A long, text-dense report"""
+    rng = random.Random(seed)
+    page_texts = []
+    for page in range(pages):
+        lines = [f"Annual engineering report - section {page // 10 + 1} - page {page + 1}"]
+        for _ in range(lines_per_page - 1):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(14)))
+        page_texts.append("\n".join(lines))
+    return make_pdf(page_texts)
+
+
+def make_scanned_pdf(pages: int = 40, image_side: int = 400, seed: int = 0) -> bytes:
+    """Scanned-like pages: a large image each and only a caption of extractable text"""
+    page_texts = [f"Scanned page {page + 1}" for page in range(pages)]
+    return make_pdf(page_texts, image_side=image_side, seed=seed)
+
+
+# Named corpora used by the PDF benchmarks: name -> builder
+CORPORA = {
+    "resume": lambda: make_resume_pdf(pages=2),
+    "report": lambda: make_report_pdf(pages=500),
+    "scanned": lambda: make_scanned_pdf(pages=40),
+}
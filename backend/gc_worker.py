@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Garbage collection worker for the AGI Task Backend.
+
+Removes data that no longer belongs to any chat session: orphaned database rows,
+per-session vector namespaces, unreferenced chunks in the shared document namespace,
+per-session upload directories and stored PDFs. Deletions are made in rate-limited
+batches (GC_BATCH_SIZE, GC_BATCH_DELAY_SECONDS).
+
+Run with:
+    python gc_worker.py --dry-run        # report what would be deleted
+    python gc_worker.py                  # one collection pass
+    python gc_worker.py --interval 3600  # keep running, one pass per interval
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app.database.connection import init_db
+from app.services.gc_service import GarbageCollector, GC_BATCH_SIZE, GC_BATCH_DELAY_SECONDS, GC_INTERVAL_SECONDS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def print_report(report: dict):
+    verb = "Would delete" if report["dry_run"] else "Deleted"
+    print(f"🧹 Garbage collection {'(dry run) ' if report['dry_run'] else ''}"
+          f"- {report['live_sessions']} live sessions, {report['seconds']}s")
+    for table, count in report["records"].items():
+        print(f"  {verb} {count} orphaned {table} rows")
+
+    for key, label, detail in (
+        ("namespaces", "session namespaces", lambda r: f"{r['vectors']} vectors"),
+        ("document_vectors", "shared document vectors", lambda r: f"{r['documents']} documents"),
+        ("upload_dirs", "upload directories", lambda r: format_bytes(r["bytes"])),
+        ("blobs", "stored PDFs", lambda r: format_bytes(r["bytes"])),
+    ):
+        result = report[key]
+        if result.get("skipped"):
+            print(f"  ⚠️ Skipped {label}: {result['skipped']}")
+            continue
+        print(f"  {verb} {result['count']} {label} ({detail(result)})")
+        for name in result["sample"]:
+            print(f"    - {name}")
+    if "namespace_stats_corrected" in report:
+        print(f"  Reconciled namespace stats ({report['namespace_stats_corrected']} counts corrected)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Delete orphaned vectors, files and database rows")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    parser.add_argument("--interval", type=int, nargs="?", const=GC_INTERVAL_SECONDS,
+                        help="keep running, one pass every INTERVAL seconds")
+    parser.add_argument("--upload-dir", default=os.getenv("UPLOAD_FOLDER", os.path.join(BACKEND_DIR, "uploads")),
+                        help="upload folder of the app")
+    parser.add_argument("--batch-size", type=int, default=GC_BATCH_SIZE, help="deletions per batch")
+    parser.add_argument("--batch-delay", type=float, default=GC_BATCH_DELAY_SECONDS, help="seconds between batches")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not init_db():
+        return 1
+
+    collector = GarbageCollector(args.upload_dir, batch_size=args.batch_size, batch_delay=args.batch_delay)
+    while True:
+        try:
+            report = collector.run(dry_run=args.dry_run)
+            if args.json:
+                print(json.dumps(report, indent=2))
+            else:
+                print_report(report)
+        except Exception as e:
+            logger.error(f"❌ Garbage collection failed: {str(e)}")
+            if not args.interval:
+                return 1
+
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Index migration tool for the AGI Task Backend.
+
+Moves the index alias (PINECONE_INDEX_NAME) to a new index that stores vectors of a
+smaller dimension, reduced with a PCA projection fitted on the current vectors or by
+truncation (Matryoshka-style). Existing vectors are re-projected, not re-embedded.
+Running app processes keep serving throughout: writes are mirrored to the new index
+during the copy and every process switches to it within INDEX_ALIAS_REFRESH_SECONDS.
+
+With VECTOR_BACKEND=local the indexes live in LOCAL_INDEX_DIR, which only one process
+may use: stop the app first.
+
+Run with:
+    python migrate_index.py --status                      # where the alias points
+    python migrate_index.py --dimension 256 --dry-run     # fit and estimate recall only
+    python migrate_index.py --dimension 256               # PCA to 256 dimensions
+    python migrate_index.py --dimension 256 --reduction truncate --drop-old
+"""
+
+import sys
+import json
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app.database.connection import init_db
+from app.services.index_migration import IndexMigration, alias_status, MIGRATION_BATCH_SIZE
+from app.services.projection import EMBEDDING_REDUCTION, PCA_FIT_SAMPLES, REDUCTIONS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def print_report(report: dict):
+    print(f"📐 {report['alias']}: {report['source']} ({report['source_dimension']}d) -> "
+          f"{report['target']} ({report['dimension']}d, {report['reduction']})"
+          f"{' (dry run)' if report['dry_run'] else ''}")
+    print(f"  {report['vectors']} vectors in {report['namespaces']} namespaces, {report['seconds']}s")
+    print(f"  Projection: {report['projection']} (fitted on {report['samples']} vectors)")
+    print(f"  Estimated recall@10 against the current vectors: {report['sample_recall']:.3f}")
+    if "copied" in report:
+        print(f"  Copied {report['copied']} vectors")
+    for namespace, current, migrated in report.get("count_differences", []):
+        print(f"  ⚠️ Namespace '{namespace}': {current} vectors, {migrated} in the new index")
+    if report.get("aborted"):
+        print(f"  ✗ Not switched: {report['aborted']}")
+    elif report["switched"]:
+        print(f"  ✓ Alias {report['alias']} now points to {report['target']}")
+    if report.get("dropped"):
+        print(f"  🗑️ Deleted {report['dropped']}")
+    elif report["switched"]:
+        print(f"  The old index {report['source']} was kept; delete it once the new one has proven itself")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Move the index alias to an index of reduced vectors")
+    parser.add_argument("--status", action="store_true", help="show where the alias points and exit")
+    parser.add_argument("--dimension", type=int, help="dimension of the new index")
+    parser.add_argument("--reduction", choices=REDUCTIONS, default=EMBEDDING_REDUCTION,
+                        help="pca (fitted on the current vectors) or truncate (Matryoshka embeddings)")
+    parser.add_argument("--target", help="name of the new index (default: <alias>-<dimension>d-<timestamp>)")
+    parser.add_argument("--samples", type=int, default=PCA_FIT_SAMPLES, help="vectors sampled to fit PCA")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE, help="vectors per fetch/upsert")
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="do not migrate if the estimated recall@10 is lower")
+    parser.add_argument("--settle-seconds", type=float,
+                        help="wait for processes to re-read the alias (default: 2 x INDEX_ALIAS_REFRESH_SECONDS)")
+    parser.add_argument("--force", action="store_true", help="switch despite low recall or differing counts")
+    parser.add_argument("--drop-old", action="store_true", help="delete the old index after switching")
+    parser.add_argument("--dry-run", action="store_true", help="only fit the projection and estimate recall")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not init_db():
+        return 1
+
+    if args.status:
+        from app.services.vector_service import VectorService
+        print(json.dumps(alias_status(VectorService().index_alias), indent=2))
+        return 0
+    if not args.dimension:
+        print("✗ --dimension is required")
+        return 2
+
+    try:
+        migration = IndexMigration(
+            dimension=args.dimension,
+            reduction=args.reduction,
+            target_name=args.target,
+            samples=args.samples,
+            batch_size=args.batch_size,
+            settle_seconds=args.settle_seconds,
+        )
+        report = migration.run(dry_run=args.dry_run, min_recall=args.min_recall, force=args.force,
+                               drop_old=args.drop_old)
+    except Exception as e:
+        logger.error(f"❌ Index migration failed: {str(e)}")
+        return 1
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0 if report["switched"] or args.dry_run else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
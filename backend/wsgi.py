@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Production WSGI entry point for the AGI Task Backend.
+
+The Flask app is built once at import time. Services (and their Gemini/Pinecone
+clients) are created lazily inside each worker, so preloading the app in the
+gunicorn master is cheap and the imported modules are shared copy-on-write
+between workers.
+
+Run with:
+    python wsgi.py                    # gunicorn (or waitress on Windows)
+    WSGI_SERVER=waitress python wsgi.py
+    gunicorn --preload -k gthread wsgi:application
+"""
+
+import os
+import sys
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app.factory import create_app
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Server settings
+HOST = os.getenv('HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', 5000))
+WORKERS = int(os.getenv('WEB_CONCURRENCY', (os.cpu_count() or 1) * 2 + 1))
+THREADS = int(os.getenv('WSGI_THREADS', 8))
+KEEPALIVE = int(os.getenv('WSGI_KEEPALIVE', 5))
+TIMEOUT = int(os.getenv('WSGI_TIMEOUT', 120))
+MAX_REQUESTS = int(os.getenv('WSGI_MAX_REQUESTS', 0))
+# Create services right after fork instead of on the first request
+WARM_ON_FORK = os.getenv('WSGI_WARM_ON_FORK', 'false').lower() == 'true'
+
+application = create_app()
+
+
+def post_fork(server, worker):
+    """gunicorn hook: drop anything inherited from the master and optionally warm services"""
+    services = application.extensions['services']
+    services.reset()
+    if WARM_ON_FORK:
+        try:
+            services.warm()
+        except Exception as e:
+            logger.error(f"Service warm-up failed in worker {worker.pid}: {str(e)}")
+
+
+def run_gunicorn():
+    """Serve with gunicorn using preload-app semantics"""
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornApplication(BaseApplication):
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    options = {
+        'bind': f'{HOST}:{PORT}',
+        'workers': WORKERS,
+        'threads': THREADS,
+        'worker_class': 'gthread',
+        'keepalive': KEEPALIVE,
+        'timeout': TIMEOUT,
+        'max_requests': MAX_REQUESTS,
+        'max_requests_jitter': MAX_REQUESTS // 10,
+        'preload_app': True,
+        'post_fork': post_fork,
+    }
+    logger.info(f"Starting gunicorn on {HOST}:{PORT} (workers={WORKERS}, threads={THREADS}, keepalive={KEEPALIVE}s)")
+    GunicornApplication(application, options).run()
+
+
+def run_waitress():
+    """Serve with waitress (single process, thread pool)"""
+    from waitress import serve
+
+    logger.info(f"Starting waitress on {HOST}:{PORT} (threads={THREADS})")
+    if WARM_ON_FORK:
+        application.extensions['services'].warm()
+    serve(
+        application,
+        host=HOST,
+        port=PORT,
+        threads=THREADS,
+        channel_timeout=TIMEOUT
+    )
+
+
+if __name__ == '__main__':
+    server = os.getenv('WSGI_SERVER', 'waitress' if sys.platform == 'win32' else 'gunicorn').lower()
+    if server == 'waitress':
+        run_waitress()
+    else:
+        run_gunicorn()